@@ -1,4 +1,8 @@
 # fmt: off
+import asyncio
+import logging
+from typing import Optional
+
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -15,17 +19,60 @@ import api.controllers.voluntaries_request_controller
 import api.controllers.voluntaries_using_seeds_controller
 import api.controllers.voluntaries_using_tools_controller
 import api.exceptions
+import api.services.grounds_service as grounds_service
+from api.database import get_db
+from api.env import settings
+from api.responses import OrjsonResponse, StateHeadersMiddleware
 
-app = FastAPI()
+app = FastAPI(default_response_class=OrjsonResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(StateHeadersMiddleware)
 api.exceptions.configure(app)
 
+
+# Kept so the task is not garbage collected while it sleeps
+beds_rollover: Optional[asyncio.Task] = None
+
+
+async def beds_rollover_task():
+    while True:
+        try:
+            async for db in get_db():
+                await grounds_service.ground_beds_rollover(db)
+        except Exception:
+            logging.exception('Beds rollover failed')
+        # At the next date change at the latest, so no bed stays OCCUPIED
+        # after its end_at for longer than the rollover takes
+        await asyncio.sleep(min(settings.beds_rollover_interval / 1000,
+                                grounds_service.seconds_until_next_day() + 1))
+
+
+@app.on_event('startup')
+async def schedule_beds_rollover():
+    global beds_rollover
+    if settings.beds_rollover_interval > 0:
+        beds_rollover = asyncio.create_task(beds_rollover_task())
+
+
+@app.on_event('shutdown')
+async def cancel_beds_rollover():
+    global beds_rollover
+    if beds_rollover is not None:
+        beds_rollover.cancel()
+        try:
+            await beds_rollover
+        except asyncio.CancelledError:
+            pass
+        beds_rollover = None
+
+
 router = APIRouter(prefix="/api")
 
 
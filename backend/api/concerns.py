@@ -1,14 +1,92 @@
-from typing import Generic, List, TypeVar
+import csv
+import hashlib
+import io
+import secrets
+from datetime import date
+from enum import Enum
+from typing import (Any, AsyncIterator, Callable, Generic, Iterable, List,
+                    Optional, Tuple, TypeVar)
 
-from fastapi import Query
-from pydantic import BaseModel
+import orjson
+from bson import ObjectId
+from fastapi import Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import BaseModel, ValidationError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from api.database import Database, Session, get_db
+from api.env import settings
+from api.exceptions import DomainError, NotFoundError, NotModifiedError
+from api.responses import OrjsonResponse, json_default
+from api.utilities.cache import TTLCache
+from api.utilities.mapper import (decode_cursor, encode_cursor, keyset_query,
+                                  keyset_sort, keyset_values,
+                                  many_model_from_mongo, model_from_mongo,
+                                  normalize_query)
 
 T = TypeVar('T')
 
 
 class Pagination(BaseModel, Generic[T]):
     entities: List[T]
-    row_count: int
+    row_count: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class CountMode(str, Enum):
+    # count_documents in a second query
+    EXACT = 'exact'
+    # page and count_documents in a single aggregation
+    FACET = 'facet'
+    # collection metadata when unfiltered, otherwise like CACHED
+    ESTIMATED = 'estimated'
+    # count_documents cached for a few seconds by query
+    CACHED = 'cached'
+
+
+class FileFormat(str, Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+class ImportRowError(BaseModel):
+    # 1-based, not counting the CSV header
+    row: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    inserted: int = 0
+    errors: List[ImportRowError] = []
+
+
+class RowCount(BaseModel):
+    with_count: bool = True
+    mode: CountMode = CountMode.EXACT
+
+
+# Row counts by (collection, normalized query), see count_rows
+count_cache: TTLCache[Tuple[str, str], int] = TTLCache(
+    settings.count_cache_size, settings.count_cache_ttl)
+
+# Change counters by collection, kept in the collection_versions collection
+# so the writes of every process change them and cached for
+# settings.etag_version_ttl, see Conditional
+collection_versions: TTLCache[str, str] = TTLCache(
+    128, settings.etag_version_ttl)
+
+
+class TrustedResponse(OrjsonResponse):
+    '''
+    JSON response for models built from trusted rows. Returning it skips the
+    validation FastAPI runs against the response model, which still
+    documents the route.
+    '''
+
+    def render(self, content: BaseModel) -> bytes:
+        return super().render(content.dict())
 
 
 def Page():
@@ -21,3 +99,441 @@ def PageSize(default=10):
 
 def OrderBy():
     return Query([])
+
+
+def Cursor():
+    return Query(None, description='Opaque next_cursor of the previous page')
+
+
+def _row_count(with_count: bool = Query(True),
+               count_mode: CountMode = Query(CountMode.EXACT)) -> RowCount:
+    return RowCount(with_count=with_count, mode=count_mode)
+
+
+def Count():
+    return Depends(_row_count)
+
+
+def Format():
+    return Query(FileFormat.NDJSON)
+
+
+async def collection_changed(db: Database, *collections: str) -> None:
+    for collection in collections:
+        # The epoch is set when the counter is created, so a counter deleted
+        # and created again never repeats an ETag
+        await db.collection_versions.update_one(
+            {"_id": collection},
+            {"$inc": {"version": 1},
+             "$setOnInsert": {"epoch": secrets.token_hex(4)}},
+            upsert=True)
+        collection_versions.delete(collection)
+
+
+async def collection_version(db: Database, collection: str) -> str:
+    version = collection_versions.get(collection)
+    if version is None:
+        entity = await db.collection_versions.find_one({"_id": collection})
+        version = f"{entity['epoch']}-{entity['version']}" \
+            if entity is not None else "0"
+        collection_versions.set(collection, version)
+    return version
+
+
+def collection_etag(version: str, request: Request) -> str:
+    # The day is part of it because bed status depends on it
+    url = request.url
+    digest = hashlib.blake2b(f"{url.path}?{url.query}|{date.today()}".encode(),
+                             digest_size=8).hexdigest()
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag in ('*', etag, f'W/{etag}') for tag in tags)
+
+
+def Conditional(collection: str, cache_control: Optional[str] = None):
+    '''
+    Router dependency giving GET responses a strong ETag from the collection
+    change counter. A matching If-None-Match is answered with 304 before the
+    collection is queried. The ETag is taken before the query and the
+    counter is bumped after the write, so stale rows never get a newer ETag.
+    '''
+    async def conditional(request: Request,
+                          db: Database = Depends(get_db)) -> None:
+        if request.method not in ('GET', 'HEAD'):
+            return
+        version = await collection_version(db, collection)
+        headers = {'ETag': collection_etag(version, request)}
+        if cache_control:
+            headers['Cache-Control'] = cache_control
+        if etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+            raise NotModifiedError(headers)
+        request.state.response_headers = headers
+    return Depends(conditional)
+
+
+def cursor_match(query: dict, sort: List[tuple],
+                 cursor: Optional[str]) -> dict:
+    '''
+    Add the keyset condition of `cursor` to `query`. `sort` must already
+    be total, see keyset_sort.
+    '''
+    if cursor is None:
+        return query
+    try:
+        values = decode_cursor(cursor, sort)
+    except ValueError as e:
+        raise DomainError(str(e))
+    seek = keyset_query(sort, values)
+    return {"$and": [query, seek]} if query else seek
+
+
+def next_cursor(items: List[dict], sort: List[tuple],
+                page_size: int) -> Optional[str]:
+    if len(items) < page_size:
+        return None
+    return encode_cursor(keyset_values(sort, items[-1]))
+
+
+async def count_rows(collection: AsyncIOMotorCollection, query: dict,
+                     mode: CountMode, *,
+                     rows: Optional[List[dict]] = None) -> int:
+    if mode == CountMode.ESTIMATED and not query and not rows:
+        return await collection.estimated_document_count()
+
+    async def count_documents() -> int:
+        if not rows:
+            return await collection.count_documents(query)
+        result = await collection.aggregate(
+            [{"$match": query}, *rows, {"$count": "value"}]).to_list(None)
+        return next((it["value"] for it in result), 0)
+
+    if mode in (CountMode.ESTIMATED, CountMode.CACHED):
+        key = (collection.name, normalize_query(query))
+        if rows:
+            key += (normalize_query({"rows": rows}),)
+        row_count = count_cache.get(key)
+        if row_count is None:
+            row_count = await count_documents()
+            count_cache.set(key, row_count)
+        return row_count
+    return await count_documents()
+
+
+async def paginate(
+    collection: AsyncIOMotorCollection,
+    Model: Any,
+    query: dict,
+    *,
+    page: int,
+    page_size: int,
+    sort: Optional[List[tuple]] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[dict] = None,
+    rows: Optional[List[dict]] = None,
+    stages: Optional[List[dict]] = None,
+    count: Optional[RowCount] = None,
+    trusted: bool = False,
+) -> Pagination:
+    '''
+    Offset pagination by `page` or keyset pagination by `cursor`, which
+    seeks on (sort keys, _id) and costs the same for every page. `rows`
+    turn every match into the rows paginated, e.g. an $unwind, and must
+    give each row a unique _id. `fields` are computed on every row before
+    the sort, e.g. a relevance score to sort by. `stages` run on the page
+    only, after the limit. `trusted` builds the entities without
+    validation, see model_from_mongo.
+    '''
+    count = count or RowCount()
+    sort = keyset_sort(sort or [])
+    rows = rows or []
+    computed = [{"$addFields": fields}] if fields else []
+    page_stages = [
+        {"$sort": dict(sort)},
+        {"$skip": 0 if cursor is not None else (page - 1) * page_size},
+        {"$limit": page_size},
+        *(stages or []),
+    ]
+    row_count = None
+    if count.with_count and count.mode == CountMode.FACET:
+        if cursor is not None:
+            page_stages.insert(0, {"$match": cursor_match({}, sort, cursor)})
+        result = await collection.aggregate([
+            {"$match": query},
+            *rows,
+            {"$facet": {
+                "entities": [*computed, *page_stages],
+                "row_count": [{"$count": "value"}],
+            }},
+        ]).to_list(None)
+        items = result[0]["entities"]
+        row_count = next(
+            (it["value"] for it in result[0]["row_count"]), 0)
+    else:
+        if (rows or computed) and cursor is not None:
+            # The cursor may seek on a computed field or a field of the rows
+            match = [{"$match": query}, *rows, *computed,
+                     {"$match": cursor_match({}, sort, cursor)}]
+        else:
+            match = [{"$match": cursor_match(query, sort, cursor)},
+                     *rows, *computed]
+        items = await collection.aggregate([*match, *page_stages]).to_list(None)
+        if count.with_count:
+            row_count = await count_rows(collection, query, count.mode,
+                                         rows=rows)
+    return Pagination.construct(
+        entities=many_model_from_mongo(Model, items, trusted),
+        row_count=row_count,
+        next_cursor=next_cursor(items, sort, page_size))
+
+
+def csv_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value, default=json_default).decode('utf-8')
+    return value
+
+
+def encode_rows(rows: List[dict], fields: List[str],
+                format: FileFormat) -> bytes:
+    if format == FileFormat.NDJSON:
+        return b''.join(orjson.dumps(row, default=json_default) + b'\n'
+                        for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([csv_value(row[field]) for field in fields]
+                     for row in rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+async def export_rows(collection: AsyncIOMotorCollection, Model: Any,
+                      query: dict, format: FileFormat) -> AsyncIterator[bytes]:
+    '''
+    Encodes every match straight from the cursor, one chunk per batch, so
+    the whole result is never in memory. Only the fields of Model are read.
+    '''
+    fields = list(Model.__fields__)
+    projection = {field: 1 for field in fields if field != 'id'}
+    if format == FileFormat.CSV:
+        yield encode_rows([dict(zip(fields, fields))], fields, format)
+    cursor = collection.find(query, projection, sort=[('_id', 1)],
+                             batch_size=settings.export_batch_size)
+    try:
+        rows = []
+        async for item in cursor:
+            rows.append(model_from_mongo(Model, item, trusted=True).dict())
+            if len(rows) == settings.export_batch_size:
+                yield encode_rows(rows, fields, format)
+                rows = []
+        if rows:
+            yield encode_rows(rows, fields, format)
+    finally:
+        await cursor.close()
+
+
+def export(collection: AsyncIOMotorCollection, Model: Any, query: dict, *,
+           format: FileFormat, filename: str) -> StreamingResponse:
+    media_type = 'application/x-ndjson' if format == FileFormat.NDJSON \
+        else 'text/csv; charset=utf-8'
+    return StreamingResponse(
+        export_rows(collection, Model, query, format), media_type=media_type,
+        headers={'Content-Disposition':
+                 f'attachment; filename="{filename}.{format.value}"'})
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    pending = b''
+    number = 0
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            number += 1
+            yield decode_line(line, number)
+    if pending:
+        yield decode_line(pending, number + 1)
+
+
+def decode_line(line: bytes, number: int) -> str:
+    try:
+        text = line.decode('utf-8').rstrip('\r')
+    except UnicodeDecodeError:
+        raise DomainError(f'Invalid UTF-8 at line {number}')
+    return text.lstrip('\ufeff') if number == 1 else text
+
+
+async def read_rows(
+    chunks: AsyncIterator[bytes],
+    format: FileFormat
+) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    '''
+    Parses the uploaded chunks as they arrive into (row, data, error)
+    tuples. CSV rows are keyed by the header, quoted fields may span lines.
+    '''
+    row = 0
+    if format == FileFormat.NDJSON:
+        async for line in read_lines(chunks):
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                data = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield row, None, f'Invalid JSON: {e}'
+                continue
+            if isinstance(data, dict):
+                yield row, data, None
+            else:
+                yield row, None, 'Expected an object'
+        return
+    header = None
+    record: List[str] = []
+    quotes = 0
+    async for line in read_lines(chunks):
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            # A quoted field goes on in the next line
+            continue
+        values = next(csv.reader(['\n'.join(record)]), [])
+        record, quotes = [], 0
+        if not any(values):
+            continue
+        if header is None:
+            header = values
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, None, f'Expected {len(header)} columns, got {len(values)}'
+        else:
+            yield row, dict(zip(header, values)), None
+
+
+def validation_message(e: ValidationError) -> str:
+    return '; '.join(f"{'.'.join(map(str, it['loc']))}: {it['msg']}"
+                     for it in e.errors())
+
+
+async def import_rows(
+    collection: AsyncIOMotorCollection,
+    rows: AsyncIterator[Tuple[int, Optional[dict], Optional[str]]],
+    Store: Any,
+    document: Callable[[Any], dict],
+    *,
+    unique: str,
+    entity: str
+) -> ImportResult:
+    '''
+    Validates rows against Store and inserts them by chunks of
+    settings.import_batch_size, with one query for the `unique` values
+    already stored and one insert_many(ordered=False) per chunk. Rows that
+    fail are reported without stopping the import.
+    '''
+    result = ImportResult()
+    chunk: List[Tuple[int, dict]] = []
+    # Unique values inserted by this import, the previous chunks included
+    seen = set()
+
+    async def insert_chunk() -> None:
+        values = [data[unique] for _, data in chunk]
+        existing = {it[unique] for it in await collection.find(
+            {unique: {"$in": values}}, {unique: 1}).to_list(None)}
+        documents, numbers = [], []
+        for row, data in chunk:
+            if data[unique] in existing or data[unique] in seen:
+                result.errors.append(ImportRowError(
+                    row=row, error=f'{entity} already exists'))
+                continue
+            seen.add(data[unique])
+            documents.append(data)
+            numbers.append(row)
+        if not documents:
+            return
+        failed = {}
+        try:
+            await collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                failed[error['index']] = (
+                    f'{entity} already exists' if error['code'] == 11000
+                    else error['errmsg'])
+        for index, message in failed.items():
+            result.errors.append(ImportRowError(row=numbers[index], error=message))
+        result.inserted += len(documents) - len(failed)
+
+    try:
+        async for row, data, error in rows:
+            if error is None:
+                try:
+                    chunk.append((row, document(Store(**data))))
+                except ValidationError as e:
+                    error = validation_message(e)
+            if error is not None:
+                result.errors.append(ImportRowError(row=row, error=error))
+            if len(chunk) == settings.import_batch_size:
+                await insert_chunk()
+                chunk = []
+        if chunk:
+            await insert_chunk()
+    finally:
+        if result.inserted:
+            await collection_changed(collection.database, collection.name)
+    result.errors.sort(key=lambda it: it.row)
+    return result
+
+
+async def insert_entity(collection: AsyncIOMotorCollection, Model: Any,
+                        data: dict, *, session: Optional[Session] = None) -> Any:
+    # insert_one sets data["_id"], so the inserted document is the response
+    await collection.insert_one(data, session=session)
+    return model_from_mongo(Model, data)
+
+
+async def update_entity(collection: AsyncIOMotorCollection, Model: Any,
+                        query: dict, update: Any, *,
+                        session: Optional[Session] = None) -> Optional[Any]:
+    entity = await collection.find_one_and_update(
+        query, update, return_document=ReturnDocument.AFTER, session=session)
+    if entity is None:
+        return None
+    return model_from_mongo(Model, entity)
+
+
+async def rebuild_computed_fields(collection: AsyncIOMotorCollection,
+                                  fields: List[str],
+                                  compute: Callable[[dict], dict], *,
+                                  batch_size: int = 1000) -> int:
+    '''
+    Sets the fields `compute` derives from `fields` on every document, for
+    the documents stored before they were computed on write.
+    '''
+    updated = 0
+    batch = []
+    async for item in collection.find({}, {field: 1 for field in fields}):
+        batch.append(UpdateOne({"_id": item["_id"]}, {"$set": compute(item)}))
+        if len(batch) == batch_size:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+
+async def ensure_exist(db: Database, collection: str, ids: Iterable[str], *,
+                       entity: Optional[str] = None) -> None:
+    '''
+    Checks every id with a single query and reports all the missing ones.
+    '''
+    ids = set(ids)
+    object_ids = [ObjectId(it) for it in ids if ObjectId.is_valid(it)]
+    found = await db[collection].find(
+        {"_id": {"$in": object_ids}}, {"_id": 1}).to_list(None)
+    missing = ids - {str(it["_id"]) for it in found}
+    if missing:
+        raise NotFoundError(
+            f"{entity or collection} not found: {', '.join(sorted(missing))}")
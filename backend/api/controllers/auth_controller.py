@@ -11,19 +11,19 @@ router = APIRouter(prefix='/auth', tags=['Auth'])
 
 
 @router.post('/login')
-def auth_login(body: OAuth2PasswordRequestForm = Depends(),
-               db: Database = Depends(get_db)) -> AuthLoginResponse:
-    return auth_service.auth_login(body, db)
+async def auth_login(body: OAuth2PasswordRequestForm = Depends(),
+                     db: Database = Depends(get_db)) -> AuthLoginResponse:
+    return await auth_service.auth_login(body, db)
 
 
 @router.get('/me')
-def auth_me(db: Database = Depends(get_db),
-            token_data: TokenData = Depends(jwt_service.decode_token)) -> UserResponse:
-    return auth_service.auth_me(db, token_data)
+async def auth_me(db: Database = Depends(get_db),
+                  token_data: TokenData = Depends(jwt_service.decode_token)) -> UserResponse:
+    return await auth_service.auth_me(db, token_data)
 
 
 @router.post('/refresh')
-def auth_refresh(
+async def auth_refresh(
     token_data: TokenData = Depends(jwt_service.decode_token)
 ) -> AuthLoginResponse:
-    return auth_service.auth_refresh(token_data)
+    return await auth_service.auth_refresh(token_data)
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, Depends, Path, Query
+from datetime import date
+from typing import Optional
 
+from fastapi import APIRouter, Depends, Path, Query, Response
+from fastapi.responses import StreamingResponse
+
+import api.services.bed_intervals_service as bed_intervals_service
 import api.services.bed_schedules_service as bed_schedules_service
 import api.services.jwt_service as jwt_service
-from api.concerns import Page, PageSize, Pagination
+from api.concerns import (Count, Cursor, FileFormat, Format, Page, PageSize,
+                          Pagination, RowCount)
 from api.database import Database, get_db
+from api.responses import OrjsonResponse
+from api.services.bed_intervals_service import GroundBed
 from api.services.bed_schedules_service import (BedScheduleAdjust,
                                                 BedScheduleClose, BedSchedules,
                                                 BedScheduleStore,
@@ -16,61 +24,90 @@ router = APIRouter(
 )
 
 
+@router.get("/availability", response_model=Pagination[GroundBed])
+async def bed_availability(
+    start_at: date = Query(...),
+    end_at: date = Query(...),
+    ground_id: Optional[str] = Query(None),
+    page: int = Page(),
+    page_size: int = PageSize(),
+    cursor: Optional[str] = Cursor(),
+    count: RowCount = Count(),
+    db: Database = Depends(get_db)
+) -> Response:
+    return OrjsonResponse(await bed_intervals_service.bed_availability(
+        start_at, end_at, page, page_size, db, ground_id=ground_id,
+        cursor=cursor, count=count))
+
+
+@router.get("/export")
+async def bed_schedules_export(
+    format: FileFormat = Format(),
+    ground_id: Optional[str] = Query(None),
+    bed_label: Optional[str] = Query(None),
+    db: Database = Depends(get_db)
+) -> StreamingResponse:
+    return bed_schedules_service.bed_schedules_export(
+        ground_id, bed_label, format, db)
+
+
 @router.get("/{bed_schedule_id}")
-def bed_schedules_show(
+async def bed_schedules_show(
         bed_schedule_id: str = Path(...),
         db: Database = Depends(get_db)) -> BedSchedules:
-    return bed_schedules_service.bed_schedules_show(bed_schedule_id, db)
+    return await bed_schedules_service.bed_schedules_show(bed_schedule_id, db)
 
 
-@router.get("/")
-def bed_schedules_index(
+@router.get("/", response_model=Pagination[BedSchedules])
+async def bed_schedules_index(
     page: int = Page(),
     page_size: int = PageSize(),
+    cursor: Optional[str] = Cursor(),
+    count: RowCount = Count(),
     ground_id: str = Query(...),
     bed_label: str = Query(...),
     db: Database = Depends(get_db)
-) -> Pagination[BedSchedules]:
-    return bed_schedules_service.bed_schedules_index(
-        page, page_size, ground_id, bed_label, db)
+) -> Response:
+    return OrjsonResponse(await bed_schedules_service.bed_schedules_index(
+        page, page_size, ground_id, bed_label, db, cursor=cursor, count=count))
 
 
 @router.post("/", status_code=201)
-def bed_schedules_store(
+async def bed_schedules_store(
         body: BedScheduleStore,
         db: Database = Depends(get_db)) -> BedSchedules:
-    return bed_schedules_service.bed_schedules_store(body, db)
+    return await bed_schedules_service.bed_schedules_store(body, db)
 
 
 @router.put("/{bed_schedule_id}", status_code=200)
-def bed_schedules_update(
+async def bed_schedules_update(
         update: BedScheduleUpdate,
         bed_schedule_id: str = Path(...),
         db: Database = Depends(get_db)) -> BedSchedules:
-    return bed_schedules_service.bed_schedules_update(
+    return await bed_schedules_service.bed_schedules_update(
         bed_schedule_id, update, db)
 
 
 @router.patch("/{bed_schedule_id}/adjust", status_code=200)
-def bed_schedules_adjust(
+async def bed_schedules_adjust(
         update: BedScheduleAdjust,
         bed_schedule_id: str = Path(...),
         db: Database = Depends(get_db)) -> BedSchedules:
-    return bed_schedules_service.bed_schedules_adjust(
+    return await bed_schedules_service.bed_schedules_adjust(
         bed_schedule_id, update, db)
 
 
 @router.patch("/{bed_schedule_id}/close", status_code=200)
-def bed_schedules_close(
+async def bed_schedules_close(
         update: BedScheduleClose,
         bed_schedule_id: str = Path(...),
         db: Database = Depends(get_db)) -> BedSchedules:
-    return bed_schedules_service.bed_schedules_close(
+    return await bed_schedules_service.bed_schedules_close(
         bed_schedule_id, update, db)
 
 
 @router.delete("/{bed_schedule_id}", status_code=204)
-def bed_schedules_delete(
+async def bed_schedules_delete(
         bed_schedule_id: str = Path(...),
         db: Database = Depends(get_db)) -> None:
-    return bed_schedules_service.bed_schedules_delete(bed_schedule_id, db)
+    return await bed_schedules_service.bed_schedules_delete(bed_schedule_id, db)
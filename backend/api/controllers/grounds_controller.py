@@ -1,54 +1,77 @@
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, Path, Query
+from fastapi import APIRouter, Body, Depends, Path, Query, Response
 
 import api.services.grounds_service as grounds_service
 import api.services.jwt_service as jwt_service
-from api.concerns import OrderBy, Page, PageSize, Pagination
+from api.concerns import (Conditional, Count, Cursor, OrderBy, Page, PageSize,
+                          Pagination, RowCount, TrustedResponse)
 from api.database import Database, get_db
-from api.services.grounds_service import (Ground, GroundOrderBy, GroundStore,
-                                          GroundUpdate)
+from api.env import settings
+from api.responses import OrjsonResponse
+from api.services.grounds_service import (BedStatus, Ground, GroundBed,
+                                          GroundInclude, GroundOrderBy,
+                                          GroundStore, GroundUpdate)
 
 router = APIRouter(
     prefix="/grounds",
     tags=["Grounds"],
-    dependencies=[Depends(jwt_service.decode_token)]
+    dependencies=[Depends(jwt_service.decode_token),
+                  Conditional('grounds', settings.grounds_cache_control)]
 )
 
 
+@router.get("/beds", response_model=Pagination[GroundBed])
+async def ground_beds_index(
+    page: int = Page(),
+    page_size: int = PageSize(),
+    cursor: Optional[str] = Cursor(),
+    count: RowCount = Count(),
+    status: List[BedStatus] = Query([]),
+    db: Database = Depends(get_db)
+) -> Response:
+    return OrjsonResponse(await grounds_service.ground_beds_index(
+        page, page_size, status, db, cursor=cursor, count=count))
+
+
 @router.get("/{ground_id}")
-def ground_show(
+async def ground_show(
         ground_id: str = Path(...),
         db: Database = Depends(get_db)) -> Ground:
-    return grounds_service.ground_show(ground_id, db)
+    return await grounds_service.ground_show(ground_id, db)
 
 
-@router.get("/")
-def ground_index(
+@router.get("/", response_model=Pagination[Ground])
+async def ground_index(
     page: int = Page(),
     page_size: int = PageSize(),
+    cursor: Optional[str] = Cursor(),
+    count: RowCount = Count(),
     order_by: List[GroundOrderBy] = OrderBy(),
     search: Optional[str] = Query(None),
+    include: List[GroundInclude] = Query([]),
     db: Database = Depends(get_db)
-) -> Pagination[Ground]:
-    return grounds_service.ground_index(page, page_size, order_by, search, db)
+) -> Response:
+    return TrustedResponse(await grounds_service.ground_index(
+        page, page_size, order_by, search, db, cursor=cursor, count=count,
+        include=include))
 
 
 @router.post("/", status_code=201)
-def ground_store(ground: GroundStore,
-                 db: Database = Depends(get_db)) -> Ground:
-    return grounds_service.ground_store(ground, db)
+async def ground_store(ground: GroundStore,
+                       db: Database = Depends(get_db)) -> Ground:
+    return await grounds_service.ground_store(ground, db)
 
 
 @router.put("/{ground_id}", status_code=200)
-def ground_update(ground_id: str = Path(...),
-                  update: GroundUpdate = Body(...),
-                  db: Database = Depends(get_db)) -> Ground:
-    return grounds_service.ground_update(ground_id, update, db)
+async def ground_update(ground_id: str = Path(...),
+                        update: GroundUpdate = Body(...),
+                        db: Database = Depends(get_db)) -> Ground:
+    return await grounds_service.ground_update(ground_id, update, db)
 
 
 @router.delete("/{ground_id}", status_code=204)
-def ground_delete(ground_id: str = Path(...),
-                  db: Database = Depends(get_db)) -> None:
-    return grounds_service.ground_delete(ground_id, db)
+async def ground_delete(ground_id: str = Path(...),
+                        db: Database = Depends(get_db)) -> None:
+    return await grounds_service.ground_delete(ground_id, db)
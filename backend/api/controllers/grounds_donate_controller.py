@@ -1,10 +1,13 @@
 
-from fastapi import APIRouter, Body, Depends, Path
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Path, Response
 
 import api.services.grounds_donate_service as grounds_donate_service
 import api.services.jwt_service as jwt_service
-from api.concerns import Page, PageSize, Pagination
+from api.concerns import Count, Cursor, Page, PageSize, Pagination, RowCount
 from api.database import Database, get_db
+from api.responses import OrjsonResponse
 from api.services.grounds_donate_service import (GroundDonate,
                                                  GroundDonateStore,
                                                  GroundDonateUpdate)
@@ -17,39 +20,43 @@ router = APIRouter(
 
 @router.get("/{grounds_donate_id}",
             dependencies=[Depends(jwt_service.decode_token)])
-def grounds_donate_show(
+async def grounds_donate_show(
         grounds_donate_id: str = Path(...),
         db: Database = Depends(get_db)) -> GroundDonate:
-    return grounds_donate_service.grounds_donate_show(grounds_donate_id, db)
+    return await grounds_donate_service.grounds_donate_show(grounds_donate_id, db)
 
 
 @router.get("/",
-            dependencies=[Depends(jwt_service.decode_token)])
-def grounds_donate_index(
+            dependencies=[Depends(jwt_service.decode_token)],
+            response_model=Pagination[GroundDonate])
+async def grounds_donate_index(
     page: int = Page(),
     page_size: int = PageSize(),
+    cursor: Optional[str] = Cursor(),
+    count: RowCount = Count(),
     db: Database = Depends(get_db)
-) -> Pagination[GroundDonate]:
-    return grounds_donate_service.grounds_donate_index(page, page_size, db)
+) -> Response:
+    return OrjsonResponse(await grounds_donate_service.grounds_donate_index(
+        page, page_size, db, cursor=cursor, count=count))
 
 
 @router.post("/", status_code=201)
-def grounds_donate_store(ground: GroundDonateStore,
-                         db: Database = Depends(get_db)) -> GroundDonate:
-    return grounds_donate_service.grounds_donate_store(ground, db)
+async def grounds_donate_store(ground: GroundDonateStore,
+                               db: Database = Depends(get_db)) -> GroundDonate:
+    return await grounds_donate_service.grounds_donate_store(ground, db)
 
 
 @router.put("/{grounds_donate_id}", status_code=200,
             dependencies=[Depends(jwt_service.decode_token)])
-def grounds_donate_update(grounds_donate_id: str = Path(...),
-                          update: GroundDonateUpdate = Body(...),
-                          db: Database = Depends(get_db)) -> GroundDonate:
-    return grounds_donate_service.grounds_donate_update(
+async def grounds_donate_update(grounds_donate_id: str = Path(...),
+                                update: GroundDonateUpdate = Body(...),
+                                db: Database = Depends(get_db)) -> GroundDonate:
+    return await grounds_donate_service.grounds_donate_update(
         grounds_donate_id, update, db)
 
 
 @router.delete("/{grounds_donate_id}", status_code=204,
                dependencies=[Depends(jwt_service.decode_token)])
-def grounds_donate_delete(grounds_donate_id: str = Path(...),
-                          db: Database = Depends(get_db)) -> None:
-    return grounds_donate_service.grounds_donate_delete(grounds_donate_id, db)
+async def grounds_donate_delete(grounds_donate_id: str = Path(...),
+                                db: Database = Depends(get_db)) -> None:
+    return await grounds_donate_service.grounds_donate_delete(grounds_donate_id, db)
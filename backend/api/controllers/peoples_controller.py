@@ -1,12 +1,16 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, Path, Query
+from fastapi import APIRouter, Body, Depends, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 import api.services.jwt_service as jwt_service
 import api.services.peoples_service as peoples_service
-from api.concerns import OrderBy, Page, PageSize, Pagination
+from api.concerns import (Count, Cursor, FileFormat, Format, ImportResult,
+                          OrderBy, Page, PageSize, Pagination, RowCount)
 from api.database import Database, get_db
-from api.services.peoples_service import (People, PeopleOrderBy, PeopleStore,
+from api.responses import OrjsonResponse
+from api.services.peoples_service import (People, PeopleAutocomplete,
+                                          PeopleOrderBy, PeopleStore,
                                           PeopleUpdate)
 
 router = APIRouter(
@@ -16,38 +20,66 @@ router = APIRouter(
 )
 
 
+@router.get("/autocomplete", response_model=List[PeopleAutocomplete])
+async def people_autocomplete(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=20),
+    db: Database = Depends(get_db)
+) -> Response:
+    return OrjsonResponse(await peoples_service.people_autocomplete(q, limit, db))
+
+
+@router.get("/export")
+async def people_export(
+    format: FileFormat = Format(),
+    search: Optional[str] = Query(None),
+    db: Database = Depends(get_db)
+) -> StreamingResponse:
+    return peoples_service.people_export(search, format, db)
+
+
 @router.get("/{people_id}")
-def people_show(
+async def people_show(
         people_id: str = Path(...),
         db: Database = Depends(get_db)) -> People:
-    return peoples_service.people_show(people_id, db)
+    return await peoples_service.people_show(people_id, db)
 
 
-@router.get("/")
-def people_index(
+@router.get("/", response_model=Pagination[People])
+async def people_index(
     page: int = Page(),
     page_size: int = PageSize(),
+    cursor: Optional[str] = Cursor(),
+    count: RowCount = Count(),
     order_by: List[PeopleOrderBy] = OrderBy(),
     search: Optional[str] = Query(None),
     db: Database = Depends(get_db)
-) -> Pagination[People]:
-    return peoples_service.people_index(page, page_size, order_by, search, db)
+) -> Response:
+    return OrjsonResponse(await peoples_service.people_index(
+        page, page_size, order_by, search, db, cursor=cursor, count=count))
+
+
+@router.post("/import", status_code=201)
+async def people_import(request: Request,
+                        format: FileFormat = Format(),
+                        db: Database = Depends(get_db)) -> ImportResult:
+    return await peoples_service.people_import(request.stream(), format, db)
 
 
 @router.post("/", status_code=201)
-def people_store(people: PeopleStore,
-                 db: Database = Depends(get_db)) -> People:
-    return peoples_service.people_store(people, db)
+async def people_store(people: PeopleStore,
+                       db: Database = Depends(get_db)) -> People:
+    return await peoples_service.people_store(people, db)
 
 
 @router.put("/{people_id}", status_code=200)
-def people_update(people_id: str = Path(...),
-                  update: PeopleUpdate = Body(...),
-                  db: Database = Depends(get_db)) -> People:
-    return peoples_service.people_update(people_id, update, db)
+async def people_update(people_id: str = Path(...),
+                        update: PeopleUpdate = Body(...),
+                        db: Database = Depends(get_db)) -> People:
+    return await peoples_service.people_update(people_id, update, db)
 
 
 @router.delete("/{people_id}", status_code=204)
-def people_delete(people_id: str = Path(...),
-                  db: Database = Depends(get_db)) -> None:
-    return peoples_service.people_delete(people_id, db)
+async def people_delete(people_id: str = Path(...),
+                        db: Database = Depends(get_db)) -> None:
+    return await peoples_service.people_delete(people_id, db)
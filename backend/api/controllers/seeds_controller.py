@@ -1,49 +1,64 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, Path, Query
+from fastapi import APIRouter, Body, Depends, Path, Query, Request, Response
 
 import api.services.jwt_service as jwt_service
 import api.services.seeds_service as seeds_service
-from api.concerns import OrderBy, Page, PageSize, Pagination
+from api.concerns import (Conditional, Count, Cursor, FileFormat, Format,
+                          ImportResult, OrderBy, Page, PageSize, Pagination,
+                          RowCount)
 from api.database import Database, get_db
+from api.env import settings
+from api.responses import OrjsonResponse
 from api.services.seeds_service import Seed, SeedOrderBy, SeedStore, SeedUpdate
 
 router = APIRouter(
     prefix="/seeds",
     tags=["Seeds"],
-    dependencies=[Depends(jwt_service.decode_token)]
+    dependencies=[Depends(jwt_service.decode_token),
+                  Conditional('seeds', settings.seeds_cache_control)]
 )
 
 
 @router.get("/{seed_id}")
-def seed_show(seed_id: str = Path(...),
-              db: Database = Depends(get_db)) -> Seed:
-    return seeds_service.seed_show(seed_id, db)
+async def seed_show(seed_id: str = Path(...),
+                    db: Database = Depends(get_db)) -> Seed:
+    return await seeds_service.seed_show(seed_id, db)
 
 
-@router.get("/")
-def seed_index(page: int = Page(),
-               page_size: int = PageSize(),
-               order_by: List[SeedOrderBy] = OrderBy(),
-               search: Optional[str] = Query(None),
-               db: Database = Depends(get_db)) -> Pagination[Seed]:
-    return seeds_service.seed_index(page, page_size, order_by, search, db)
+@router.get("/", response_model=Pagination[Seed])
+async def seed_index(page: int = Page(),
+                     page_size: int = PageSize(),
+                     cursor: Optional[str] = Cursor(),
+                     count: RowCount = Count(),
+                     order_by: List[SeedOrderBy] = OrderBy(),
+                     search: Optional[str] = Query(None),
+                     db: Database = Depends(get_db)) -> Response:
+    return OrjsonResponse(await seeds_service.seed_index(
+        page, page_size, order_by, search, db, cursor=cursor, count=count))
+
+
+@router.post("/import", status_code=201)
+async def seed_import(request: Request,
+                      format: FileFormat = Format(),
+                      db: Database = Depends(get_db)) -> ImportResult:
+    return await seeds_service.seed_import(request.stream(), format, db)
 
 
 @router.post("/", status_code=201)
-def seed_store(seed: SeedStore,
-               db: Database = Depends(get_db)) -> Seed:
-    return seeds_service.seed_store(seed, db)
+async def seed_store(seed: SeedStore,
+                     db: Database = Depends(get_db)) -> Seed:
+    return await seeds_service.seed_store(seed, db)
 
 
 @router.put("/{seed_id}", status_code=200)
-def seed_update(seed_id: str = Path(...),
-                update: SeedUpdate = Body(...),
-                db: Database = Depends(get_db)) -> Seed:
-    return seeds_service.seed_update(seed_id, update, db)
+async def seed_update(seed_id: str = Path(...),
+                      update: SeedUpdate = Body(...),
+                      db: Database = Depends(get_db)) -> Seed:
+    return await seeds_service.seed_update(seed_id, update, db)
 
 
 @router.delete("/{seed_id}", status_code=204)
-def seed_delete(seed_id: str = Path(...),
-                db: Database = Depends(get_db)) -> None:
-    return seeds_service.seed_delete(seed_id, db)
+async def seed_delete(seed_id: str = Path(...),
+                      db: Database = Depends(get_db)) -> None:
+    return await seeds_service.seed_delete(seed_id, db)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Body, Depends, Path
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Path, Response
 
 import api.services.jwt_service as jwt_service
 import api.services.users_service as users_service
-from api.concerns import Page, PageSize, Pagination
+from api.concerns import Count, Cursor, Page, PageSize, Pagination, RowCount
 from api.database import Database, get_db
+from api.responses import OrjsonResponse
 from api.services.users_service import UserResponse, UserStore, UserUpdate
 
 router = APIRouter(
@@ -14,35 +17,38 @@ router = APIRouter(
 
 
 @router.get("/{user_id}")
-def user_show(
+async def user_show(
         user_id: str = Path(...),
         db: Database = Depends(get_db)) -> UserResponse:
-    return users_service.user_show(user_id, db)
+    return await users_service.user_show(user_id, db)
 
 
-@router.get("/")
-def user_index(
+@router.get("/", response_model=Pagination[UserResponse])
+async def user_index(
     page: int = Page(),
     page_size: int = PageSize(),
+    cursor: Optional[str] = Cursor(),
+    count: RowCount = Count(),
     db: Database = Depends(get_db)
-) -> Pagination[UserResponse]:
-    return users_service.user_index(page, page_size, db)
+) -> Response:
+    return OrjsonResponse(await users_service.user_index(
+        page, page_size, db, cursor=cursor, count=count))
 
 
 @router.post("/", status_code=201)
-def user_store(user: UserStore,
-               db: Database = Depends(get_db)) -> UserResponse:
-    return users_service.user_store(user, db)
+async def user_store(user: UserStore,
+                     db: Database = Depends(get_db)) -> UserResponse:
+    return await users_service.user_store(user, db)
 
 
 @router.put("/{user_id}", status_code=200)
-def user_update(user_id: str = Path(...),
-                update: UserUpdate = Body(...),
-                db: Database = Depends(get_db)) -> UserResponse:
-    return users_service.user_update(user_id, update, db)
+async def user_update(user_id: str = Path(...),
+                      update: UserUpdate = Body(...),
+                      db: Database = Depends(get_db)) -> UserResponse:
+    return await users_service.user_update(user_id, update, db)
 
 
 @router.delete("/{user_id}", status_code=204)
-def user_delete(user_id: str = Path(...),
-                db: Database = Depends(get_db)) -> None:
-    return users_service.user_delete(user_id, db)
+async def user_delete(user_id: str = Path(...),
+                      db: Database = Depends(get_db)) -> None:
+    return await users_service.user_delete(user_id, db)
@@ -1,11 +1,12 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Path, Query
+from fastapi import APIRouter, Depends, Path, Query, Response
 
 import api.services.jwt_service as jwt_service
 import api.services.voluntaries_using_seeds_service as voluntaries_using_seeds_service
-from api.concerns import Page, PageSize, Pagination
+from api.concerns import Count, Cursor, Page, PageSize, Pagination, RowCount
 from api.database import Database, get_db
+from api.responses import OrjsonResponse
 from api.services.voluntaries_using_seeds_service import (
     VoluntaryUsingSeed, VoluntaryUsingSeedStart)
 
@@ -17,50 +18,53 @@ router = APIRouter(
 
 
 @router.get("/{voluntary_using_seed_id}")
-def voluntary_using_seed_show(
+async def voluntary_using_seed_show(
         voluntary_using_seed_id: str = Path(...),
         db: Database = Depends(get_db)) -> VoluntaryUsingSeed:
-    return voluntaries_using_seeds_service.voluntary_using_seed_show(
+    return await voluntaries_using_seeds_service.voluntary_using_seed_show(
         voluntary_using_seed_id, db)
 
 
-@router.get("/")
-def voluntary_using_seed_index(
+@router.get("/", response_model=Pagination[VoluntaryUsingSeed])
+async def voluntary_using_seed_index(
     page: int = Page(),
     page_size: int = PageSize(),
+    cursor: Optional[str] = Cursor(),
+    count: RowCount = Count(),
     voluntary_id: Optional[str] = Query(None),
     seed_id: Optional[str] = Query(None),
     ground_id: Optional[str] = Query(None),
     bed_label: Optional[str] = Query(None),
     db: Database = Depends(get_db)
-) -> Pagination[VoluntaryUsingSeed]:
-    return voluntaries_using_seeds_service.voluntary_using_seed_index(
+) -> Response:
+    return OrjsonResponse(await voluntaries_using_seeds_service.voluntary_using_seed_index(
         page, page_size, db,
         voluntary_id=voluntary_id,
         seed_id=seed_id,
         ground_id=ground_id,
-        bed_label=bed_label)
+        bed_label=bed_label,
+        cursor=cursor, count=count))
 
 
 @router.post("/start")
-def voluntary_using_seed_start(
+async def voluntary_using_seed_start(
         voluntary_using_seed: VoluntaryUsingSeedStart,
         db: Database = Depends(get_db)) -> VoluntaryUsingSeed:
-    return voluntaries_using_seeds_service.voluntary_using_seed_start(
+    return await voluntaries_using_seeds_service.voluntary_using_seed_start(
         voluntary_using_seed, db)
 
 
 @router.put("/end/{voluntary_using_seed_id}")
-def voluntary_using_seed_end(
+async def voluntary_using_seed_end(
         voluntary_using_seed_id: str = Path(...),
         db: Database = Depends(get_db)) -> VoluntaryUsingSeed:
-    return voluntaries_using_seeds_service.voluntary_using_seed_end(
+    return await voluntaries_using_seeds_service.voluntary_using_seed_end(
         voluntary_using_seed_id, db)
 
 
 @router.delete("/{voluntary_using_seed_id}", status_code=204)
-def voluntary_using_seed_delete(
+async def voluntary_using_seed_delete(
         voluntary_using_seed_id: str = Path(...),
         db: Database = Depends(get_db)) -> None:
-    return voluntaries_using_seeds_service.voluntary_using_seed_delete(
+    return await voluntaries_using_seeds_service.voluntary_using_seed_delete(
         voluntary_using_seed_id, db)
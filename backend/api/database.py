@@ -1,14 +1,43 @@
-from typing import Any, Generator
+import asyncio
+from typing import Any, AsyncGenerator, Awaitable, Callable, Optional, TypeVar
 
-# alternatively to pymongo, use motor.motor_asyncio.AsyncIOMotorClient to
-# use async/await
-from pymongo import MongoClient
-from pymongo.database import Database
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
+from motor.motor_asyncio import AsyncIOMotorDatabase as Database
 
 from api.env import settings
 
-mongo_client = MongoClient(settings.mongo_uri)
+__all__ = ['Database', 'Session', 'get_db', 'get_mongo_client',
+           'run_transaction']
 
+Session = AsyncIOMotorClientSession
+T = TypeVar('T')
 
-def get_db() -> Generator[Database, Any, None]:
-    yield mongo_client.activity
+mongo_client: Optional[AsyncIOMotorClient] = None
+
+
+def get_mongo_client() -> AsyncIOMotorClient:
+    # Motor binds a client to the event loop that first uses it, so a new
+    # client is created when the running loop changes (e.g. TestClient)
+    global mongo_client
+    loop = asyncio.get_running_loop()
+    if mongo_client is None or mongo_client.get_io_loop() is not loop:
+        mongo_client = AsyncIOMotorClient(settings.mongo_uri, io_loop=loop)
+    return mongo_client
+
+
+async def get_db() -> AsyncGenerator[Database, Any]:
+    yield get_mongo_client().activity
+
+
+async def run_transaction(
+        db: Database,
+        callback: Callable[[Optional[Session]], Awaitable[T]]) -> T:
+    '''
+    Runs callback inside a transaction, retried on transient errors, when
+    settings.mongo_transactions is enabled. Otherwise the callback runs
+    without a session and each write is atomic on its own.
+    '''
+    if not settings.mongo_transactions:
+        return await callback(None)
+    async with await db.client.start_session() as session:
+        return await session.with_transaction(callback)
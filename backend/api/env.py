@@ -2,15 +2,41 @@ from pydantic import BaseSettings
 
 # https://pydantic-docs.helpmanual.io/usage/settings/
 
+SECOND = 1000
 HOUR = 1000 * 60 * 60
 DAY = 24 * HOUR
 
 
 class Settings(BaseSettings):
     mongo_uri = "mongodb://localhost:27017"
+    # Multi-document transactions need a replica set or a sharded cluster
+    mongo_transactions = False
     jwt_secret = "secret"
     jwt_expires_in = 2 * HOUR
     jwt_refresh_expires_in = 2 * DAY
+    # Updates and deletes of users in another process reach the cache within
+    # etag_version_ttl, see users_service.user_auth_version
+    auth_cache_ttl = 30 * SECOND
+    auth_cache_size = 1024
+    crypt_workers = 4
+    crypt_queue_size = 32
+    count_cache_ttl = 10 * SECOND
+    count_cache_size = 1024
+    # Rows fetched from mongo and written to the stream at once by exports
+    export_batch_size = 1000
+    # Rows validated and inserted at once by imports
+    import_batch_size = 1000
+    # Sent with the ETag of the catalog routers, no-cache makes clients
+    # revalidate every time, which costs a 304 when nothing changed
+    seeds_cache_control = "private, no-cache"
+    tools_cache_control = "private, no-cache"
+    grounds_cache_control = "private, no-cache"
+    # How long a process may serve ETags of a version changed by another
+    # process, e.g. a second worker or a scripts.py command
+    etag_version_ttl = 1 * SECOND
+    # Also runs at every date change, 0 disables the rollover task, run
+    # `scripts.py beds-rollover` instead
+    beds_rollover_interval = DAY
     production = False
 
 
@@ -1,7 +1,9 @@
-import json
+from typing import Dict
 
 from fastapi import FastAPI, Request, Response
 
+from api.responses import OrjsonResponse
+
 
 class DomainError(Exception):
     status_code = 400
@@ -15,14 +17,33 @@ class AlreadyExistsError(DomainError):
     status_code = 409
 
 
+class ConflictError(DomainError):
+    status_code = 409
+
+
 class UnauthorizedError(DomainError):
     status_code = 401
 
 
+class ServiceUnavailableError(DomainError):
+    status_code = 503
+
+
+class NotModifiedError(Exception):
+    def __init__(self, headers: Dict[str, str]) -> None:
+        super().__init__('Not modified')
+        self.headers = headers
+
+
 def domain_error_handler(_request: Request, exc: DomainError) -> Response:
-    return Response(status_code=exc.status_code, content=json.dumps(
-        {"message": str(exc)}), media_type="application/json")
+    return OrjsonResponse(status_code=exc.status_code,
+                          content={"message": str(exc)})
+
+
+def not_modified_handler(_request: Request, exc: NotModifiedError) -> Response:
+    return Response(status_code=304, headers=exc.headers)
 
 
 def configure(app: FastAPI) -> None:
     app.add_exception_handler(DomainError, domain_error_handler)
+    app.add_exception_handler(NotModifiedError, not_modified_handler)
@@ -7,19 +7,13 @@ from typing import List, Literal, Optional
 
 from pydantic import BaseModel, validator
 
-from api.utilities.mapper import dict_date_fields, id_to_str
+from api.utilities.mapper import id_to_str
 
 
 class Manager(BaseModel):
     start_at: date
     end_at: Optional[date] = None
 
-    def dict(self, *args, **kwargs):
-        # Normalize dict to be an acceptable json
-        data = super().dict(*args, **kwargs)
-        dict_date_fields(data, 'start_at', 'end_at')
-        return data
-
 
 class User(BaseModel):
     id: str
@@ -37,33 +31,56 @@ class BedStatus(str, Enum):
     COMPLETE = 'complete'
 
 
+def bed_status(free: bool, end_at: Optional[date],
+               today: Optional[date] = None) -> BedStatus:
+    if free:
+        return BedStatus.FREE
+    if end_at is not None and end_at < (today or date.today()):
+        return BedStatus.COMPLETE
+    return BedStatus.OCCUPIED
+
+
 class Bed(BaseModel):
     label: str
     active: bool = True
     free: bool = True
     bed_schedules_id: Optional[str] = None
+    # Version of the bed schedules mirrored, see bed_schedules_mirror
+    bed_schedules_version: Optional[int] = None
+    # Bumped by every change of the intervals of the bed, see
+    # grounds_service.ground_claim_bed_intervals
+    intervals_version: Optional[int] = None
     # Sync with current BedSchedule
     seed_id: Optional[str] = None
     end_at: Optional[date] = None
-    # Not persisted
-    status: BedStatus = BedStatus.FREE
+    # Persisted by every bed update, OCCUPIED becomes COMPLETE on the daily
+    # rollover (see grounds_service.ground_beds_rollover)
+    status: Optional[BedStatus] = None
 
     @validator('bed_schedules_id', 'seed_id', pre=True)
     def mongo_id(cls, value):
         return id_to_str(value)
 
-    def dict(self, *args, **kwargs):
-        # Normalize dict to be an acceptable json
-        data = super().dict(*args, **kwargs)
-        dict_date_fields(data, 'end_at')
-        # compute status
-        if self.free:
-            data['status'] = BedStatus.FREE
-        elif self.end_at is not None and self.end_at < date.today():
-            data['status'] = BedStatus.COMPLETE
-        else:
-            data['status'] = BedStatus.OCCUPIED
-        return data
+    @validator('status', pre=True, always=True)
+    def status_or_computed(cls, value, values):
+        # Beds stored before the status was persisted
+        if value is None:
+            return bed_status(values.get('free', True), values.get('end_at'))
+        return value
+
+
+class BedsStatusCount(BaseModel):
+    free: int = 0
+    occupied: int = 0
+    complete: int = 0
+
+
+class GroundBed(Bed):
+    ground_id: str
+
+    @validator('ground_id', pre=True)
+    def ground_mongo_id(cls, value):
+        return id_to_str(value)
 
 
 class Ground(BaseModel):
@@ -77,6 +94,8 @@ class Ground(BaseModel):
     active: bool = True
     beds: List[Bed] = []
     beds_count: int = 0
+    # Only computed by list views
+    beds_status_count: Optional[BedsStatusCount] = None
 
     @validator('owner_id', 'manager_id', pre=True)
     def mongo_id(cls, value):
@@ -92,12 +111,6 @@ class BedSchedule(BaseModel):
     def mongo_id(cls, value):
         return id_to_str(value)
 
-    def dict(self, *args, **kwargs):
-        # Normalize dict to be an acceptable json
-        data = super().dict(*args, **kwargs)
-        dict_date_fields(data, 'start_at', 'end_at')
-        return data
-
 
 class BedSchedules(BaseModel):
     id: str
@@ -106,12 +119,30 @@ class BedSchedules(BaseModel):
     # TODO: Add created_at
     schedules: List[BedSchedule] = []
     current_schedule: Optional[int] = None
+    # Incremented by every change, bed schedules stored before it have none
+    version: int = 0
 
     @validator('ground_id', pre=True)
     def mongo_id(cls, value):
         return id_to_str(value)
 
 
+class BedInterval(BaseModel):
+    # One schedule of a BedSchedules, flattened for range queries
+    id: str
+    bed_schedules_id: str
+    ground_id: str
+    bed_label: str
+    index: int
+    seed_id: str
+    start_at: date
+    end_at: date
+
+    @validator('bed_schedules_id', 'ground_id', 'seed_id', pre=True)
+    def mongo_id(cls, value):
+        return id_to_str(value)
+
+
 class Tool(BaseModel):
     id: str
     name: str
@@ -144,12 +175,6 @@ class Voluntary(BaseModel):
     def mongo_id(cls, value):
         return id_to_str(value)
 
-    def dict(self, *args, **kwargs):
-        # Normalize dict to be an acceptable json
-        data = super().dict(*args, **kwargs)
-        dict_date_fields(data, 'start_at', 'end_at')
-        return data
-
 
 class People(BaseModel):
     id: str
@@ -171,12 +196,6 @@ class VoluntaryUsingTool(BaseModel):
     def mongo_id(cls, value):
         return id_to_str(value)
 
-    def dict(self, *args, **kwargs):
-        # Normalize dict to be an acceptable json
-        data = super().dict(*args, **kwargs)
-        dict_date_fields(data, 'start_at', 'end_at')
-        return data
-
 
 class VoluntaryUsingSeed(BaseModel):
     id: str
@@ -189,12 +208,6 @@ class VoluntaryUsingSeed(BaseModel):
     def mongo_id(cls, value):
         return id_to_str(value)
 
-    def dict(self, *args, **kwargs):
-        # Normalize dict to be an acceptable json
-        data = super().dict(*args, **kwargs)
-        dict_date_fields(data, 'start_at', 'end_at')
-        return data
-
 
 class GroundDonate(BaseModel):
     id: str
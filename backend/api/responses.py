@@ -0,0 +1,54 @@
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from pydantic import BaseModel
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def json_default(value: Any) -> Any:
+    # orjson already encodes date, datetime, enum and uuid natively
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+class OrjsonResponse(Response):
+    '''
+    Default response class of the app. Encodes dates and ObjectIds without
+    going through jsonable_encoder or the models' dict methods.
+    '''
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=json_default,
+                            option=orjson.OPT_NON_STR_KEYS)
+
+
+class StateHeadersMiddleware:
+    '''
+    Adds request.state.response_headers to successful responses, including
+    the ones routes build themselves
+    '''
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message['type'] == 'http.response.start' and \
+                    message['status'] == 200:
+                headers = scope.get('state', {}).get('response_headers')
+                if headers:
+                    MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
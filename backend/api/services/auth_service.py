@@ -31,9 +31,9 @@ class AuthRegister(BaseModel):
         extra = Extra.forbid
 
 
-def auth_login(body: AuthLogin, db: Database) -> AuthLoginResponse:
-    user = users_service.user_auth(db, email=body.username)
-    if not crypt_service.check_password(body.password, user.password):
+async def auth_login(body: AuthLogin, db: Database) -> AuthLoginResponse:
+    user = await users_service.user_auth(db, email=body.username)
+    if not await crypt_service.check_password(body.password, user.password):
         raise UnauthorizedError('Invalid credentials')
     data = {'sub': user.id, 'version': user.version}
     access_token = jwt_service.create_access_token(data)
@@ -42,11 +42,11 @@ def auth_login(body: AuthLogin, db: Database) -> AuthLoginResponse:
                              refresh_token=refresh_token)
 
 
-def auth_me(db: Database, token_data: jwt_service.TokenData) -> UserResponse:
-    return users_service.user_show(token_data.user_id, db)
+async def auth_me(db: Database, token_data: jwt_service.TokenData) -> UserResponse:
+    return await users_service.user_show(token_data.user_id, db)
 
 
-def auth_refresh(token_data: jwt_service.TokenData) -> AuthLoginResponse:
+async def auth_refresh(token_data: jwt_service.TokenData) -> AuthLoginResponse:
     if token_data.type != 'refresh_token':
         raise UnauthorizedError('Invalid token type')
     user = token_data.user
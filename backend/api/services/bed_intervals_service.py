@@ -0,0 +1,154 @@
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, InsertOne
+
+import api.services.grounds_service as grounds_service
+from api.concerns import Pagination, RowCount, paginate
+from api.database import Database, Session
+from api.exceptions import ConflictError, DomainError
+from api.models import BedInterval, BedSchedule, BedSchedules, GroundBed
+from api.utilities.intervals import IntervalIndex
+from api.utilities.mapper import many_model_from_mongo
+
+
+def bed_intervals_from(bed_schedules: BedSchedules) -> List[dict]:
+    return [{
+        "bed_schedules_id": bed_schedules.id,
+        "ground_id": bed_schedules.ground_id,
+        "bed_label": bed_schedules.bed_label,
+        "index": index,
+        "seed_id": schedule.seed_id,
+        "start_at": schedule.start_at.isoformat(),
+        "end_at": schedule.end_at.isoformat(),
+    } for index, schedule in enumerate(bed_schedules.schedules)]
+
+
+async def bed_intervals_sync(bed_schedules: BedSchedules, db: Database, *,
+                             session: Optional[Session] = None) -> None:
+    # Replaces the intervals of the bed schedules in a single round trip
+    await db.bed_intervals.bulk_write([
+        DeleteMany({"bed_schedules_id": bed_schedules.id}),
+        *[InsertOne(it) for it in bed_intervals_from(bed_schedules)],
+    ], session=session)
+
+
+async def bed_intervals_delete(bed_schedules_id: str, db: Database, *,
+                               session: Optional[Session] = None) -> None:
+    await db.bed_intervals.delete_many(
+        {"bed_schedules_id": bed_schedules_id}, session=session)
+
+
+async def bed_intervals_rebuild(db: Database) -> int:
+    await db.bed_intervals.delete_many({})
+    count = 0
+    async for entity in db.bed_schedules.find({}):
+        entity["id"] = str(entity.pop("_id"))
+        intervals = bed_intervals_from(BedSchedules(**entity))
+        if intervals:
+            await db.bed_intervals.insert_many(intervals)
+            count += len(intervals)
+    return count
+
+
+async def bed_intervals_overlapping(
+    start_at: date,
+    end_at: date,
+    db: Database,
+    *,
+    ground_id: Optional[str] = None,
+    bed_label: Optional[str] = None,
+    session: Optional[Session] = None
+) -> List[BedInterval]:
+    # Intervals are half-open, [start_at, end_at)
+    query = {}
+    if ground_id is not None:
+        query["ground_id"] = ground_id
+    if bed_label is not None:
+        query["bed_label"] = bed_label
+    # end_at leads the indexes, so the scan covers only the intervals still
+    # open at start_at instead of every interval started before end_at
+    query["end_at"] = {"$gt": start_at.isoformat()}
+    query["start_at"] = {"$lt": end_at.isoformat()}
+    items = await db.bed_intervals.find(
+        query, session=session).to_list(None)
+    return many_model_from_mongo(BedInterval, items)
+
+
+async def bed_intervals_conflicts(
+    ground_id: str,
+    bed_label: str,
+    schedules: List[BedSchedule],
+    db: Database,
+    *,
+    exclude_bed_schedules_id: Optional[str] = None,
+    session: Optional[Session] = None
+) -> List[Tuple[BedSchedule, BedInterval]]:
+    # One indexed query for the whole plan, then each schedule is checked
+    # against an in-memory interval index of the bed
+    if not schedules:
+        return []
+    existing = await bed_intervals_overlapping(
+        min(it.start_at for it in schedules),
+        max(it.end_at for it in schedules),
+        db, ground_id=ground_id, bed_label=bed_label, session=session)
+    index = IntervalIndex(
+        [it for it in existing
+         if it.bed_schedules_id != exclude_bed_schedules_id],
+        key=lambda it: (it.start_at, it.end_at))
+    return [(schedule, interval)
+            for schedule in schedules
+            for interval in index.overlapping(schedule.start_at, schedule.end_at)]
+
+
+async def bed_intervals_must_not_conflict(
+    ground_id: str,
+    bed_label: str,
+    schedules: List[BedSchedule],
+    db: Database,
+    *,
+    exclude_bed_schedules_id: Optional[str] = None,
+    session: Optional[Session] = None
+) -> None:
+    conflicts = await bed_intervals_conflicts(
+        ground_id, bed_label, schedules, db,
+        exclude_bed_schedules_id=exclude_bed_schedules_id, session=session)
+    if conflicts:
+        raise ConflictError('Schedules conflict with: ' + ', '.join(
+            f"{schedule.start_at}/{schedule.end_at} overlaps "
+            f"{interval.start_at}/{interval.end_at} "
+            f"(bed schedules {interval.bed_schedules_id})"
+            for schedule, interval in conflicts))
+
+
+async def bed_availability(
+    start_at: date,
+    end_at: date,
+    page: int,
+    page_size: int,
+    db: Database,
+    *,
+    ground_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: Optional[RowCount] = None
+) -> Pagination[GroundBed]:
+    if end_at <= start_at:
+        raise DomainError('Start date must be before end date')
+    busy: Dict[str, List[str]] = {}
+    for it in await bed_intervals_overlapping(
+            start_at, end_at, db, ground_id=ground_id):
+        busy.setdefault(it.ground_id, []).append(it.bed_label)
+    # Only the active beds without overlapping intervals leave the database
+    query: dict = {"beds": {"$elemMatch": {"active": {"$ne": False}}}}
+    if ground_id is not None:
+        query["_id"] = ObjectId(ground_id)
+    beds_query: dict = {"beds.active": {"$ne": False}}
+    if busy:
+        beds_query["$nor"] = [
+            {"_id": ObjectId(id), "beds.label": {"$in": labels}}
+            for id, labels in busy.items()]
+    return await paginate(db.grounds, GroundBed, query, page=page,
+                          page_size=page_size, sort=[("_id", 1)],
+                          cursor=cursor, count=count,
+                          rows=grounds_service.ground_bed_rows(beds_query))
@@ -1,17 +1,22 @@
 from datetime import date
-from typing import List
+from typing import Awaitable, Callable, List, Optional, TypeVar
 
 from bson import ObjectId
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, validator
 
+import api.services.bed_intervals_service as bed_intervals_service
 import api.services.grounds_service as grounds_service
-import api.services.seeds_service as seeds_service
-from api.concerns import Pagination
-from api.database import Database
-from api.exceptions import DomainError, NotFoundError
+from api.concerns import (FileFormat, Pagination, RowCount, collection_changed,
+                          ensure_exist, export, insert_entity, paginate,
+                          update_entity)
+from api.database import Database, Session, run_transaction
+from api.exceptions import ConflictError, DomainError, NotFoundError
 from api.models import BedSchedule, BedSchedules, Seed
 from api.services.grounds_service import BedUpdate
-from api.utilities.mapper import many_model_from_mongo, model_from_mongo
+from api.utilities.mapper import model_from_mongo, to_mongo
+
+T = TypeVar('T')
 
 
 class BedScheduleStore(BaseModel):
@@ -28,7 +33,7 @@ class BedScheduleStore(BaseModel):
             if schedule.start_at >= schedule.end_at:
                 raise ValueError('Start date must be before end date')
             if index > 0:
-                if value[index - 1].end_at <= schedule.start_at:
+                if value[index - 1].end_at > schedule.start_at:
                     raise ValueError('Schedules must be sequencial')
         return value
 
@@ -60,141 +65,322 @@ class BedScheduleUpdate(BaseModel):
         return value
 
 
-def bed_schedules_show(bed_schedule_id: str, db: Database) -> BedSchedules:
-    entity = db.bed_schedules.find_one({"_id": ObjectId(bed_schedule_id)})
+async def bed_schedules_show(bed_schedule_id: str, db: Database) -> BedSchedules:
+    entity = await db.bed_schedules.find_one({"_id": ObjectId(bed_schedule_id)})
     if entity is not None:
         return model_from_mongo(BedSchedules, entity)
     raise NotFoundError('Bed schedules not found')
 
 
-def bed_schedules_index(page: int, page_size: int, ground_id: str,
-                        bed_label: str, db: Database) -> Pagination[BedSchedules]:
+def bed_schedules_query(ground_id: Optional[str],
+                        bed_label: Optional[str]) -> dict:
     query = {}
-    query['ground_id'] = ground_id
-    query['bed_label'] = bed_label
-    entities = many_model_from_mongo(BedSchedules, db.bed_schedules.find(
-        query, limit=page_size, skip=(page - 1) * page_size))
-    row_count = db.bed_schedules.count_documents(query)
-    return Pagination(entities=entities, row_count=row_count)
+    if ground_id is not None:
+        query['ground_id'] = ground_id
+    if bed_label is not None:
+        query['bed_label'] = bed_label
+    return query
 
 
-def bed_schedules_store(body: BedScheduleStore, db: Database) -> BedSchedules:
-    # Validate if data exists in database
-    ground = grounds_service.ground_show(body.ground_id, db)
-    bed = grounds_service.ground_find_bed(ground, body.bed_label)
-    for schedule in body.schedules:
-        seeds_service.seed_show(schedule.seed_id, db)
-    # Store bed schedules
-    data = body.dict()
-    data['current_schedule'] = 0
-    bed_schedules = db.bed_schedules.insert_one(data)
-    bed_schedules = model_from_mongo(BedSchedules, db.bed_schedules.find_one(
-        {"_id": bed_schedules.inserted_id}))
-    # Update bed
-    bed_update = BedUpdate(
+async def bed_schedules_index(page: int, page_size: int, ground_id: str,
+                              bed_label: str, db: Database, *,
+                              cursor: Optional[str] = None,
+                              count: Optional[RowCount] = None) -> Pagination[BedSchedules]:
+    query = bed_schedules_query(ground_id, bed_label)
+    return await paginate(db.bed_schedules, BedSchedules, query, page=page,
+                          page_size=page_size, cursor=cursor, count=count)
+
+
+def bed_schedules_export(ground_id: Optional[str], bed_label: Optional[str],
+                         format: FileFormat, db: Database) -> StreamingResponse:
+    query = bed_schedules_query(ground_id, bed_label)
+    return export(db.bed_schedules, BedSchedules, query, format=format,
+                  filename='bed_schedules')
+
+
+def bed_update_free() -> BedUpdate:
+    return BedUpdate(
+        bed_schedules_id__none=True,
+        bed_schedules_version__none=True,
+        seed_id__none=True,
+        end_at__none=True,
+        free=True)
+
+
+def bed_update_from(bed_schedules: BedSchedules) -> BedUpdate:
+    # The bed mirrors the current schedule of its bed schedules
+    if bed_schedules.current_schedule is None:
+        return bed_update_free()
+    schedule = bed_schedules.schedules[bed_schedules.current_schedule]
+    return BedUpdate(
         bed_schedules_id=bed_schedules.id,
-        seed_id=bed_schedules.schedules[0].seed_id,
-        end_at=bed_schedules.schedules[0].end_at,
+        bed_schedules_version=bed_schedules.version,
+        seed_id=schedule.seed_id,
+        end_at=schedule.end_at,
         free=False)
-    result = grounds_service.ground_update_bed(
-        ground.id, bed.label, bed_update, db)
+
+
+def set_current_schedule_end_at(end_at: date) -> dict:
+    # Pipeline expression for schedules[current_schedule].end_at = end_at
+    return {"$map": {
+        "input": {"$range": [0, {"$size": "$schedules"}]},
+        "as": "index",
+        "in": {"$cond": [
+            {"$eq": ["$$index", "$current_schedule"]},
+            {"$mergeObjects": [
+                {"$arrayElemAt": ["$schedules", "$$index"]},
+                {"end_at": end_at.isoformat()},
+            ]},
+            {"$arrayElemAt": ["$schedules", "$$index"]},
+        ]},
+    }}
+
+
+async def run_bed_transaction(
+        db: Database,
+        callback: Callable[[Optional[Session]], Awaitable[T]]) -> T:
+    try:
+        return await run_transaction(db, callback)
+    finally:
+        # Beds are embedded in grounds, whose ETags change once committed
+        await collection_changed(db, 'grounds')
+
+
+def version_query(current: dict) -> dict:
+    if "version" not in current:
+        return {"version": {"$exists": False}}
+    return {"version": current["version"]}
+
+
+async def bed_schedules_transition(
+    current: dict,
+    update: List[dict],
+    db: Database,
+    session: Optional[Session]
+) -> BedSchedules:
+    # Applied only on the version read, so of two concurrent changes from
+    # the same version the second one fails instead of overwriting the first
+    entity = await update_entity(
+        db.bed_schedules, BedSchedules,
+        {"_id": current["_id"], **version_query(current)},
+        [*update, {"$set": {"version": current.get("version", 0) + 1}}],
+        session=session
+    )
+    if entity is None:
+        raise ConflictError('Bed schedules changed concurrently')
+    return entity
+
+
+async def bed_schedules_with_current(
+    bed_schedules_id: str,
+    update: List[dict],
+    db: Database,
+    session: Optional[Session]
+) -> BedSchedules:
+    current = await db.bed_schedules.find_one(
+        {"_id": ObjectId(bed_schedules_id)}, session=session)
+    if current is None:
+        raise NotFoundError('Bed schedules not found')
+    if current.get("current_schedule") is None:
+        raise DomainError('Bed schedules without current schedule')
+    return await bed_schedules_transition(current, update, db, session)
+
+
+async def bed_schedules_handover(
+    ground_id: str,
+    bed_label: str,
+    db: Database,
+    session: Optional[Session]
+) -> None:
+    '''
+    Hands a free bed over to the pending bed schedules of the bed that
+    starts first. Nothing changes while another bed schedules owns the bed.
+    '''
+    pending = await db.bed_schedules.find_one(
+        {"ground_id": ground_id, "bed_label": bed_label,
+         "current_schedule": {"$ne": None}},
+        sort=[("schedules.0.start_at", 1)], session=session)
+    if pending is None:
+        return
+    entity = model_from_mongo(BedSchedules, pending)
+    result = await grounds_service.ground_update_bed(
+        ground_id, bed_label, bed_update_from(entity), db, session=session,
+        bed_filter={"bed.bed_schedules_id": None})
     if result.modified_count == 0:
-        db.bed_schedules.delete_one({"_id": bed_schedules.id})
-        raise Exception('Bed schedules not updated')
-    return bed_schedules
+        return
+    # A change made after the read missed the bed, because it was free
+    latest = await db.bed_schedules.find_one(
+        {"_id": pending["_id"]}, session=session)
+    if latest is None:
+        await grounds_service.ground_update_bed(
+            ground_id, bed_label, bed_update_free(), db, session=session,
+            bed_filter={"bed.bed_schedules_id": entity.id})
+        await bed_schedules_handover(ground_id, bed_label, db, session)
+    elif latest.get("version", 0) != entity.version:
+        await bed_schedules_mirror(
+            model_from_mongo(BedSchedules, latest), db, session)
 
 
-def bed_schedules_update(
+async def bed_schedules_mirror(
+    entity: BedSchedules,
+    db: Database,
+    session: Optional[Session]
+) -> None:
+    '''
+    Mirrors `entity` on its bed while it owns the bed, unless the bed
+    already mirrors a newer version. A bed schedules that does not own the
+    bed stays pending, and a bed it frees goes to the next pending one.
+    '''
+    result = await grounds_service.ground_update_bed(
+        entity.ground_id, entity.bed_label, bed_update_from(entity), db,
+        session=session, bed_filter={
+            "bed.bed_schedules_id": entity.id,
+            "bed.bed_schedules_version": {"$not": {"$gte": entity.version}},
+        })
+    if result.modified_count and entity.current_schedule is not None:
+        return
+    await bed_schedules_handover(entity.ground_id, entity.bed_label, db, session)
+
+
+async def bed_schedules_store(body: BedScheduleStore, db: Database) -> BedSchedules:
+    # Validate if data exists in database
+    await grounds_service.ground_get_bed(body.ground_id, body.bed_label, db)
+    await ensure_exist(db, 'seeds', [it.seed_id for it in body.schedules],
+                       entity='Seed')
+    data = to_mongo(body.dict())
+    data['current_schedule'] = 0
+    data['version'] = 1
+
+    async def store(session: Optional[Session]) -> BedSchedules:
+        # The intervals check and the insert are not atomic without a
+        # transaction, the claim of the bed serializes them per bed
+        bed = await grounds_service.ground_get_bed(
+            body.ground_id, body.bed_label, db, session=session)
+        await bed_intervals_service.bed_intervals_must_not_conflict(
+            body.ground_id, body.bed_label, body.schedules, db,
+            session=session)
+        bed_schedules = await insert_entity(
+            db.bed_schedules, BedSchedules, dict(data), session=session)
+        await bed_intervals_service.bed_intervals_sync(
+            bed_schedules, db, session=session)
+        if not await grounds_service.ground_claim_bed_intervals(
+                body.ground_id, bed.label, bed.intervals_version, db,
+                session=session):
+            if session is None:
+                await db.bed_schedules.delete_one(
+                    {"_id": ObjectId(bed_schedules.id)})
+                await bed_intervals_service.bed_intervals_delete(
+                    bed_schedules.id, db)
+            raise ConflictError('Bed schedules of the bed changed concurrently')
+        # Claims the bed only when it is free, otherwise the bed schedules
+        # stays pending until the one owning the bed is closed
+        await bed_schedules_handover(body.ground_id, bed.label, db, session)
+        return bed_schedules
+
+    return await run_bed_transaction(db, store)
+
+
+async def bed_schedules_update(
     bed_schedules_id: str,
     update: BedScheduleUpdate,
     db: Database
 ) -> BedSchedules:
-    # TODO: Validate if bed stay consistent
-    for schedule in update.schedules:
-        seeds_service.seed_show(schedule.seed_id, db)
-    data = update.dict()
-    result = db.bed_schedules.update_one(
-        {"_id": ObjectId(bed_schedules_id)},
-        {"$set": data}
-    )
-    if result.modified_count == 0:
-        raise NotFoundError('Bed schedules not found')
-    return bed_schedules_show(bed_schedules_id, db)
+    await ensure_exist(db, 'seeds', [it.seed_id for it in update.schedules],
+                       entity='Seed')
+    data = to_mongo(update.dict())
+
+    async def store(session: Optional[Session]) -> BedSchedules:
+        current = await db.bed_schedules.find_one(
+            {"_id": ObjectId(bed_schedules_id)}, session=session)
+        if current is None:
+            raise NotFoundError('Bed schedules not found')
+        bed = await grounds_service.ground_get_bed(
+            current["ground_id"], current["bed_label"], db, session=session)
+        await bed_intervals_service.bed_intervals_must_not_conflict(
+            current["ground_id"], current["bed_label"], update.schedules, db,
+            exclude_bed_schedules_id=bed_schedules_id, session=session)
+        entity = await bed_schedules_transition(
+            current, [{"$set": data}], db, session)
+        await bed_intervals_service.bed_intervals_sync(
+            entity, db, session=session)
+        if not await grounds_service.ground_claim_bed_intervals(
+                current["ground_id"], bed.label, bed.intervals_version, db,
+                session=session):
+            if session is None:
+                # Back to the schedules read, unless a newer change followed
+                restored = await update_entity(
+                    db.bed_schedules, BedSchedules,
+                    {"_id": current["_id"], "version": entity.version},
+                    {"$set": {"schedules": current["schedules"],
+                              "current_schedule": current.get("current_schedule"),
+                              "version": entity.version + 1}})
+                if restored is not None:
+                    await bed_intervals_service.bed_intervals_sync(restored, db)
+            raise ConflictError('Bed schedules of the bed changed concurrently')
+        await bed_schedules_mirror(entity, db, session)
+        return entity
 
+    return await run_bed_transaction(db, store)
 
-def bed_schedules_close(
+
+async def bed_schedules_close(
     bed_schedules_id: str,
     close: BedScheduleClose,
     db: Database
 ) -> BedSchedules:
-    bed_schedules = bed_schedules_show(bed_schedules_id, db)
-    if bed_schedules.current_schedule is None:
-        raise DomainError('Bed schedules without current schedule')
-    next_schedule = None
-    if bed_schedules.current_schedule < len(bed_schedules.schedules) - 1:
-        next_schedule = bed_schedules.current_schedule + 1
-    result = db.bed_schedules.update_one(
-        {"_id": ObjectId(bed_schedules_id)},
-        {
-            "$set": {
-                "current_schedule": next_schedule,
-                f"schedules.{bed_schedules.current_schedule}.end_at": close.date.isoformat()
-            }
-        }
-    )
-    if result.modified_count == 0:
-        raise Exception('Bed schedules not updated')
-    # Update bed
-    if next_schedule is None:
-        bed_update = BedUpdate(
-            bed_schedules_id__none=True,
-            seed_id__none=True,
-            end_at__none=True,
-            free=True)
-    else:
-        bed_update = BedUpdate(
-            bed_schedules_id=bed_schedules.id,
-            seed_id=bed_schedules.schedules[next_schedule].seed_id,
-            end_at=bed_schedules.schedules[next_schedule].end_at,
-            free=False)
-    result = grounds_service.ground_update_bed(
-        bed_schedules.ground_id, bed_schedules.bed_label, bed_update, db)
-    if result.modified_count == 0:
-        raise Exception('Bed schedules not updated')
-    return bed_schedules_show(bed_schedules_id, db)
+    # Closes the current schedule and moves to the next one in one update,
+    # so concurrent closes can not both close the same schedule
+    async def close_current(session: Optional[Session]) -> BedSchedules:
+        entity = await bed_schedules_with_current(bed_schedules_id, [
+            {"$set": {
+                "schedules": set_current_schedule_end_at(close.date),
+                "current_schedule": {"$cond": [
+                    {"$lt": [{"$add": ["$current_schedule", 1]},
+                             {"$size": "$schedules"}]},
+                    {"$add": ["$current_schedule", 1]},
+                    None,
+                ]},
+            }},
+        ], db, session)
+        await bed_intervals_service.bed_intervals_sync(
+            entity, db, session=session)
+        await bed_schedules_mirror(entity, db, session)
+        return entity
+
+    return await run_bed_transaction(db, close_current)
 
 
-def bed_schedules_adjust(
+async def bed_schedules_adjust(
     bed_schedules_id: str,
     adjust: BedScheduleAdjust,
     db: Database
 ) -> BedSchedules:
-    bed_schedules = bed_schedules_show(bed_schedules_id, db)
-    if bed_schedules.current_schedule is None:
-        raise DomainError('Bed schedules without current schedule')
-    result = db.bed_schedules.update_one(
-        {"_id": ObjectId(bed_schedules_id)},
-        {
-            "$set": {
-                f"schedules.{bed_schedules.current_schedule}.end_at": adjust.end_at.isoformat()
-            }
-        }
-    )
-    if result.modified_count == 0:
-        raise Exception('Bed schedules not updated')
-    return bed_schedules_show(bed_schedules_id, db)
+    async def adjust_current(session: Optional[Session]) -> BedSchedules:
+        entity = await bed_schedules_with_current(bed_schedules_id, [
+            {"$set": {"schedules": set_current_schedule_end_at(adjust.end_at)}},
+        ], db, session)
+        await bed_intervals_service.bed_intervals_sync(
+            entity, db, session=session)
+        await bed_schedules_mirror(entity, db, session)
+        return entity
 
+    return await run_bed_transaction(db, adjust_current)
 
-def bed_schedules_delete(bed_schedules_id: str, db: Database) -> None:
-    bed_schedules = bed_schedules_show(bed_schedules_id, db)
-    bed_update = BedUpdate(
-        bed_schedules_id__none=True,
-        seed_id__none=True,
-        free=True)
-    result = grounds_service.ground_update_bed(
-        bed_schedules.ground_id, bed_schedules.bed_label, bed_update, db)
-    if result.modified_count == 0:
-        raise Exception('Bed schedules not updated in grounds')
-    result = db.bed_schedules.delete_one({"_id": ObjectId(bed_schedules.id)})
-    if result.deleted_count == 0:
-        raise NotFoundError('Bed schedules not found')
+
+async def bed_schedules_delete(bed_schedules_id: str, db: Database) -> None:
+    async def delete(session: Optional[Session]) -> None:
+        entity = await db.bed_schedules.find_one_and_delete(
+            {"_id": ObjectId(bed_schedules_id)}, session=session)
+        if entity is None:
+            raise NotFoundError('Bed schedules not found')
+        await bed_intervals_service.bed_intervals_delete(
+            bed_schedules_id, db, session=session)
+        # A deleted bed schedules no longer owns the bed
+        await grounds_service.ground_update_bed(
+            str(entity["ground_id"]), entity["bed_label"], bed_update_free(),
+            db, session=session,
+            bed_filter={"bed.bed_schedules_id": bed_schedules_id})
+        await bed_schedules_handover(
+            str(entity["ground_id"]), entity["bed_label"], db, session)
+
+    await run_bed_transaction(db, delete)
@@ -1,11 +1,39 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib.context import CryptContext
 
+from api.env import settings
+from api.exceptions import ServiceUnavailableError
+
 crypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
+# bcrypt is CPU bound and takes hundreds of milliseconds, so it runs in a
+# dedicated pool instead of the shared threadpool used by the endpoints.
+# When more than workers + queue size operations are in flight the request
+# fails fast instead of queueing behind a login storm.
+crypt_executor = ThreadPoolExecutor(max_workers=settings.crypt_workers,
+                                    thread_name_prefix='crypt')
+crypt_pending = 0
+
+
+async def _run_crypt(fn, *args):
+    global crypt_pending
+    if crypt_pending >= settings.crypt_workers + settings.crypt_queue_size:
+        raise ServiceUnavailableError('Server busy, try again later')
+    crypt_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            crypt_executor, functools.partial(fn, *args))
+    finally:
+        crypt_pending -= 1
+
 
-def hash_password(password):
-    return crypt_context.hash(password)
+async def hash_password(password):
+    return await _run_crypt(crypt_context.hash, password)
 
 
-def check_password(password, hashed_password):
-    return crypt_context.verify(password, hashed_password)
+async def check_password(password, hashed_password):
+    return await _run_crypt(crypt_context.verify, password, hashed_password)
@@ -4,11 +4,12 @@ from typing import Optional
 from bson import ObjectId
 from pydantic import BaseModel, validator
 
-from api.concerns import Pagination
+from api.concerns import (Pagination, RowCount, insert_entity, paginate,
+                          update_entity)
 from api.database import Database
 from api.exceptions import NotFoundError
 from api.models import GroundDonate
-from api.utilities.mapper import many_model_from_mongo, model_from_mongo
+from api.utilities.mapper import model_from_mongo
 from api.utilities.validators import must_represent_an_adult
 
 
@@ -40,31 +41,28 @@ class GroundDonateUpdate(BaseModel):
         return must_represent_an_adult("birth_date", v)
 
 
-def grounds_donate_show(ground_donate_id: str, db: Database) -> GroundDonate:
-    entity = db.grounds_donate.find_one({"_id": ObjectId(ground_donate_id)})
+async def grounds_donate_show(ground_donate_id: str, db: Database) -> GroundDonate:
+    entity = await db.grounds_donate.find_one({"_id": ObjectId(ground_donate_id)})
     if entity is not None:
         return model_from_mongo(GroundDonate, entity)
     raise NotFoundError('GroundDonate not found')
 
 
-def grounds_donate_index(page: int, page_size: int,
-                         db: Database) -> Pagination[GroundDonate]:
-    entities = many_model_from_mongo(GroundDonate, db.grounds_donate.find(
-        limit=page_size, skip=(page - 1) * page_size))
-    row_count = db.grounds_donate.count_documents({})
-    return Pagination(entities=entities, row_count=row_count)
+async def grounds_donate_index(page: int, page_size: int, db: Database, *,
+                               cursor: Optional[str] = None,
+                               count: Optional[RowCount] = None) -> Pagination[GroundDonate]:
+    return await paginate(db.grounds_donate, GroundDonate, {}, page=page,
+                          page_size=page_size, cursor=cursor, count=count)
 
 
-def grounds_donate_store(ground_donate: GroundDonateStore,
-                         db: Database) -> GroundDonate:
+async def grounds_donate_store(ground_donate: GroundDonateStore,
+                               db: Database) -> GroundDonate:
     data = ground_donate.dict()
     data["birth_date"] = data["birth_date"].isoformat()
-    result = db.grounds_donate.insert_one(data)
-    return model_from_mongo(
-        GroundDonate, db.grounds_donate.find_one({"_id": result.inserted_id}))
+    return await insert_entity(db.grounds_donate, GroundDonate, data)
 
 
-def grounds_donate_update(
+async def grounds_donate_update(
     ground_donate_id: str,
     update: GroundDonateUpdate,
     db: Database
@@ -72,17 +70,17 @@ def grounds_donate_update(
     data = update.dict(exclude_unset=True)
     if "birth_date" in data:
         data["birth_date"] = data["birth_date"].isoformat()
-    entity = db.grounds_donate.find_one_and_update(
+    entity = await update_entity(
+        db.grounds_donate, GroundDonate,
         {"_id": ObjectId(ground_donate_id)},
         {"$set": data},
     )
     if entity is not None:
-        return model_from_mongo(
-            GroundDonate, db.grounds_donate.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('GroundDonate not found')
 
 
-def grounds_donate_delete(ground_donate_id: str, db: Database) -> None:
-    result = db.grounds_donate.delete_one({"_id": ObjectId(ground_donate_id)})
+async def grounds_donate_delete(ground_donate_id: str, db: Database) -> None:
+    result = await db.grounds_donate.delete_one({"_id": ObjectId(ground_donate_id)})
     if result.deleted_count == 0:
         raise NotFoundError('GroundDonate not found')
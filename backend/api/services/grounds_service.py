@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime, time, timedelta
 from enum import Enum
 from typing import List, Optional
 
@@ -6,12 +6,12 @@ from bson import ObjectId
 from pydantic import BaseModel, validator
 from pymongo.results import UpdateResult
 
-from api.concerns import Pagination
-from api.database import Database
+from api.concerns import (Pagination, RowCount, collection_changed,
+                          insert_entity, paginate, update_entity)
+from api.database import Database, Session
 from api.exceptions import NotFoundError
-from api.models import Bed, Ground
-from api.utilities.mapper import (id_to_str, many_model_from_mongo,
-                                  model_from_mongo, order_by_to_mongo)
+from api.models import Bed, BedStatus, Ground, GroundBed, bed_status
+from api.utilities.mapper import id_to_str, model_from_mongo, order_by_to_mongo
 
 
 class BedUpdate(BaseModel):
@@ -19,10 +19,12 @@ class BedUpdate(BaseModel):
     free: Optional[bool]
     seed_id: Optional[str]
     bed_schedules_id: Optional[str]
+    bed_schedules_version: Optional[int]
     responsible_user_id: Optional[str]
     end_at: Optional[date] = None
     seed_id__none: Optional[bool] = False
     bed_schedules_id__none: Optional[bool] = False
+    bed_schedules_version__none: Optional[bool] = False
     responsible_user_id__none: Optional[bool] = False
     end_at__none: Optional[bool] = False
 
@@ -54,88 +56,243 @@ class GroundOrderBy(str, Enum):
     ADDRESS_DOWN = 'address_down'
 
 
-def ground_show(ground_id: str, db: Database) -> Ground:
-    entity = db.grounds.find_one({"_id": ObjectId(ground_id)})
+class GroundInclude(str, Enum):
+    BEDS = 'beds'
+
+
+async def ground_show(ground_id: str, db: Database) -> Ground:
+    entity = await db.grounds.find_one({"_id": ObjectId(ground_id)})
     if entity is not None:
         return model_from_mongo(Ground, entity)
     raise NotFoundError('Ground not found')
 
 
-def ground_index(page: int, page_size: int, order_by: List[GroundOrderBy], search: Optional[str],
-                 db: Database) -> Pagination[Ground]:
+def _count_beds(status: BedStatus) -> dict:
+    return {"$size": {"$filter": {
+        "input": "$beds", "as": "bed",
+        "cond": {"$eq": ["$$bed.status", status.value]},
+    }}}
+
+
+def bed_status_expression(today: date) -> dict:
+    # Same rules as models.bed_status, for "$$bed"
+    return {"$switch": {
+        "branches": [
+            {"case": {"$ne": ["$$bed.free", False]},
+             "then": BedStatus.FREE.value},
+            {"case": {"$and": [
+                {"$gt": [{"$ifNull": ["$$bed.end_at", None]}, None]},
+                {"$lt": ["$$bed.end_at", today.isoformat()]},
+            ]}, "then": BedStatus.COMPLETE.value},
+        ],
+        "default": BedStatus.OCCUPIED.value,
+    }}
+
+
+def ground_summary_stages(include: List[GroundInclude],
+                          today: Optional[date] = None) -> List[dict]:
+    # Trusted rows skip Bed.status_or_computed, so the status of beds stored
+    # before it was persisted is computed here, before counting them
+    today = today or date.today()
+    stages = [{"$addFields": {"beds": {"$map": {
+        "input": {"$ifNull": ["$beds", []]}, "as": "bed",
+        "in": {"$mergeObjects": ["$$bed", {"status": {
+            "$ifNull": ["$$bed.status", bed_status_expression(today)]}}]},
+    }}}}, {"$addFields": {
+        "beds_count": {"$size": "$beds"},
+        "beds_status_count": {
+            status.value: _count_beds(status) for status in BedStatus
+        },
+    }}]
+    if GroundInclude.BEDS not in include:
+        stages.append({"$project": {"beds": 0}})
+    return stages
+
+
+async def ground_index(page: int, page_size: int, order_by: List[GroundOrderBy], search: Optional[str],
+                       db: Database, *, cursor: Optional[str] = None,
+                       count: Optional[RowCount] = None,
+                       include: Optional[List[GroundInclude]] = None) -> Pagination[Ground]:
     query = {}
     if search:
         query["$text"] = {"$search": search}
-    entities = many_model_from_mongo(Ground, db.grounds.aggregate([
-        {"$match": query},
-        {"$addFields": {"beds_count": {"$size": "$beds"}}},
-        # {"$addFields": {"beds": []}},
-        {"$sort": dict(order_by_to_mongo(order_by))}
-        if len(order_by) > 0 and order_by != [GroundOrderBy.NONE]
-        else {"$skip": 0},  # noop
-        {"$skip": (page - 1) * page_size},
-        {"$limit": page_size}
-    ]))
-    row_count = db.grounds.count_documents(query)
-    return Pagination(entities=entities, row_count=row_count)
-
-
-def ground_store(ground: GroundStore, db: Database) -> Ground:
+    return await paginate(db.grounds, Ground, query, page=page, page_size=page_size,
+                          sort=order_by_to_mongo(order_by), cursor=cursor, count=count,
+                          stages=ground_summary_stages(include or []),
+                          # Grounds and beds are only written by this service
+                          trusted=True)
+
+
+def ground_document(ground: GroundStore) -> dict:
     data = ground.dict()
     del data["beds_count"]
-    data["beds"] = [{"label": str(i + 1)} for i in range(ground.beds_count)]
-    result = db.grounds.insert_one(data)
-    return model_from_mongo(
-        Ground, db.grounds.find_one({"_id": result.inserted_id}))
+    data["beds"] = [{"label": str(i + 1), "status": BedStatus.FREE.value}
+                    for i in range(ground.beds_count)]
+    return data
+
 
+async def ground_store(ground: GroundStore, db: Database) -> Ground:
+    data = ground_document(ground)
+    entity = await insert_entity(db.grounds, Ground, data)
+    await collection_changed(db, 'grounds')
+    return entity
 
-def ground_update(
+
+async def ground_update(
     ground_id: str,
     update: GroundUpdate,
     db: Database
 ) -> Ground:
     data = update.dict(exclude_unset=True)
-    entity = db.grounds.find_one_and_update(
+    entity = await update_entity(
+        db.grounds, Ground,
         {"_id": ObjectId(ground_id)},
         {"$set": data},
     )
+    await collection_changed(db, 'grounds')
     if entity is not None:
-        return model_from_mongo(
-            Ground, db.grounds.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('Ground not found')
 
 
-def ground_delete(ground_id: str, db: Database) -> None:
-    result = db.grounds.delete_one({"_id": ObjectId(ground_id)})
-    db.bed_schedules.delete_many({"ground_id": ground_id})
+async def ground_delete(ground_id: str, db: Database) -> None:
+    result = await db.grounds.delete_one({"_id": ObjectId(ground_id)})
+    await collection_changed(db, 'grounds')
+    await db.bed_schedules.delete_many({"ground_id": ground_id})
+    await db.bed_intervals.delete_many({"ground_id": ground_id})
     if result.deleted_count == 0:
         raise NotFoundError('Ground not found')
 
 
-def ground_find_bed(ground: Ground, bed_label: str) -> Bed:
-    bed = next((it for it in ground.beds if it.label == bed_label), None)
-    if bed is None:
+async def ground_get_bed(ground_id: str, bed_label: str, db: Database, *,
+                         session: Optional[Session] = None) -> Bed:
+    # Projects only the matching bed instead of loading the whole ground
+    entity = await db.grounds.find_one(
+        {"_id": ObjectId(ground_id)},
+        {"beds": {"$elemMatch": {"label": bed_label}}}, session=session)
+    if entity is None:
+        raise NotFoundError('Ground not found')
+    if not entity.get("beds"):
         raise NotFoundError('Bed not found')
-    return bed
+    return Bed(**entity["beds"][0])
 
 
-def ground_update_bed(
-    ground_id: str,
-    bed_label: str,
-    update: BedUpdate,
-    db: Database
-) -> UpdateResult:
+def bed_update_set(update: BedUpdate) -> dict:
+    # $set of the bed matched by the "bed" array filter
     # TODO: test exclude_unset instead of exclude_none
     data = update.dict(exclude_none=True)
     for key in list(data.keys()):
         if key.endswith('__none') and data[key] is True:
             del data[key]
             data[key[:-6]] = None
+    if 'free' in data:
+        data['status'] = bed_status(data['free'], data.get('end_at'))
     if data.get('end_at') is not None:
         data['end_at'] = data['end_at'].isoformat()
-    data = {f"beds.$[bed].{k}": v for k, v in data.items()}
-    return db.grounds.update_one(
+    return {f"beds.$[bed].{k}": v for k, v in data.items()}
+
+
+async def ground_update_bed(
+    ground_id: str,
+    bed_label: str,
+    update: BedUpdate,
+    db: Database,
+    *,
+    session: Optional[Session] = None,
+    bed_filter: Optional[dict] = None
+) -> UpdateResult:
+    return await db.grounds.update_one(
         {"_id": ObjectId(ground_id)},
-        {"$set": data},
-        array_filters=[{"bed.label": bed_label}]
+        {"$set": bed_update_set(update)},
+        array_filters=[{"bed.label": bed_label, **(bed_filter or {})}],
+        session=session
+    )
+
+
+async def ground_claim_bed_intervals(
+    ground_id: str,
+    bed_label: str,
+    intervals_version: Optional[int],
+    db: Database,
+    *,
+    session: Optional[Session] = None
+) -> bool:
+    '''
+    Bumps the intervals version of the bed only from the version read before
+    checking the intervals, so of two concurrent changes checked against the
+    same intervals only the first one claims the bed.
+    '''
+    result = await db.grounds.update_one(
+        {"_id": ObjectId(ground_id)},
+        {"$inc": {"beds.$[bed].intervals_version": 1}},
+        array_filters=[{"bed.label": bed_label,
+                        "bed.intervals_version": intervals_version}],
+        session=session
     )
+    return result.modified_count == 1
+
+
+def seconds_until_next_day(now: Optional[datetime] = None) -> float:
+    # The rollover runs when the date changes, bed status depends on it
+    now = now or datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), time())
+    return (tomorrow - now).total_seconds()
+
+
+async def ground_beds_rollover(db: Database, today: Optional[date] = None) -> int:
+    '''
+    Flips OCCUPIED beds whose end_at has passed to COMPLETE, and fills the
+    status of beds stored before it was persisted.
+    '''
+    today = today or date.today()
+    result = await db.grounds.update_many(
+        {"$or": [
+            {"beds": {"$elemMatch": {
+                "status": BedStatus.OCCUPIED.value,
+                "end_at": {"$lt": today.isoformat()},
+            }}},
+            {"beds.status": None},
+        ]},
+        [{"$set": {"beds": {"$map": {
+            "input": "$beds", "as": "bed",
+            "in": {"$mergeObjects": [
+                "$$bed", {"status": bed_status_expression(today)}]},
+        }}}}]
+    )
+    if result.modified_count:
+        await collection_changed(db, 'grounds')
+    return result.modified_count
+
+
+def ground_bed_rows(beds_query: dict) -> List[dict]:
+    # The rows of paginate for the beds matching beds_query, in (ground_id,
+    # label) order by their _id
+    return [
+        {"$project": {"beds": 1}},
+        {"$unwind": "$beds"},
+        {"$match": beds_query},
+        {"$replaceWith": {"$mergeObjects": ["$beds", {
+            "ground_id": "$_id",
+            "_id": {"ground_id": "$_id", "label": "$beds.label"},
+        }]}},
+    ]
+
+
+async def ground_beds_index(
+    page: int,
+    page_size: int,
+    status: List[BedStatus],
+    db: Database,
+    *,
+    cursor: Optional[str] = None,
+    count: Optional[RowCount] = None
+) -> Pagination[GroundBed]:
+    # Beds across every ground, matched by the beds.status index before
+    # unwinding so only grounds with a matching bed are read
+    query = {}
+    if status:
+        query["beds.status"] = {"$in": [it.value for it in status]}
+    return await paginate(db.grounds, GroundBed, query, page=page,
+                          page_size=page_size, sort=[("_id", 1)],
+                          cursor=cursor, count=count,
+                          rows=ground_bed_rows(query))
@@ -40,12 +40,13 @@ def create_refresh_token(data: dict) -> str:
     return _create_token(data, JWT_REFRESH_EXPIRES_IN, 'refresh_token')
 
 
-def decode_token(token: str = Depends(oauth2_schema),
-                 db: Database = Depends(get_db)) -> TokenData:
+async def decode_token(token: str = Depends(oauth2_schema),
+                       db: Database = Depends(get_db)) -> TokenData:
     try:
         data = jwt.decode(token, JWT_SECRET_KEY, algorithms=JWT_ALGORITHM)
         user_id = data['sub']
-        user = users_service.user_auth(db, user_id=user_id)
+        user = await users_service.user_auth_version(
+            db, user_id, data.get('version'))
         if user.version != data.get('version'):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,16 +1,21 @@
+import re
 from datetime import date
 from enum import Enum
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from bson import ObjectId
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, validator
 
-from api.concerns import Pagination
+from api.concerns import (FileFormat, ImportResult, Pagination, RowCount,
+                          export, import_rows, insert_entity, paginate,
+                          read_rows, update_entity)
 from api.database import Database
 from api.exceptions import AlreadyExistsError, NotFoundError
 from api.models import People
 from api.utilities.mapper import (many_model_from_mongo, model_from_mongo,
                                   order_by_to_mongo)
+from api.utilities.search import normalize_text, prefix_keys, prefix_query
 from api.utilities.validators import must_represent_an_adult
 
 
@@ -40,6 +45,13 @@ class PeopleUpdate(BaseModel):
         return must_represent_an_adult("birth_date", v)
 
 
+class PeopleAutocomplete(BaseModel):
+    id: str
+    name: str
+    email: str
+    cellphone: str
+
+
 class PeopleOrderBy(str, Enum):
     NONE = ''
     NAME_UP = 'name_up'
@@ -50,60 +62,135 @@ class PeopleOrderBy(str, Enum):
     ADDRESS_DOWN = 'address_down'
 
 
-def people_show(people_id: str, db: Database) -> People:
-    entity = db.peoples.find_one({"_id": ObjectId(people_id)})
+# Candidates fetched per requested match, ranked by autocomplete_rank
+AUTOCOMPLETE_CANDIDATES = 5
+
+
+def people_search_fields(people: dict) -> dict:
+    # Words of name, email and cellphone, and the cellphone digits as typed
+    # without its punctuation
+    cellphone = people.get("cellphone") or ''
+    keys = set(prefix_keys(people.get("name") or '',
+                           people.get("email") or '', cellphone))
+    digits = re.sub(r'\D', '', cellphone)
+    if digits:
+        keys.add(digits)
+    return {"search_keys": sorted(keys)}
+
+
+def autocomplete_rank(search: str, people: dict) -> tuple:
+    # Whole name prefix, then name words prefixes, then email or cellphone
+    name = normalize_text(people["name"])
+    words = name.split()
+    if name.startswith(search):
+        rank = 0
+    elif all(any(it.startswith(word) for it in words)
+             for word in search.split()):
+        rank = 1
+    else:
+        rank = 2
+    return rank, len(name), name
+
+
+async def people_show(people_id: str, db: Database) -> People:
+    entity = await db.peoples.find_one({"_id": ObjectId(people_id)})
     if entity is not None:
         return model_from_mongo(People, entity)
     raise NotFoundError('People not found')
 
 
-def people_index(page: int, page_size: int, order_by: List[PeopleOrderBy], search: Optional[str],
-                 db: Database) -> Pagination[People]:
+def people_query(search: Optional[str]) -> dict:
     query = {}
     if search:
         query["$text"] = {"$search": search}
-    entities = many_model_from_mongo(People, db.peoples.find(
-        query, limit=page_size, skip=(page - 1) * page_size, sort=order_by_to_mongo(order_by)))
-    row_count = db.peoples.count_documents(query)
-    return Pagination(entities=entities, row_count=row_count)
+    return query
 
 
-def people_store(people: PeopleStore, db: Database) -> People:
+async def people_index(page: int, page_size: int, order_by: List[PeopleOrderBy], search: Optional[str],
+                       db: Database, *, cursor: Optional[str] = None,
+                       count: Optional[RowCount] = None) -> Pagination[People]:
+    query, fields, sort = people_query(search), None, order_by_to_mongo(order_by)
+    if search:
+        if not sort:
+            fields = {"score": {"$meta": "textScore"}}
+            sort = [("score", -1)]
+    return await paginate(db.peoples, People, query, page=page, page_size=page_size,
+                          sort=sort, cursor=cursor, fields=fields, count=count)
+
+
+def people_export(search: Optional[str], format: FileFormat,
+                  db: Database) -> StreamingResponse:
+    return export(db.peoples, People, people_query(search), format=format,
+                  filename='peoples')
+
+
+async def people_autocomplete(search: str, limit: int,
+                              db: Database) -> List[PeopleAutocomplete]:
+    query = prefix_query("search_keys", search)
+    if query is None:
+        return []
+    # The limit stops the scan of the search_keys index early. Candidates come
+    # in key order, where a key sorts before the keys it prefixes, so whole
+    # word matches of the first word come before longer words
+    items = await db.peoples.find(
+        query, {"name": 1, "email": 1, "cellphone": 1},
+    ).limit(limit * AUTOCOMPLETE_CANDIDATES).to_list(None)
+    search = normalize_text(search)
+    items.sort(key=lambda it: autocomplete_rank(search, it))
+    return many_model_from_mongo(PeopleAutocomplete, items[:limit], trusted=True)
+
+
+def people_document(people: PeopleStore) -> dict:
     data = people.dict()
-    people_must_not_exists(db, email=data["email"])
     data["birth_date"] = data["birth_date"].isoformat()
-    result = db.peoples.insert_one(data)
-    return model_from_mongo(
-        People, db.peoples.find_one({"_id": result.inserted_id}))
+    data.update(people_search_fields(data))
+    return data
+
+
+async def people_store(people: PeopleStore, db: Database) -> People:
+    await people_must_not_exists(db, email=people.email)
+    return await insert_entity(db.peoples, People, people_document(people))
+
+
+async def people_import(chunks: AsyncIterator[bytes], format: FileFormat,
+                        db: Database) -> ImportResult:
+    return await import_rows(db.peoples, read_rows(chunks, format), PeopleStore,
+                             people_document, unique='email', entity='People')
 
 
-def people_update(
+async def people_update(
     people_id: str,
     update: PeopleUpdate,
     db: Database
 ) -> People:
     data = update.dict(exclude_unset=True)
     if "email" in data:
-        people_must_not_exists(db, email=data["email"])
+        await people_must_not_exists(db, email=data["email"])
     if "birth_date" in data:
         data["birth_date"] = data["birth_date"].isoformat()
-    entity = db.peoples.find_one_and_update(
+    if data.keys() & {"name", "email", "cellphone"}:
+        current = await db.peoples.find_one(
+            {"_id": ObjectId(people_id)}, {"name": 1, "email": 1, "cellphone": 1})
+        if current is None:
+            raise NotFoundError('People not found')
+        data.update(people_search_fields({**current, **data}))
+    entity = await update_entity(
+        db.peoples, People,
         {"_id": ObjectId(people_id)},
         {"$set": data},
     )
     if entity is not None:
-        return model_from_mongo(
-            People, db.peoples.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('People not found')
 
 
-def people_delete(people_id: str, db: Database) -> None:
-    result = db.peoples.delete_one({"_id": ObjectId(people_id)})
+async def people_delete(people_id: str, db: Database) -> None:
+    result = await db.peoples.delete_one({"_id": ObjectId(people_id)})
     if result.deleted_count == 0:
         raise NotFoundError('People not found')
 
 
-def people_must_not_exists(db: Database, *, email: str) -> None:
-    entity = db.peoples.find_one({"email": email})
+async def people_must_not_exists(db: Database, *, email: str) -> None:
+    entity = await db.peoples.find_one({"email": email})
     if entity is not None:
         raise AlreadyExistsError('People already exists')
@@ -1,15 +1,17 @@
 from enum import Enum
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from bson import ObjectId
 from pydantic import BaseModel, validator
 
-from api.concerns import Pagination
+from api.concerns import (FileFormat, ImportResult, Pagination, RowCount,
+                          collection_changed, import_rows, insert_entity,
+                          paginate, read_rows, update_entity)
 from api.database import Database
 from api.exceptions import AlreadyExistsError, NotFoundError
 from api.models import Seed, SeedType
-from api.utilities.mapper import (many_model_from_mongo, model_from_mongo,
-                                  order_by_to_mongo)
+from api.utilities.mapper import model_from_mongo, order_by_to_mongo
+from api.utilities.search import search_fields, search_projection, search_query
 from api.utilities.validators import must_be_positive
 
 
@@ -43,63 +45,79 @@ class SeedOrderBy(str, Enum):
     NAME_DOWN = 'name_down'
 
 
-def seed_show(seed_id: str, db: Database) -> Seed:
-    entity = db.seeds.find_one({"_id": ObjectId(seed_id)})
+async def seed_show(seed_id: str, db: Database) -> Seed:
+    entity = await db.seeds.find_one({"_id": ObjectId(seed_id)})
     if entity is not None:
         return model_from_mongo(Seed, entity)
     raise NotFoundError('Seed not found')
 
 
-def seed_index(page: int, page_size: int,
-               order_by: List[SeedOrderBy], search: Optional[str],
-               db: Database) -> Pagination[Seed]:
-    query = {}
+async def seed_index(page: int, page_size: int,
+                     order_by: List[SeedOrderBy], search: Optional[str],
+                     db: Database, *,
+                     cursor: Optional[str] = None,
+                     count: Optional[RowCount] = None) -> Pagination[Seed]:
+    query, score = {}, None
     if search:
-        query["$text"] = {"$search": search}
-    entities = many_model_from_mongo(Seed, db.seeds.find(
-        query, limit=page_size, skip=(page - 1) * page_size, sort=order_by_to_mongo(order_by)))
-    if len(entities) == 0 and search:
-        query = {}
-        query["name"] = {"$regex": search, "$options": "i"}
-        entities = many_model_from_mongo(Seed, db.seeds.find(
-            query, limit=page_size, skip=(page - 1) * page_size, sort=order_by_to_mongo(order_by)))
-    row_count = db.seeds.count_documents(query)
-    return Pagination(entities=entities, row_count=row_count)
-
-
-def seed_store(seed: SeedStore, db: Database) -> Seed:
+        query, score = search_query('name', search)
+    sort = order_by_to_mongo(order_by)
+    if score is not None:
+        sort = [('score', -1), *sort]
+    return await paginate(db.seeds, Seed, query, page=page,
+                          page_size=page_size, sort=sort, cursor=cursor,
+                          fields={"score": score} if score is not None else None,
+                          stages=[{"$project": search_projection('name')}],
+                          count=count)
+
+
+def seed_document(seed: SeedStore) -> dict:
     data = seed.dict()
-    seed_must_not_exists(db, name=data['name'])
-    result = db.seeds.insert_one(data)
-    return model_from_mongo(
-        Seed, db.seeds.find_one({"_id": result.inserted_id}))
+    data.update(search_fields('name', data['name']))
+    return data
 
 
-def seed_update(
+async def seed_store(seed: SeedStore, db: Database) -> Seed:
+    await seed_must_not_exists(db, name=seed.name)
+    data = seed_document(seed)
+    entity = await insert_entity(db.seeds, Seed, data)
+    await collection_changed(db, 'seeds')
+    return entity
+
+
+async def seed_import(chunks: AsyncIterator[bytes], format: FileFormat,
+                      db: Database) -> ImportResult:
+    return await import_rows(db.seeds, read_rows(chunks, format), SeedStore,
+                             seed_document, unique='name', entity='Seed')
+
+
+async def seed_update(
     seed_id: str,
     update: SeedUpdate,
     db: Database
 ) -> Seed:
     data = update.dict(exclude_unset=True)
     if 'name' in data:
-        seed_must_not_exists(db, name=data['name'])
-    entity = db.seeds.find_one_and_update(
+        await seed_must_not_exists(db, name=data['name'])
+        data.update(search_fields('name', data['name']))
+    entity = await update_entity(
+        db.seeds, Seed,
         {"_id": ObjectId(seed_id)},
         {"$set": data},
     )
+    await collection_changed(db, 'seeds')
     if entity is not None:
-        return model_from_mongo(
-            Seed, db.seeds.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('Seed not found')
 
 
-def seed_delete(seed_id: str, db: Database) -> None:
-    result = db.seeds.delete_one({"_id": ObjectId(seed_id)})
+async def seed_delete(seed_id: str, db: Database) -> None:
+    result = await db.seeds.delete_one({"_id": ObjectId(seed_id)})
+    await collection_changed(db, 'seeds')
     if result.deleted_count == 0:
         raise NotFoundError('Seed not found')
 
 
-def seed_must_not_exists(db: Database, *, name: str) -> None:
-    entity = db.seeds.find_one({"name": name})
+async def seed_must_not_exists(db: Database, *, name: str) -> None:
+    entity = await db.seeds.find_one({"name": name})
     if entity is not None:
         raise AlreadyExistsError('Seed already exists')
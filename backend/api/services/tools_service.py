@@ -1,15 +1,17 @@
 from enum import Enum
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from bson import ObjectId
 from pydantic import BaseModel, validator
 
-from api.concerns import Pagination
+from api.concerns import (FileFormat, ImportResult, Pagination, RowCount,
+                          collection_changed, import_rows, insert_entity,
+                          paginate, read_rows, update_entity)
 from api.database import Database
 from api.exceptions import AlreadyExistsError, NotFoundError
 from api.models import Tool
-from api.utilities.mapper import (many_model_from_mongo, model_from_mongo,
-                                  order_by_to_mongo)
+from api.utilities.mapper import model_from_mongo, order_by_to_mongo
+from api.utilities.search import search_fields, search_projection, search_query
 from api.utilities.validators import must_be_positive
 
 
@@ -41,63 +43,79 @@ class ToolOrderBy(str, Enum):
     NAME_DOWN = 'name_down'
 
 
-def tool_show(tool_id: str, db: Database) -> Tool:
-    entity = db.tools.find_one({"_id": ObjectId(tool_id)})
+async def tool_show(tool_id: str, db: Database) -> Tool:
+    entity = await db.tools.find_one({"_id": ObjectId(tool_id)})
     if entity is not None:
         return model_from_mongo(Tool, entity)
     raise NotFoundError('Tool not found')
 
 
-def tool_index(page: int, page_size: int,
-               order_by: List[ToolOrderBy], search: Optional[str],
-               db: Database) -> Pagination[Tool]:
-    query = {}
+async def tool_index(page: int, page_size: int,
+                     order_by: List[ToolOrderBy], search: Optional[str],
+                     db: Database, *,
+                     cursor: Optional[str] = None,
+                     count: Optional[RowCount] = None) -> Pagination[Tool]:
+    query, score = {}, None
     if search:
-        query["$text"] = {"$search": search}
-    entities = many_model_from_mongo(Tool, db.tools.find(
-        query, limit=page_size, skip=(page - 1) * page_size, sort=order_by_to_mongo(order_by)))
-    if len(entities) == 0 and search:
-        query = {}
-        query["name"] = {"$regex": search, "$options": "i"}
-        entities = many_model_from_mongo(Tool, db.tools.find(
-            query, limit=page_size, skip=(page - 1) * page_size, sort=order_by_to_mongo(order_by)))
-    row_count = db.tools.count_documents(query)
-    return Pagination(entities=entities, row_count=row_count)
-
-
-def tool_store(tool: ToolStore, db: Database) -> Tool:
+        query, score = search_query('name', search)
+    sort = order_by_to_mongo(order_by)
+    if score is not None:
+        sort = [('score', -1), *sort]
+    return await paginate(db.tools, Tool, query, page=page,
+                          page_size=page_size, sort=sort, cursor=cursor,
+                          fields={"score": score} if score is not None else None,
+                          stages=[{"$project": search_projection('name')}],
+                          count=count)
+
+
+def tool_document(tool: ToolStore) -> dict:
     data = tool.dict()
-    tool_must_not_exists(db, name=data["name"])
-    result = db.tools.insert_one(data)
-    return model_from_mongo(
-        Tool, db.tools.find_one({"_id": result.inserted_id}))
+    data.update(search_fields('name', data["name"]))
+    return data
 
 
-def tool_update(
+async def tool_store(tool: ToolStore, db: Database) -> Tool:
+    await tool_must_not_exists(db, name=tool.name)
+    data = tool_document(tool)
+    entity = await insert_entity(db.tools, Tool, data)
+    await collection_changed(db, 'tools')
+    return entity
+
+
+async def tool_import(chunks: AsyncIterator[bytes], format: FileFormat,
+                      db: Database) -> ImportResult:
+    return await import_rows(db.tools, read_rows(chunks, format), ToolStore,
+                             tool_document, unique='name', entity='Tool')
+
+
+async def tool_update(
     tool_id: str,
     update: ToolUpdate,
     db: Database
 ) -> Tool:
     data = update.dict(exclude_unset=True)
     if "name" in data:
-        tool_must_not_exists(db, name=data["name"])
-    entity = db.tools.find_one_and_update(
+        await tool_must_not_exists(db, name=data["name"])
+        data.update(search_fields('name', data["name"]))
+    entity = await update_entity(
+        db.tools, Tool,
         {"_id": ObjectId(tool_id)},
         {"$set": data},
     )
+    await collection_changed(db, 'tools')
     if entity is not None:
-        return model_from_mongo(
-            Tool, db.tools.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('Tool not found')
 
 
-def tool_delete(tool_id: str, db: Database) -> None:
-    result = db.tools.delete_one({"_id": ObjectId(tool_id)})
+async def tool_delete(tool_id: str, db: Database) -> None:
+    result = await db.tools.delete_one({"_id": ObjectId(tool_id)})
+    await collection_changed(db, 'tools')
     if result.deleted_count == 0:
         raise NotFoundError('Tool not found')
 
 
-def tool_must_not_exists(db: Database, *, name: str) -> None:
-    entity = db.tools.find_one({"name": name})
+async def tool_must_not_exists(db: Database, *, name: str) -> None:
+    entity = await db.tools.find_one({"name": name})
     if entity is not None:
         raise AlreadyExistsError('Tool already exists')
@@ -1,15 +1,24 @@
 from datetime import date
-from typing import Optional
+from typing import Optional, Tuple
 
 from bson import ObjectId
 from pydantic import BaseModel
 
 import api.services.crypt_service as crypt_service
-from api.concerns import Pagination
+from api.concerns import (Pagination, RowCount, collection_changed,
+                          collection_version, insert_entity, paginate,
+                          update_entity)
 from api.database import Database
+from api.env import settings
 from api.exceptions import AlreadyExistsError, NotFoundError
 from api.models import User
-from api.utilities.mapper import many_model_from_mongo, model_from_mongo
+from api.utilities.cache import TTLCache
+from api.utilities.mapper import model_from_mongo
+
+# Authenticated users by (user_id, version, users collection version), see
+# user_auth_version
+user_auth_cache: TTLCache[Tuple[str, int, str], User] = TTLCache(
+    settings.auth_cache_size, settings.auth_cache_ttl)
 
 
 class UserResponse(BaseModel):
@@ -33,74 +42,96 @@ class UserUpdate(BaseModel):
     cellphone: Optional[str]
 
 
-def user_show(user_id: str, db: Database) -> UserResponse:
-    entity = db.users.find_one({"_id": ObjectId(user_id)})
+async def user_show(user_id: str, db: Database) -> UserResponse:
+    entity = await db.users.find_one({"_id": ObjectId(user_id)})
     if entity is not None:
         return model_from_mongo(UserResponse, entity)
     raise NotFoundError('User not found')
 
 
-def user_auth(db: Database, *,
-              email: Optional[str] = None, user_id: Optional[str] = None) -> User:
+async def user_auth(db: Database, *,
+                    email: Optional[str] = None, user_id: Optional[str] = None) -> User:
     if email is not None:
         query = {"email": email}
     elif user_id is not None:
         query = {"_id": ObjectId(user_id)}
     else:
         raise ValueError('email or user_id must be set')
-    entity = db.users.find_one(query)
+    entity = await db.users.find_one(query)
     if entity is not None:
         return model_from_mongo(User, entity)
     raise NotFoundError('User not found')
 
 
-def user_index(page: int, page_size: int,
-               db: Database) -> Pagination[UserResponse]:
-    entities = many_model_from_mongo(UserResponse, db.users.find(
-        limit=page_size, skip=(page - 1) * page_size))
-    row_count = db.users.count_documents({})
-    return Pagination(entities=entities, row_count=row_count)
+async def user_auth_version(db: Database, user_id: str, version: int) -> User:
+    # The users version is shared by every process, so an update or a delete
+    # in another worker drops the cached users within etag_version_ttl
+    key = (user_id, version, await collection_version(db, 'users'))
+    user = user_auth_cache.get(key)
+    if user is not None:
+        return user
+    user = await user_auth(db, user_id=user_id)
+    if user.version == version:
+        user_auth_cache.set(key, user)
+    return user
+
+
+def user_auth_invalidate(user_id: str) -> None:
+    user_auth_cache.delete_where(lambda key: key[0] == user_id)
+
+
+async def user_index(page: int, page_size: int, db: Database, *,
+                     cursor: Optional[str] = None,
+                     count: Optional[RowCount] = None) -> Pagination[UserResponse]:
+    return await paginate(db.users, UserResponse, {}, page=page,
+                          page_size=page_size, cursor=cursor, count=count)
 
 
-def user_store(user: UserStore, db: Database) -> UserResponse:
+async def user_store(user: UserStore, db: Database) -> UserResponse:
     data = user.dict()
-    user_must_not_exists(db, email=data['email'])
+    await user_must_not_exists(db, email=data['email'])
     data['manager'] = {'start_at': date.today().isoformat()}
-    data['password'] = crypt_service.hash_password(data['password'])
-    entity = db.users.insert_one(data)
-    entity = db.users.find_one({"_id": ObjectId(entity.inserted_id)})
-    return model_from_mongo(UserResponse, entity)
+    data['password'] = await crypt_service.hash_password(data['password'])
+    return await insert_entity(db.users, UserResponse, data)
 
 
-def user_update(
+async def user_update(
     user_id: str,
     update: UserUpdate,
     db: Database
 ) -> User:
-    user = user_show(user_id, db)
+    await user_auth(db, user_id=user_id)
     data = update.dict(exclude_unset=True)
     if 'password' in data:
-        data['password'] = crypt_service.hash_password(data['password'])
+        data['password'] = await crypt_service.hash_password(data['password'])
     if 'email' in data:
-        user_must_not_exists(db, email=data['email'])
-    data['version'] = user.version + 1
-    entity = db.users.find_one_and_update(
+        await user_must_not_exists(db, email=data['email'])
+    # Incremented by the update itself, so two concurrent updates never
+    # produce the same version. Users stored before it have version 1
+    entity = await update_entity(
+        db.users, User,
         {"_id": ObjectId(user_id)},
-        {"$set": data},
+        [{"$set": {
+            **{key: {"$literal": value} for key, value in data.items()},
+            "version": {"$add": [{"$ifNull": ["$version", 1]}, 1]},
+        }}],
     )
+    await collection_changed(db, 'users')
+    user_auth_invalidate(user_id)
     if entity is not None:
-        return model_from_mongo(
-            User, db.users.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('User not found')
 
 
-def user_delete(user_id: str, db: Database) -> None:
-    result = db.users.delete_one({"_id": ObjectId(user_id)})
+async def user_delete(user_id: str, db: Database) -> None:
+    result = await db.users.delete_one({"_id": ObjectId(user_id)})
+    await collection_changed(db, 'users')
+    user_auth_invalidate(user_id)
     if result.deleted_count == 0:
         raise NotFoundError('User not found')
 
 
-def user_must_not_exists(db: Database, *, email: str) -> None:
-    entity = db.users.find_one({"email": email})
+async def user_must_not_exists(db: Database, *, email: str) -> None:
+    entity = await db.users.find_one({"email": email})
     if entity is not None:
         raise AlreadyExistsError('User already exists')
@@ -4,11 +4,12 @@ from typing import Optional
 from bson import ObjectId
 from pydantic import BaseModel, validator
 
-from api.concerns import Pagination
+from api.concerns import (Pagination, RowCount, insert_entity, paginate,
+                          update_entity)
 from api.database import Database
 from api.exceptions import NotFoundError
 from api.models import VoluntaryRequest
-from api.utilities.mapper import many_model_from_mongo, model_from_mongo
+from api.utilities.mapper import model_from_mongo
 from api.utilities.validators import must_represent_an_adult
 
 
@@ -38,36 +39,35 @@ class VoluntaryRequestUpdate(BaseModel):
         return must_represent_an_adult("birth_date", v)
 
 
-def voluntary_request_show(voluntary_request_id: str,
-                           db: Database) -> VoluntaryRequest:
-    entity = db.voluntaries_request.find_one(
+async def voluntary_request_show(voluntary_request_id: str,
+                                 db: Database) -> VoluntaryRequest:
+    entity = await db.voluntaries_request.find_one(
         {"_id": ObjectId(voluntary_request_id)})
     if entity is not None:
         return model_from_mongo(VoluntaryRequest, entity)
     raise NotFoundError('VoluntaryRequest not found')
 
 
-def voluntary_request_index(
+async def voluntary_request_index(
     page: int,
     page_size: int,
-    db: Database
+    db: Database,
+    *,
+    cursor: Optional[str] = None,
+    count: Optional[RowCount] = None
 ) -> Pagination[VoluntaryRequest]:
-    entities = many_model_from_mongo(VoluntaryRequest, db.voluntaries_request.find(
-        limit=page_size, skip=(page - 1) * page_size))
-    row_count = db.voluntaries_request.count_documents({})
-    return Pagination(entities=entities, row_count=row_count)
+    return await paginate(db.voluntaries_request, VoluntaryRequest, {},
+                          page=page, page_size=page_size, cursor=cursor, count=count)
 
 
-def voluntary_request_store(
+async def voluntary_request_store(
         voluntary: VoluntaryRequestStore, db: Database) -> VoluntaryRequest:
     data = voluntary.dict()
     data["birth_date"] = data["birth_date"].isoformat()
-    result = db.voluntaries_request.insert_one(data)
-    return model_from_mongo(
-        VoluntaryRequest, db.voluntaries_request.find_one({"_id": result.inserted_id}))
+    return await insert_entity(db.voluntaries_request, VoluntaryRequest, data)
 
 
-def voluntary_request_update(
+async def voluntary_request_update(
     voluntary_request_id: str,
     update: VoluntaryRequestUpdate,
     db: Database
@@ -75,18 +75,18 @@ def voluntary_request_update(
     data = update.dict(exclude_unset=True)
     if "birth_date" in data:
         data["birth_date"] = data["birth_date"].isoformat()
-    entity = db.voluntaries_request.find_one_and_update(
+    entity = await update_entity(
+        db.voluntaries_request, VoluntaryRequest,
         {"_id": ObjectId(voluntary_request_id)},
         {"$set": data},
     )
     if entity is not None:
-        return model_from_mongo(
-            VoluntaryRequest, db.voluntaries_request.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('VoluntaryRequest not found')
 
 
-def voluntary_request_delete(voluntary_request_id: str, db: Database) -> None:
-    result = db.voluntaries_request.delete_one(
+async def voluntary_request_delete(voluntary_request_id: str, db: Database) -> None:
+    result = await db.voluntaries_request.delete_one(
         {"_id": ObjectId(voluntary_request_id)})
     if result.deleted_count == 0:
         raise NotFoundError('VoluntaryRequest not found')
@@ -2,16 +2,18 @@ from datetime import date
 from typing import List, Optional
 
 from bson import ObjectId
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from pymongo.errors import BulkWriteError
 
 import api.services.grounds_service as ground_service
 import api.services.peoples_service as people_service
-from api.concerns import Pagination
+from api.concerns import (FileFormat, Pagination, RowCount, export,
+                          insert_entity, paginate, update_entity)
 from api.database import Database
-from api.exceptions import AlreadyExistsError, DomainError, NotFoundError
+from api.exceptions import AlreadyExistsError, NotFoundError
 from api.models import Voluntary
-from api.utilities.mapper import (dict_date_fields, many_model_from_mongo,
-                                  model_from_mongo)
+from api.utilities.mapper import model_from_mongo, to_mongo
 
 
 class VoluntaryStore(BaseModel):
@@ -21,24 +23,12 @@ class VoluntaryStore(BaseModel):
     start_at: date
     is_responsible: bool
 
-    def dict(self, *args, **kwargs):
-        # Normalize dict to be an acceptable json
-        data = super().dict(*args, **kwargs)
-        dict_date_fields(data, 'start_at')
-        return data
-
 
 class VoluntaryUpdate(BaseModel):
     start_at: Optional[date]
     end_at: Optional[date]
     is_responsible: Optional[bool]
 
-    def dict(self, *args, **kwargs):
-        # Normalize dict to be an acceptable json
-        data = super().dict(*args, **kwargs)
-        dict_date_fields(data, 'start_at', 'end_at')
-        return data
-
 
 class VoluntaryOrError(BaseModel):
     voluntary: Optional[Voluntary]
@@ -49,21 +39,15 @@ class VoluntaryStoreManyResponse(BaseModel):
     results: List[VoluntaryOrError]
 
 
-def voluntary_show(voluntary_id: str, db: Database) -> Voluntary:
-    entity = db.voluntaries.find_one({"_id": ObjectId(voluntary_id)})
+async def voluntary_show(voluntary_id: str, db: Database) -> Voluntary:
+    entity = await db.voluntaries.find_one({"_id": ObjectId(voluntary_id)})
     if entity is not None:
         return model_from_mongo(Voluntary, entity)
     raise NotFoundError('Voluntary not found')
 
 
-def voluntary_index(
-    page: int,
-    page_size: int,
-    ground_id: Optional[str],
-    people_id: Optional[str],
-    bed_label: Optional[str],
-    db: Database
-) -> Pagination[Voluntary]:
+def voluntary_query(ground_id: Optional[str], people_id: Optional[str],
+                    bed_label: Optional[str]) -> dict:
     query = {}
     if ground_id is not None:
         query['ground_id'] = ground_id
@@ -71,45 +55,118 @@ def voluntary_index(
         query['people_id'] = people_id
     if bed_label is not None:
         query['bed_label'] = bed_label
-    entities = many_model_from_mongo(Voluntary, db.voluntaries.find(
-        query, limit=page_size, skip=(page - 1) * page_size))
-    row_count = db.voluntaries.count_documents(query)
-    return Pagination(entities=entities, row_count=row_count)
+    return query
 
 
-def voluntary_store(voluntary: VoluntaryStore, db: Database) -> Voluntary:
-    people = people_service.people_show(voluntary.people_id, db)
-    ground = ground_service.ground_show(voluntary.ground_id, db)
-    voluntary_must_not_exists(db,
+async def voluntary_index(
+    page: int,
+    page_size: int,
+    ground_id: Optional[str],
+    people_id: Optional[str],
+    bed_label: Optional[str],
+    db: Database,
+    *,
+    cursor: Optional[str] = None,
+    count: Optional[RowCount] = None
+) -> Pagination[Voluntary]:
+    query = voluntary_query(ground_id, people_id, bed_label)
+    # Voluntaries are only written by this service, so pages skip validation
+    return await paginate(db.voluntaries, Voluntary, query, page=page,
+                          page_size=page_size, cursor=cursor, count=count,
+                          trusted=True)
+
+
+def voluntary_export(
+    ground_id: Optional[str],
+    people_id: Optional[str],
+    bed_label: Optional[str],
+    format: FileFormat,
+    db: Database
+) -> StreamingResponse:
+    query = voluntary_query(ground_id, people_id, bed_label)
+    return export(db.voluntaries, Voluntary, query, format=format,
+                  filename='voluntaries')
+
+
+async def voluntary_store(voluntary: VoluntaryStore, db: Database) -> Voluntary:
+    people = await people_service.people_show(voluntary.people_id, db)
+    ground = await ground_service.ground_show(voluntary.ground_id, db)
+    await voluntary_must_not_exists(db,
                               bed_label=voluntary.bed_label,
                               ground_id=ground.id,
                               people_id=people.id)
-    data = voluntary.dict()
+    data = to_mongo(voluntary.dict())
     data['people_name'] = people.name
-    result = db.voluntaries.insert_one(data)
-    return model_from_mongo(
-        Voluntary, db.voluntaries.find_one({"_id": result.inserted_id}))
+    return await insert_entity(db.voluntaries, Voluntary, data)
 
 
-def voluntary_store_many(
+async def voluntary_store_many(
         voluntaries: List[VoluntaryStore], db: Database) -> VoluntaryStoreManyResponse:
-    response = VoluntaryStoreManyResponse(results=[])
+    # Same checks as voluntary_store, but with one query per collection for
+    # the whole batch instead of one per item
+    people_ids = [ObjectId(it) for it in {v.people_id for v in voluntaries}
+                  if ObjectId.is_valid(it)]
+    ground_ids = [ObjectId(it) for it in {v.ground_id for v in voluntaries}
+                  if ObjectId.is_valid(it)]
+    peoples = await db.peoples.find(
+        {"_id": {"$in": people_ids}}, {"name": 1}).to_list(None)
+    people_names = {str(it["_id"]): it["name"] for it in peoples}
+    grounds = await db.grounds.find(
+        {"_id": {"$in": ground_ids}}, {"_id": 1}).to_list(None)
+    ground_found = {str(it["_id"]) for it in grounds}
+    existing = await db.voluntaries.find({
+        "people_id": {"$in": list(people_names)},
+        "ground_id": {"$in": list(ground_found)},
+    }, {"people_id": 1, "ground_id": 1, "bed_label": 1}).to_list(None)
+    seen = {(it["people_id"], it["ground_id"], it["bed_label"])
+            for it in existing}
+
+    results: List[VoluntaryOrError] = []
+    documents = []
+    positions = []
     for voluntary in voluntaries:
+        key = (voluntary.people_id, voluntary.ground_id, voluntary.bed_label)
+        if voluntary.people_id not in people_names:
+            results.append(VoluntaryOrError(error='People not found'))
+        elif voluntary.ground_id not in ground_found:
+            results.append(VoluntaryOrError(error='Ground not found'))
+        elif key in seen:
+            results.append(VoluntaryOrError(
+                error='Voluntary already exists'))
+        else:
+            seen.add(key)
+            data = to_mongo(voluntary.dict())
+            data['people_name'] = people_names[voluntary.people_id]
+            positions.append(len(results))
+            documents.append(data)
+            results.append(VoluntaryOrError())
+
+    failed = {}
+    if documents:
         try:
-            entity = voluntary_store(voluntary, db)
-            response.voluntaries.append(VoluntaryOrError(voluntary=entity))
-        except DomainError as e:
-            response.errors.append(VoluntaryOrError(error=str(e)))
-    return response
-
-
-def voluntary_update(
+            await db.voluntaries.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                failed[error['index']] = (
+                    'Voluntary already exists' if error['code'] == 11000
+                    else error['errmsg'])
+    # insert_many sets "_id" on every document before sending it
+    for index, (position, data) in enumerate(zip(positions, documents)):
+        if index in failed:
+            results[position] = VoluntaryOrError(error=failed[index])
+        else:
+            results[position] = VoluntaryOrError(
+                voluntary=model_from_mongo(Voluntary, data))
+    return VoluntaryStoreManyResponse(results=results)
+
+
+async def voluntary_update(
     voluntary_id: str,
     update: VoluntaryUpdate,
     db: Database
 ) -> Voluntary:
     data = update.dict(exclude_unset=True)
-    entity = voluntary_show(voluntary_id, db)
+    entity = await voluntary_show(voluntary_id, db)
     if data.get('end_at') is not None:
         entity.end_at = data['end_at']
     if data.get('start_at') is not None:
@@ -117,25 +174,25 @@ def voluntary_update(
     if entity.end_at is not None:
         if entity.end_at < entity.start_at:
             raise ValueError('End date must be greater than start date')
-    entity = db.voluntaries.find_one_and_update(
+    entity = await update_entity(
+        db.voluntaries, Voluntary,
         {"_id": ObjectId(voluntary_id)},
-        {"$set": data},
+        {"$set": to_mongo(data)},
     )
     if entity is not None:
-        return model_from_mongo(
-            Voluntary, db.voluntaries.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('Voluntary not found')
 
 
-def voluntary_delete(voluntary_id: str, db: Database) -> None:
-    result = db.voluntaries.delete_one({"_id": ObjectId(voluntary_id)})
+async def voluntary_delete(voluntary_id: str, db: Database) -> None:
+    result = await db.voluntaries.delete_one({"_id": ObjectId(voluntary_id)})
     if result.deleted_count == 0:
         raise NotFoundError('Voluntary not found')
 
 
-def voluntary_must_not_exists(
+async def voluntary_must_not_exists(
         db: Database, *, people_id: str, ground_id: str, bed_label: str) -> None:
-    entity = db.voluntaries.find_one({
+    entity = await db.voluntaries.find_one({
         "people_id": people_id,
         "ground_id": ground_id,
         "bed_label": bed_label,
@@ -4,13 +4,13 @@ from typing import Optional
 from bson import ObjectId
 from pydantic import BaseModel
 
-import api.services.seeds_service as seeds_service
 import api.services.voluntaries_service as voluntaries_service
-from api.concerns import Pagination
+from api.concerns import (Pagination, RowCount, ensure_exist, insert_entity,
+                          paginate, update_entity)
 from api.database import Database
 from api.exceptions import AlreadyExistsError, NotFoundError
 from api.models import Voluntary, VoluntaryUsingSeed
-from api.utilities.mapper import many_model_from_mongo, model_from_mongo
+from api.utilities.mapper import model_from_mongo
 
 
 class VoluntaryUsingSeedStart(BaseModel):
@@ -18,7 +18,7 @@ class VoluntaryUsingSeedStart(BaseModel):
     seed_id: str
 
 
-def voluntary_using_seed_index(
+async def voluntary_using_seed_index(
         page: int,
         page_size: int,
         db: Database,
@@ -27,6 +27,8 @@ def voluntary_using_seed_index(
         seed_id: Optional[str] = None,
         ground_id: Optional[str] = None,
         bed_label: Optional[str] = None,
+        cursor: Optional[str] = None,
+        count: Optional[RowCount] = None,
 ) -> Pagination[VoluntaryUsingSeed]:
     query = {}
     if voluntary_id is not None:
@@ -37,63 +39,57 @@ def voluntary_using_seed_index(
         query["ground_id"] = ground_id
     if bed_label is not None:
         query["bed_label"] = bed_label
-    entities = many_model_from_mongo(VoluntaryUsingSeed, db.voluntaries_using_seeds.find(
-        query, limit=page_size, skip=(page - 1) * page_size))
-    row_count = db.voluntaries_using_seeds.count_documents(query)
-    return Pagination(entities=entities, row_count=row_count)
+    return await paginate(db.voluntaries_using_seeds, VoluntaryUsingSeed, query,
+                          page=page, page_size=page_size, cursor=cursor, count=count)
 
 
-def voluntary_using_seed_show(
+async def voluntary_using_seed_show(
         voluntary_using_seed_id: str, db: Database) -> VoluntaryUsingSeed:
-    entity = db.voluntaries_using_seeds.find_one(
+    entity = await db.voluntaries_using_seeds.find_one(
         {"_id": ObjectId(voluntary_using_seed_id)})
     if entity is not None:
         return model_from_mongo(VoluntaryUsingSeed, entity)
     raise NotFoundError('VoluntaryUsingSeed not found')
 
 
-def voluntary_using_seed_start(
+async def voluntary_using_seed_start(
         data: VoluntaryUsingSeedStart, db: Database) -> VoluntaryUsingSeed:
-    voluntary = voluntaries_service.voluntary_show(data.voluntary_id, db)
-    seed = seeds_service.seed_show(data.seed_id, db)
-    voluntary_using_seed_must_not_exists(
-        db, voluntary=voluntary, seed_id=seed.id)
-    result = db.voluntaries_using_seeds.insert_one({
+    voluntary = await voluntaries_service.voluntary_show(data.voluntary_id, db)
+    await ensure_exist(db, 'seeds', [data.seed_id], entity='Seed')
+    await voluntary_using_seed_must_not_exists(
+        db, voluntary=voluntary, seed_id=data.seed_id)
+    return await insert_entity(db.voluntaries_using_seeds, VoluntaryUsingSeed, {
         "voluntary_id": ObjectId(voluntary.id),
         "ground_id": ObjectId(voluntary.ground_id),
         "bed_label": voluntary.bed_label,
-        "seed_id": ObjectId(seed.id),
+        "seed_id": ObjectId(data.seed_id),
         "start_at": date.today().isoformat(),
     })
-    if result.inserted_id is not None:
-        return model_from_mongo(
-            VoluntaryUsingSeed, db.voluntaries_using_seeds.find_one({"_id": result.inserted_id}))
-    raise NotFoundError('VoluntaryUsingSeed not found')
 
 
-def voluntary_using_seed_end(
+async def voluntary_using_seed_end(
         voluntary_using_seed_id: str, db: Database) -> VoluntaryUsingSeed:
-    entity = db.voluntaries_using_seeds.find_one_and_update(
+    entity = await update_entity(
+        db.voluntaries_using_seeds, VoluntaryUsingSeed,
         {"_id": ObjectId(voluntary_using_seed_id)},
         {"$set": {"end_at": date.today().isoformat()}}
     )
     if entity is not None:
-        return model_from_mongo(
-            VoluntaryUsingSeed, db.voluntaries_using_seeds.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('VoluntaryUsingSeed not found')
 
 
-def voluntary_using_seed_delete(
+async def voluntary_using_seed_delete(
         voluntary_using_seed_id: str, db: Database) -> None:
-    result = db.voluntaries_using_seeds.delete_one(
+    result = await db.voluntaries_using_seeds.delete_one(
         {"_id": ObjectId(voluntary_using_seed_id)})
     if result.deleted_count == 0:
         raise NotFoundError('VoluntaryUsingSeed not found')
 
 
-def voluntary_using_seed_must_not_exists(
+async def voluntary_using_seed_must_not_exists(
         db: Database, *, voluntary: Voluntary, seed_id: str) -> None:
-    entity = db.voluntaries_using_seeds.find_one({
+    entity = await db.voluntaries_using_seeds.find_one({
         "voluntary_id": ObjectId(voluntary.id),
         "ground_id": ObjectId(voluntary.ground_id),
         "bed_label": voluntary.bed_label,
@@ -4,13 +4,13 @@ from typing import Optional
 from bson import ObjectId
 from pydantic import BaseModel
 
-import api.services.tools_service as tools_service
 import api.services.voluntaries_service as voluntaries_service
-from api.concerns import Pagination
+from api.concerns import (Pagination, RowCount, ensure_exist, insert_entity,
+                          paginate, update_entity)
 from api.database import Database
 from api.exceptions import AlreadyExistsError, NotFoundError
 from api.models import Voluntary, VoluntaryUsingTool
-from api.utilities.mapper import many_model_from_mongo, model_from_mongo
+from api.utilities.mapper import model_from_mongo
 
 
 class VoluntaryUsingToolStart(BaseModel):
@@ -18,7 +18,7 @@ class VoluntaryUsingToolStart(BaseModel):
     tool_id: str
 
 
-def voluntary_using_tool_index(
+async def voluntary_using_tool_index(
         page: int,
         page_size: int,
         db: Database,
@@ -27,6 +27,8 @@ def voluntary_using_tool_index(
         tool_id: Optional[str] = None,
         ground_id: Optional[str] = None,
         bed_label: Optional[str] = None,
+        cursor: Optional[str] = None,
+        count: Optional[RowCount] = None,
 ) -> Pagination[VoluntaryUsingTool]:
     query = {}
     if voluntary_id is not None:
@@ -37,63 +39,57 @@ def voluntary_using_tool_index(
         query["ground_id"] = ground_id
     if bed_label is not None:
         query["bed_label"] = bed_label
-    entities = many_model_from_mongo(VoluntaryUsingTool, db.voluntaries_using_tools.find(
-        query, limit=page_size, skip=(page - 1) * page_size))
-    row_count = db.voluntaries_using_tools.count_documents(query)
-    return Pagination(entities=entities, row_count=row_count)
+    return await paginate(db.voluntaries_using_tools, VoluntaryUsingTool, query,
+                          page=page, page_size=page_size, cursor=cursor, count=count)
 
 
-def voluntary_using_tool_show(
+async def voluntary_using_tool_show(
         voluntary_using_tool_id: str, db: Database) -> VoluntaryUsingTool:
-    entity = db.voluntaries_using_tools.find_one(
+    entity = await db.voluntaries_using_tools.find_one(
         {"_id": ObjectId(voluntary_using_tool_id)})
     if entity is not None:
         return model_from_mongo(VoluntaryUsingTool, entity)
     raise NotFoundError('VoluntaryUsingTool not found')
 
 
-def voluntary_using_tool_start(
+async def voluntary_using_tool_start(
         data: VoluntaryUsingToolStart, db: Database) -> VoluntaryUsingTool:
-    voluntary = voluntaries_service.voluntary_show(data.voluntary_id, db)
-    tool = tools_service.tool_show(data.tool_id, db)
-    voluntary_using_tool_must_not_exists(
-        db, voluntary=voluntary, tool_id=tool.id)
-    result = db.voluntaries_using_tools.insert_one({
+    voluntary = await voluntaries_service.voluntary_show(data.voluntary_id, db)
+    await ensure_exist(db, 'tools', [data.tool_id], entity='Tool')
+    await voluntary_using_tool_must_not_exists(
+        db, voluntary=voluntary, tool_id=data.tool_id)
+    return await insert_entity(db.voluntaries_using_tools, VoluntaryUsingTool, {
         "voluntary_id": ObjectId(voluntary.id),
         "ground_id": ObjectId(voluntary.ground_id),
         "bed_label": voluntary.bed_label,
-        "tool_id": ObjectId(tool.id),
+        "tool_id": ObjectId(data.tool_id),
         "start_at": date.today().isoformat(),
     })
-    if result.inserted_id is not None:
-        return model_from_mongo(
-            VoluntaryUsingTool, db.voluntaries_using_tools.find_one({"_id": result.inserted_id}))
-    raise NotFoundError('VoluntaryUsingTool not found')
 
 
-def voluntary_using_tool_end(
+async def voluntary_using_tool_end(
         voluntary_using_tool_id: str, db: Database) -> VoluntaryUsingTool:
-    entity = db.voluntaries_using_tools.find_one_and_update(
+    entity = await update_entity(
+        db.voluntaries_using_tools, VoluntaryUsingTool,
         {"_id": ObjectId(voluntary_using_tool_id)},
         {"$set": {"end_at": date.today().isoformat()}}
     )
     if entity is not None:
-        return model_from_mongo(
-            VoluntaryUsingTool, db.voluntaries_using_tools.find_one({"_id": entity["_id"]}))
+        return entity
     raise NotFoundError('VoluntaryUsingTool not found')
 
 
-def voluntary_using_tool_delete(
+async def voluntary_using_tool_delete(
         voluntary_using_tool_id: str, db: Database) -> None:
-    result = db.voluntaries_using_tools.delete_one(
+    result = await db.voluntaries_using_tools.delete_one(
         {"_id": ObjectId(voluntary_using_tool_id)})
     if result.deleted_count == 0:
         raise NotFoundError('VoluntaryUsingTool not found')
 
 
-def voluntary_using_tool_must_not_exists(
+async def voluntary_using_tool_must_not_exists(
         db: Database, *, voluntary: Voluntary, tool_id: str) -> None:
-    entity = db.voluntaries_using_tools.find_one({
+    entity = await db.voluntaries_using_tools.find_one({
         "voluntary_id": ObjectId(voluntary.id),
         "ground_id": ObjectId(voluntary.ground_id),
         "bed_label": voluntary.bed_label,
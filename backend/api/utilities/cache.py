@@ -0,0 +1,47 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class TTLCache(Generic[K, V]):
+    '''
+    In-process LRU cache whose entries expire after `ttl` milliseconds
+    '''
+
+    def __init__(self, max_size: int, ttl: int) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: 'OrderedDict[K, Tuple[float, V]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: K) -> Optional[V]:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._items[key] = (time.monotonic() + self.ttl / 1000, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        self._items.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[K], bool]) -> None:
+        for key in [key for key in self._items if predicate(key)]:
+            del self._items[key]
+
+    def clear(self) -> None:
+        self._items.clear()
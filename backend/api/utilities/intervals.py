@@ -0,0 +1,35 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Generic, Iterable, List, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class IntervalIndex(Generic[T]):
+    '''
+    Static index of half-open [start, end) intervals. Items are sorted by
+    start, next to the running maximum of their ends, so both bounds of an
+    overlap query are binary searches: O(log n + k) for k candidates.
+    '''
+
+    def __init__(self, items: Iterable[T],
+                 key: Callable[[T], Tuple[Any, Any]]) -> None:
+        self.key = key
+        self._items = sorted(items, key=lambda it: key(it)[0])
+        self._starts = [key(it)[0] for it in self._items]
+        self._max_ends: List[Any] = []
+        for item in self._items:
+            end = key(item)[1]
+            if self._max_ends and self._max_ends[-1] > end:
+                end = self._max_ends[-1]
+            self._max_ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def overlapping(self, start: Any, end: Any) -> List[T]:
+        # Items before `lo` all end at or before `start`, items from `hi`
+        # on all start at or after `end`
+        lo = bisect_right(self._max_ends, start)
+        hi = bisect_left(self._starts, end)
+        return [item for item in self._items[lo:hi]
+                if self.key(item)[1] > start]
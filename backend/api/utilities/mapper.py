@@ -1,22 +1,77 @@
-from typing import List, Optional
+import base64
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
-from bson import ObjectId
+from bson import ObjectId, json_util
+from pydantic import BaseModel
 
 
-def model_from_mongo(Model, item):
+def trusted_value(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: trusted_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [trusted_value(v) for v in value]
+    return value
+
+
+@lru_cache(maxsize=None)
+def trusted_fields(Model) -> List[Tuple[str, Any]]:
+    # (name, nested model or None) of every field of Model
+    return [(name, field.type_ if isinstance(field.type_, type)
+             and issubclass(field.type_, BaseModel) else None)
+            for name, field in Model.__fields__.items()]
+
+
+def construct_trusted(Model, data: dict):
+    # Like Model(**data) without validation: ids become strings, dates stay
+    # ISO strings and nested models are constructed the same way
+    values = {}
+    for name, Nested in trusted_fields(Model):
+        if name not in data:
+            continue
+        value = data[name]
+        if Nested is not None and isinstance(value, list):
+            value = [construct_trusted(Nested, it) for it in value]
+        elif Nested is not None and isinstance(value, dict):
+            value = construct_trusted(Nested, value)
+        else:
+            value = trusted_value(value)
+        values[name] = value
+    return Model.construct(**values)
+
+
+def model_from_mongo(Model, item, trusted: bool = False):
     item_dict = dict(item)
     item_dict["id"] = str(item["_id"])
     del item_dict["_id"]
+    if trusted:
+        # Only for rows written by our own services
+        return construct_trusted(Model, item_dict)
     return Model(**item_dict)
 
 
-def many_model_from_mongo(Model, items):
-    return [model_from_mongo(Model, item) for item in items]
+def many_model_from_mongo(Model, items, trusted: bool = False):
+    return [model_from_mongo(Model, item, trusted) for item in items]
+
+
+def to_mongo(value: Any) -> Any:
+    # bson has no date type, so dates are stored as ISO strings
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: to_mongo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_mongo(v) for v in value]
+    return value
 
 
 def dict_date_fields(item: dict, *fields: List[str]) -> dict:
     for field in fields:
-        if item.get(field):
+        # Trusted models already hold ISO strings
+        if isinstance(item.get(field), date):
             item[field] = item[field].isoformat()
     return item
 
@@ -32,3 +87,55 @@ def order_by_to_mongo(order_by: Optional[List[str]]) -> List[tuple]:
         return []
     return [(field[:-3], 1) if field.endswith('_up') else (field[:-5], -1)
             for field in order_by if field]
+
+
+def keyset_sort(sort: List[tuple]) -> List[tuple]:
+    # Seeking needs a total order, so _id breaks the ties
+    if any(field == '_id' for field, _ in sort):
+        return list(sort)
+    return [*sort, ('_id', 1)]
+
+
+def keyset_values(sort: List[tuple], item: dict) -> Dict[str, Any]:
+    return {field: item.get(field) for field, _ in sort}
+
+
+def keyset_query(sort: List[tuple], values: Dict[str, Any]) -> dict:
+    # (a, b, _id) > (x, y, z) <=> a > x or (a = x and b > y) or ...
+    # Nulls sort first in mongo, so "after null" on an ascending key is any
+    # value, nothing comes after null on a descending key and nulls come
+    # after any value on a descending key.
+    clauses = []
+    for index, (field, direction) in enumerate(sort):
+        clause = {key: values[key] for key, _ in sort[:index]}
+        value = values[field]
+        if value is None:
+            if direction < 0:
+                continue
+            clause[field] = {"$ne": None}
+        elif direction > 0:
+            clause[field] = {"$gt": value}
+        else:
+            clause["$or"] = [{field: {"$lt": value}}, {field: None}]
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def normalize_query(query: dict) -> str:
+    return json_util.dumps(query, sort_keys=True)
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    data = json_util.dumps(values).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def decode_cursor(cursor: str, sort: List[tuple]) -> Dict[str, Any]:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor))
+    except Exception as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, dict) or \
+            list(values.keys()) != [field for field, _ in sort]:
+        raise ValueError('Invalid cursor')
+    return values
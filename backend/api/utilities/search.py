@@ -0,0 +1,91 @@
+import re
+import unicodedata
+from math import ceil
+from typing import List, Optional, Tuple
+
+from bson.regex import Regex
+
+GRAM_SIZE = 3
+# Share of the search grams a name must have, lower tolerates more typos
+MIN_GRAMS_MATCH = 0.5
+
+
+def normalize_text(text: str) -> str:
+    # Lowercase, accents folded and anything but letters and digits as spaces
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[^\W_]+', text))
+
+
+def text_grams(text: str, size: int = GRAM_SIZE) -> List[str]:
+    '''
+    Grams of every word, padded by a leading space so that the grams at the
+    start of a word only match prefixes. Shorter words are kept whole.
+    '''
+    grams = set()
+    for word in normalize_text(text).split():
+        padded = f' {word}'
+        if len(padded) <= size:
+            grams.add(padded)
+            continue
+        grams.update(padded[i:i + size]
+                     for i in range(len(padded) - size + 1))
+    return sorted(grams)
+
+
+def search_fields(field: str, value: str) -> dict:
+    # Stored next to `field` by store and update, see search_query
+    return {f'{field}_search': normalize_text(value),
+            f'{field}_grams': text_grams(value)}
+
+
+def search_projection(field: str) -> dict:
+    return {f'{field}_search': 0, f'{field}_grams': 0}
+
+
+def search_query(field: str, search: str) -> Tuple[dict, Optional[dict]]:
+    '''
+    Query and relevance score of `search` over the fields of search_fields.
+    The query is backed by the multikey index on the grams, a name matching
+    enough of them is found despite typos. The score is the share of matched
+    grams, plus a bonus when the normalized name starts with or contains the
+    normalized search.
+    '''
+    normalized = normalize_text(search)
+    grams = text_grams(search)
+    if len(normalized) < GRAM_SIZE - 1:
+        # A gram needs more than one character, fall back to an anchored
+        # prefix which still uses the index on the normalized field
+        pattern = f'^{re.escape(normalized)}'
+        return {f'{field}_search': {"$regex": pattern}}, None
+    shared = {"$size": {"$setIntersection": [f"${field}_grams", grams]}}
+    position = {"$indexOfCP": [f"${field}_search", normalized]}
+    query = {
+        f'{field}_grams': {"$in": grams},
+        "$expr": {"$gte": [shared, ceil(len(grams) * MIN_GRAMS_MATCH)]},
+    }
+    score = {"$add": [
+        {"$divide": [shared, len(grams)]},
+        {"$cond": [{"$eq": [position, 0]}, 1, 0]},
+        {"$cond": [{"$gt": [position, 0]}, 0.5, 0]},
+    ]}
+    return query, score
+
+
+def prefix_keys(*values: str) -> List[str]:
+    # Every normalized word of the values, for a multikey prefix index
+    return sorted({word for value in values
+                   for word in normalize_text(value).split()})
+
+
+def prefix_query(field: str, search: str) -> Optional[dict]:
+    '''
+    Every word of `search` must prefix one of the prefix_keys stored in
+    `field`. Anchored patterns are index range scans, the first one bounds
+    the scan and the others filter it.
+    '''
+    words = normalize_text(search).split()
+    if not words:
+        return None
+    return {field: {"$all": [Regex(f'^{re.escape(word)}')
+                             for word in words]}}
@@ -3,7 +3,8 @@ import asyncio
 import concurrent.futures
 import glob
 import subprocess
-from typing import Any
+import time
+from typing import Any, Callable, Optional
 
 
 def tip(*args):
@@ -42,11 +43,34 @@ async def command_format(args):
         await format_files()
 
 
+def uvicorn_command(*options):
+    return ["uvicorn", "api.app:app", *options]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summarize(latencies):
+    # Latencies in seconds, percentiles in milliseconds
+    return {f"p{p}": percentile(latencies, p) * 1000 for p in (50, 95, 99)}
+
+
+async def timed(operation, latencies):
+    # Appends the latency of the operation even when it raises
+    start = time.perf_counter()
+    try:
+        return await operation
+    finally:
+        latencies.append(time.perf_counter() - start)
+
+
 async def command_run(args):
     if args.dev:
-        cmd_run(["uvicorn", "api.app:app", "--reload"])
+        cmd_run(uvicorn_command("--reload"))
     else:
-        cmd_run(["uvicorn", "api.app:app"])
+        cmd_run(uvicorn_command())
 
 
 async def command_venv(_args):
@@ -106,14 +130,15 @@ async def command_register_admin(args):
         email=args.email,
         password=args.password,
         cellphone=args.cellphone)
-    for db in get_db():
+    async for db in get_db():
         print('INFO: Executing register admin')
-        users_service.user_store(data, db)
+        await users_service.user_store(data, db)
         print('INFO: Admin registered successfully')
 
 
 async def command_setup_database_indexes(args):
     import pymongo
+    from pymongo.errors import OperationFailure
 
     from api.database import get_db
     from api.env import settings
@@ -128,38 +153,274 @@ async def command_setup_database_indexes(args):
             dict(keys=[("people_id", pymongo.ASCENDING), ("ground_id", pymongo.ASCENDING), ("bed_label", pymongo.ASCENDING)], unique=True),
             dict(keys=[("people_id", pymongo.HASHED)]),
             dict(keys=[("ground_id", pymongo.HASHED)]),
+            dict(keys=[("ground_id", pymongo.ASCENDING), ("bed_label", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]),
+        ]),
+        ('bed_schedules', [
+            dict(keys=[("ground_id", pymongo.ASCENDING), ("bed_label", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]),
+        ]),
+        ('bed_intervals', [
+            dict(keys=[("bed_schedules_id", pymongo.ASCENDING)]),
+            # end_at first, so overlapping intervals are scanned from the
+            # ones still open at the start of the range
+            dict(keys=[("end_at", pymongo.ASCENDING), ("start_at", pymongo.ASCENDING)]),
+            dict(keys=[("ground_id", pymongo.ASCENDING), ("end_at", pymongo.ASCENDING), ("start_at", pymongo.ASCENDING)]),
+            dict(keys=[("ground_id", pymongo.ASCENDING), ("bed_label", pymongo.ASCENDING), ("end_at", pymongo.ASCENDING), ("start_at", pymongo.ASCENDING)]),
         ]),
         ('peoples', [
             dict(keys=[("$**", pymongo.TEXT)], default_language="portuguese"),
             dict(keys=[("email", pymongo.ASCENDING)], unique=True),
+            dict(keys=[("search_keys", pymongo.ASCENDING)]),
         ]),
         ('users', [dict(keys=[("email", pymongo.ASCENDING)], unique=True)]),
         ('tools', [
             dict(keys=[("name", pymongo.TEXT), ("description", pymongo.TEXT)], default_language="portuguese"),
             dict(keys=[("name", pymongo.ASCENDING)], unique=True),
+            dict(keys=[("name_grams", pymongo.ASCENDING)]),
+            dict(keys=[("name_search", pymongo.ASCENDING)]),
         ]),
         ('seeds', [
             dict(keys=[("name", pymongo.TEXT), ("description", pymongo.TEXT)], default_language="portuguese"),
             dict(keys=[("name", pymongo.ASCENDING)], unique=True),
+            dict(keys=[("name_grams", pymongo.ASCENDING)]),
+            dict(keys=[("name_search", pymongo.ASCENDING)]),
         ]),
         ('grounds', [
             dict(keys=[("$**", pymongo.TEXT)], default_language="portuguese"),
+            dict(keys=[("beds.label", pymongo.ASCENDING)]),
+            dict(keys=[("beds.status", pymongo.ASCENDING)]),
+            dict(keys=[("beds.end_at", pymongo.ASCENDING)]),
         ]),
     ]
+    # Dropped when they exist, the indexes above replace them
+    replaced = [
+        ('bed_intervals', [("start_at", pymongo.ASCENDING), ("end_at", pymongo.ASCENDING)]),
+        ('bed_intervals', [("ground_id", pymongo.ASCENDING), ("start_at", pymongo.ASCENDING), ("end_at", pymongo.ASCENDING)]),
+        ('bed_intervals', [("ground_id", pymongo.ASCENDING), ("bed_label", pymongo.ASCENDING), ("start_at", pymongo.ASCENDING), ("end_at", pymongo.ASCENDING)]),
+    ]
 
-    for db in get_db():
+    async for db in get_db():
         print('INFO: Executing setup database index')
 
         for i, (collection, index) in enumerate(indexes):
             for j, idx in enumerate(index):
-                db[collection].create_index(**idx)
+                await db[collection].create_index(**idx)
                 print(f"INFO: {i + 1}/{len(indexes)} | {j + 1}/{len(index)} | {collection} index created")
 
+        for collection, keys in replaced:
+            try:
+                await db[collection].drop_index(keys)
+                print(f"INFO: {collection} index {keys} replaced")
+            except OperationFailure:
+                pass
+
         print('INFO: Database index setup successfully')
     # fmt: on
 
 
+async def command_index_advisor(args):
+    '''
+    Explains the query shapes issued by the services, flags the ones read by
+    a COLLSCAN or sorted in memory and proposes the missing compound index,
+    with the equality fields first, then the sort and then the ranges.
+    --apply creates the proposed indexes, which is a no-op when they exist.
+    '''
+    from datetime import date
+
+    from bson import ObjectId
+    from pymongo.errors import OperationFailure
+
+    from api.database import get_db
+    from api.env import settings
+    from api.utilities.mapper import keyset_sort
+    from api.utilities.search import prefix_query, search_query
+
+    if settings.production and args.apply and not args.force:
+        print('ERROR: You are trying to create indexes in production mode. If you really want to do this, use --force flag')
+        exit(1)
+
+    oid = ObjectId()
+    sid = str(oid)
+    today = date.today().isoformat()
+    overlapping = {"end_at": {"$gt": today}, "start_at": {"$lt": today}}
+    page = keyset_sort([])
+    # Query shapes as issued by the services, paginate's $match and $sort
+    # are explained as the equivalent find
+    # fmt: off
+    shapes = [
+        ('bed_intervals_delete', 'bed_intervals', {"bed_schedules_id": sid}, []),
+        ('bed_intervals_overlapping', 'bed_intervals', overlapping, []),
+        ('bed_intervals_overlapping ground', 'bed_intervals', {"ground_id": sid, **overlapping}, []),
+        ('bed_intervals_overlapping bed', 'bed_intervals', {"ground_id": sid, "bed_label": "1", **overlapping}, []),
+        ('bed_schedules_index', 'bed_schedules', {"ground_id": sid, "bed_label": "1"}, page),
+        ('bed_schedules_export ground', 'bed_schedules', {"ground_id": sid}, page),
+        ('ground_delete bed_schedules', 'bed_schedules', {"ground_id": sid}, []),
+        ('ground_index', 'grounds', {}, page),
+        ('ground_beds_index', 'grounds', {"beds.status": {"$in": ["free"]}}, []),
+        ('grounds_donate_index', 'grounds_donate', {}, page),
+        ('people_index', 'peoples', {}, page),
+        ('people_index name', 'peoples', {}, keyset_sort([("name", 1)])),
+        ('people_must_not_exists', 'peoples', {"email": "people@example.com"}, []),
+        ('people_autocomplete', 'peoples', prefix_query("search_keys", "ma"), []),
+        ('seed_index', 'seeds', {}, page),
+        ('seed_index name', 'seeds', {}, keyset_sort([("name", 1)])),
+        ('seed_index search', 'seeds', search_query("name", "abobora")[0], []),
+        ('seed_index short search', 'seeds', search_query("name", "a")[0], page),
+        ('seed_must_not_exists', 'seeds', {"name": "Abobora"}, []),
+        ('tool_index', 'tools', {}, page),
+        ('tool_index name', 'tools', {}, keyset_sort([("name", 1)])),
+        ('tool_index search', 'tools', search_query("name", "enxada")[0], []),
+        ('tool_must_not_exists', 'tools', {"name": "Enxada"}, []),
+        ('user_auth', 'users', {"email": "user@example.com"}, []),
+        ('user_index', 'users', {}, page),
+        ('voluntary_index ground', 'voluntaries', {"ground_id": sid}, page),
+        ('voluntary_index people', 'voluntaries', {"people_id": sid}, page),
+        ('voluntary_index bed', 'voluntaries', {"ground_id": sid, "bed_label": "1"}, page),
+        ('voluntary_must_not_exists', 'voluntaries', {"people_id": sid, "ground_id": sid, "bed_label": "1"}, []),
+        ('voluntary_store_many', 'voluntaries', {"people_id": {"$in": [sid]}, "ground_id": {"$in": [sid]}}, []),
+        ('voluntary_request_index', 'voluntaries_request', {}, page),
+        ('voluntary_using_seed_index voluntary', 'voluntaries_using_seeds', {"voluntary_id": sid}, page),
+        ('voluntary_using_seed_index seed', 'voluntaries_using_seeds', {"seed_id": sid}, page),
+        ('voluntary_using_seed_index bed', 'voluntaries_using_seeds', {"ground_id": sid, "bed_label": "1"}, page),
+        ('voluntary_using_seed_must_not_exists', 'voluntaries_using_seeds', {"voluntary_id": oid, "ground_id": oid, "bed_label": "1", "seed_id": oid}, []),
+        ('voluntary_using_tool_index voluntary', 'voluntaries_using_tools', {"voluntary_id": sid}, page),
+        ('voluntary_using_tool_index tool', 'voluntaries_using_tools', {"tool_id": sid}, page),
+        ('voluntary_using_tool_index bed', 'voluntaries_using_tools', {"ground_id": sid, "bed_label": "1"}, page),
+        ('voluntary_using_tool_must_not_exists', 'voluntaries_using_tools', {"voluntary_id": oid, "ground_id": oid, "bed_label": "1", "tool_id": oid}, []),
+    ]
+    # fmt: on
+
+    def plan_stages(plan):
+        stages = [plan]
+        for child in [plan.get('inputStage'), *plan.get('inputStages', [])]:
+            if child:
+                stages += plan_stages(child)
+        return stages
+
+    def propose(query, sort):
+        equality, ranges = [], []
+        for field, value in query.items():
+            if field == '$expr':
+                continue
+            if field.startswith('$'):
+                return None
+            operators = isinstance(value, dict) and \
+                any(key.startswith('$') for key in value)
+            # $in walks the index in order only without a sort
+            if not operators or (list(value) == ['$in'] and not sort):
+                equality.append(field)
+            else:
+                ranges.append(field)
+        keys = [(field, 1) for field in equality]
+        keys += [(field, direction) for field, direction in sort
+                 if field not in equality]
+        keys += [(field, 1) for field in ranges if field not in dict(keys)]
+        return keys
+
+    def covered(keys, indexes):
+        return any(index[:len(keys)] == keys for index in indexes)
+
+    async for db in get_db():
+        print('INFO: Explaining the query shapes of the services')
+        proposals = {}
+        for name, collection, query, sort in shapes:
+            explain = await db.command({
+                "explain": {"find": collection, "filter": query,
+                            "sort": dict(sort), "limit": 10},
+                "verbosity": "queryPlanner",
+            })
+            plan = explain["queryPlanner"]["winningPlan"]
+            stages = plan_stages(plan.get("queryPlan", plan))
+            kinds = [it["stage"] for it in stages]
+            if 'EOF' in kinds:
+                print(f"WARN: {name} | {collection} does not exist, skipped")
+                continue
+            problems = [kind for kind in ('COLLSCAN', 'SORT') if kind in kinds]
+            if not problems:
+                used = ', '.join(it["indexName"] for it in stages
+                                 if "indexName" in it)
+                print(f"INFO: {name} | {used}")
+                continue
+            keys = propose(query, sort)
+            if keys is None:
+                print(f"WARN: {name} | {', '.join(problems)}, no index proposed")
+                continue
+            print(f"WARN: {name} | {', '.join(problems)}, propose {collection} {keys}")
+            proposals.setdefault(collection, [])
+            if keys not in proposals[collection]:
+                proposals[collection].append(keys)
+
+        indexes = []
+        for collection, candidates in proposals.items():
+            existing = [list(it["key"]) for it in
+                        (await db[collection].index_information()).values()]
+            for keys in candidates:
+                # An index starting with the keys serves them too
+                longer = [it for it in candidates if it != keys]
+                if covered(keys, longer) or covered(keys, existing):
+                    continue
+                indexes.append((collection, keys))
+
+        if not indexes:
+            print('INFO: No missing indexes')
+            return
+        for collection, keys in indexes:
+            print(f"INFO: Missing index {collection} {keys}")
+        if not args.apply:
+            print('TIP: Use --apply to create the missing indexes')
+            return
+        for i, (collection, keys) in enumerate(indexes):
+            try:
+                name = await db[collection].create_index(keys)
+                print(f"INFO: {i + 1}/{len(indexes)} | {collection} {name} created")
+            except OperationFailure as e:
+                print(f"ERROR: {i + 1}/{len(indexes)} | {collection} {keys}: {e}")
+
+
+async def command_beds_rollover(_args):
+    import api.services.grounds_service as grounds_service
+    from api.database import get_db
+
+    async for db in get_db():
+        print('INFO: Executing beds rollover')
+        modified = await grounds_service.ground_beds_rollover(db)
+        print(f'INFO: {modified} grounds updated')
+
+
+async def command_rebuild_bed_intervals(_args):
+    import api.services.bed_intervals_service as bed_intervals_service
+    from api.database import get_db
+
+    async for db in get_db():
+        print('INFO: Executing rebuild bed intervals')
+        count = await bed_intervals_service.bed_intervals_rebuild(db)
+        print(f'INFO: {count} bed intervals created')
+
+
+async def command_rebuild_search_fields(_args):
+    from api.concerns import collection_changed, rebuild_computed_fields
+    from api.database import get_db
+    from api.services.peoples_service import people_search_fields
+    from api.utilities.search import search_fields
+
+    def name_search_fields(item):
+        return search_fields('name', item.get('name') or '')
+
+    rebuilds = [
+        ('seeds', ['name'], name_search_fields),
+        ('tools', ['name'], name_search_fields),
+        ('peoples', ['name', 'email', 'cellphone'], people_search_fields),
+    ]
+
+    async for db in get_db():
+        print('INFO: Executing rebuild search fields')
+        for collection, fields, compute in rebuilds:
+            count = await rebuild_computed_fields(db[collection], fields, compute)
+            await collection_changed(db, collection)
+            print(f'INFO: {collection} | {count} documents updated')
+
+
 async def command_drop_database(args):
+    from api.concerns import collection_changed
     from api.database import get_db
     from api.env import settings
 
@@ -168,6 +429,7 @@ async def command_drop_database(args):
         exit(1)
 
     collections = [
+        'bed_intervals',
         'bed_schedules',
         'grounds',
         'grounds_donate',
@@ -181,12 +443,14 @@ async def command_drop_database(args):
         'voluntaries_using_tools',
     ]
 
-    for db in get_db():
+    async for db in get_db():
         print('INFO: Executing drop database')
         for i, collection in enumerate(collections):
             # db.get_collection(collection).drop()
-            db.get_collection(collection).delete_many({})
+            await db.get_collection(collection).delete_many({})
             print(f"INFO: {i + 1}/{len(collections)} | {collection} dropped")
+        # The servers running stop answering with the ETags of the old rows
+        await collection_changed(db, *collections)
         print('INFO: Database dropped successfully')
 
 
@@ -239,7 +503,17 @@ async def command_seed_database(args):
                 self.entities[name] = []
             self.entities[name].append(entity)
 
-    def apply_commands(data: dict, db: Database) -> dict:
+    async def sample_from_database(db: Database, collection: str) -> dict:
+        entities = await db \
+            .get_collection(collection) \
+            .aggregate([{"$sample": {"size": 1}}]) \
+            .to_list(1)
+        entity = next(iter(entities), None)
+        if not entity:
+            raise Exception(f'Entity in {collection} not found')
+        return entity
+
+    async def apply_commands(data: dict, sample: Callable) -> dict:
         ctx = Context()
         command_eval = '#(eval):'
         command_sample = '#(sample):'
@@ -247,9 +521,9 @@ async def command_seed_database(args):
         command_random_bool = '#(random.bool)'
         for key in data:
             if isinstance(data[key], dict):
-                ctx.result[key] = apply_commands(data[key], db)
+                ctx.result[key] = await apply_commands(data[key], sample)
             elif isinstance(data[key], list):
-                ctx.result[key] = [apply_commands(item, db)
+                ctx.result[key] = [await apply_commands(item, sample)
                                    for item in data[key]]
             elif not isinstance(data[key], str):
                 ctx.result[key] = data[key]
@@ -258,12 +532,7 @@ async def command_seed_database(args):
                 ctx.result[key] = eval(script)
             elif data[key].startswith(command_sample):
                 collection = data[key][len(command_sample):]
-                entities = db \
-                    .get_collection(collection) \
-                    .aggregate([{"$sample": {"size": 1}}])
-                entity = next(entities, None)
-                if not entity:
-                    raise Exception(f'Entity in {collection} not found')
+                entity = await sample(collection)
                 ctx.add_entity(collection, entity)
                 ctx.result[key] = str(entity['_id'])
             elif data[key] == command_date_today:
@@ -289,7 +558,15 @@ async def command_seed_database(args):
     ]
     # fmt: on
 
-    for db in get_db():
+    if args.bulk:
+        async for db in get_db():
+            await seed_database_bulk(db, args, mocks, read_json, apply_commands)
+        return
+
+    async for db in get_db():
+        def sample(collection):
+            return sample_from_database(db, collection)
+
         for i, (json_path, store, Model) in enumerate(mocks):
             collection = Path(json_path).stem
             values = read_json(Path('mocks') / json_path)
@@ -305,11 +582,11 @@ async def command_seed_database(args):
                         repeat_data = {**data}
                         del repeat_data['$$repeat']
                         for _ in range(count):
-                            data = apply_commands(repeat_data, db)
-                            store(Model(**data), db)
+                            data = await apply_commands(repeat_data, sample)
+                            await store(Model(**data), db)
                     else:
-                        data = apply_commands(data, db)
-                        store(Model(**data), db)
+                        data = await apply_commands(data, sample)
+                        await store(Model(**data), db)
                 except Exception as e:
                     traceback.print_exc()
                     print(f"ERROR: {prefix}: Failed to seed")
@@ -318,6 +595,992 @@ async def command_seed_database(args):
             print(f"INFO: {prefix}: Seed completed")
 
 
+async def seed_database_bulk(db, args, mocks, read_json, apply_commands):
+    '''
+    The mocks of seed-database built in memory and written with insert_many
+    instead of going through the services one by one. The high volume
+    collections are repeated `--scale` times and the ones they reference
+    `--reference-scale` times, so millions of voluntaries and bed schedules
+    share a bounded set of grounds and peoples. The samples are a random
+    pool of up to `--sample-size` compact documents per collection, loaded
+    once, and the collections of a level run in parallel because they only
+    sample the previous levels. The service checks are skipped: the
+    documents are valid by construction and copies that would break a
+    unique constraint are dropped.
+    '''
+    import random
+    import re
+    from collections import defaultdict
+    from collections.abc import Sequence
+    from datetime import date
+    from pathlib import Path
+
+    from bson import ObjectId
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    from api.concerns import collection_changed
+    from api.models import BedSchedules
+    from api.services.bed_intervals_service import bed_intervals_from
+    from api.services.bed_schedules_service import (BedScheduleStore,
+                                                    bed_update_from)
+    from api.services.grounds_donate_service import GroundDonateStore
+    from api.services.grounds_service import (GroundStore, bed_update_set,
+                                              ground_document)
+    from api.services.peoples_service import PeopleStore, people_document
+    from api.services.voluntaries_request_service import VoluntaryRequestStore
+    from api.services.voluntaries_service import VoluntaryStore
+    from api.services.voluntaries_using_seeds_service import \
+        VoluntaryUsingSeedStart
+    from api.utilities.mapper import to_mongo
+
+    # Catalogues keep the size of the mocks and go through the services,
+    # their names are unique and the users hash passwords
+    catalogues = {'seeds', 'tools', 'users'}
+    high_volume = {'voluntaries', 'bed_schedules', 'voluntaries_using_seeds'}
+    # fmt: off
+    levels = [
+        ['seeds', 'tools', 'users', 'grounds', 'peoples', 'voluntaries_request', 'grounds_donate'],
+        ['voluntaries', 'bed_schedules'],
+        ['voluntaries_using_seeds'],
+    ]
+    # Fields of the samples read by the #(eval) commands and the builders
+    sample_fields = {
+        'grounds': {'beds_count': {"$size": {"$ifNull": ["$beds", []]}}},
+        'peoples': {'name': 1},
+        'voluntaries': {'ground_id': 1, 'bed_label': 1},
+    }
+    # fmt: on
+    stores = {Path(json_path).stem: (json_path, store, Model)
+              for json_path, store, Model in mocks}
+    samples = {}
+    by_id = {}
+    seen = set()
+    # Last bed schedules of each bed, the bed mirrors it like on store
+    last_bed_schedules = {}
+    bed_occurrences = defaultdict(int)
+
+    class BedLabels(Sequence):
+        # Beds of a sampled ground, labeled 1..count by ground_document, so
+        # the labels are built on access instead of loaded with the ground
+        def __init__(self, count: int) -> None:
+            self.count = count
+
+        def __len__(self) -> int:
+            return self.count
+
+        def __getitem__(self, index: int) -> dict:
+            if not 0 <= index < self.count:
+                raise IndexError(index)
+            return {'label': str(index + 1)}
+
+    def unique_email(email: str, copy: int) -> str:
+        if copy == 0:
+            return email
+        user, domain = email.split('@', 1)
+        return f'{user}+{copy}@{domain}'
+
+    def unique(key: tuple) -> bool:
+        if key in seen:
+            return False
+        seen.add(key)
+        return True
+
+    def build_people(data: dict, copy: int) -> dict:
+        data['email'] = unique_email(data['email'], copy)
+        return people_document(PeopleStore(**data))
+
+    def build_voluntary(data: dict, copy: int) -> Optional[dict]:
+        voluntary = VoluntaryStore(**data)
+        if not unique(('voluntaries', voluntary.people_id,
+                       voluntary.ground_id, voluntary.bed_label)):
+            return None
+        document = to_mongo(voluntary.dict())
+        document['people_name'] = by_id['peoples'][voluntary.people_id]['name']
+        return document
+
+    def build_bed_schedules(data: dict, copy: int) -> dict:
+        body = BedScheduleStore(**data)
+        # Copies on the same bed follow each other instead of overlapping
+        bed = (body.ground_id, body.bed_label)
+        shift = (body.schedules[-1].end_at - body.schedules[0].start_at) * \
+            bed_occurrences[bed]
+        bed_occurrences[bed] += 1
+        for schedule in body.schedules:
+            schedule.start_at += shift
+            schedule.end_at += shift
+        document = to_mongo(body.dict())
+        document['_id'] = ObjectId()
+        document['current_schedule'] = 0
+        document['version'] = 1
+        last_bed_schedules[bed] = BedSchedules(
+            id=str(document['_id']), current_schedule=0, version=1,
+            **body.dict())
+        return document
+
+    def build_voluntary_using_seed(data: dict, copy: int) -> Optional[dict]:
+        start = VoluntaryUsingSeedStart(**data)
+        if not unique(('voluntaries_using_seeds',
+                       start.voluntary_id, start.seed_id)):
+            return None
+        voluntary = by_id['voluntaries'][start.voluntary_id]
+        return {
+            "voluntary_id": ObjectId(start.voluntary_id),
+            "ground_id": ObjectId(voluntary['ground_id']),
+            "bed_label": voluntary['bed_label'],
+            "seed_id": ObjectId(start.seed_id),
+            "start_at": date.today().isoformat(),
+        }
+
+    builders = {
+        'grounds': lambda data, copy: ground_document(GroundStore(**data)),
+        'peoples': build_people,
+        'voluntaries_request': lambda data, copy: to_mongo(
+            VoluntaryRequestStore(**data).dict()),
+        'grounds_donate': lambda data, copy: to_mongo(
+            GroundDonateStore(**data).dict()),
+        'voluntaries': build_voluntary,
+        'bed_schedules': build_bed_schedules,
+        'voluntaries_using_seeds': build_voluntary_using_seed,
+    }
+
+    async def sample(collection):
+        entity = random.choice(samples[collection])
+        if collection == 'grounds':
+            return {'_id': entity['_id'],
+                    'beds': BedLabels(entity['beds_count'])}
+        return entity
+
+    async def load_samples(collection):
+        projection = {'_id': 1, **sample_fields.get(collection, {})}
+        entities = await db[collection].aggregate([
+            {"$sample": {"size": args.sample_size}},
+            {"$project": projection},
+        ], allowDiskUse=True).to_list(None)
+        if not entities:
+            raise Exception(f'Entity in {collection} not found')
+        samples[collection] = entities
+        if collection in ('peoples', 'voluntaries'):
+            by_id[collection] = {str(it['_id']): it for it in entities}
+
+    async def insert_batch(collection, batch):
+        try:
+            await db[collection].insert_many(batch, ordered=False)
+            inserted = len(batch)
+        except BulkWriteError as e:
+            if any(it['code'] != 11000 for it in e.details['writeErrors']):
+                raise
+            inserted = e.details['nInserted']
+        if collection == 'bed_schedules':
+            intervals = [interval for document in batch
+                         for interval in bed_intervals_from(BedSchedules(
+                             id=str(document['_id']), **document))]
+            await db.bed_intervals.insert_many(intervals, ordered=False)
+        return inserted
+
+    async def update_beds():
+        updates = [UpdateOne(
+            {"_id": ObjectId(ground_id)},
+            {"$set": bed_update_set(bed_update_from(bed_schedules))},
+            array_filters=[{"bed.label": bed_label}],
+        ) for (ground_id, bed_label), bed_schedules in last_bed_schedules.items()]
+        for i in range(0, len(updates), args.batch_size):
+            await db.grounds.bulk_write(
+                updates[i:i + args.batch_size], ordered=False)
+
+    async def seed_store(collection):
+        json_path, store, Model = stores[collection]
+        count = 0
+        for data in read_json(Path('mocks') / json_path):
+            repeat = data.get('$$repeat', 1)
+            data = {k: v for k, v in data.items() if k != '$$repeat'}
+            for _ in range(repeat):
+                await store(Model(**await apply_commands(data, sample)), db)
+                count += 1
+        return count
+
+    async def seed_bulk(collection):
+        json_path, _, _ = stores[collection]
+        build = builders[collection]
+        inserted = 0
+        batch = []
+        pending = None
+        for data in read_json(Path('mocks') / json_path):
+            repeat = data.get('$$repeat', 1)
+            data = {k: v for k, v in data.items() if k != '$$repeat'}
+            scale = args.scale if collection in high_volume \
+                else args.reference_scale
+            for copy in range(repeat * scale):
+                document = build(await apply_commands(data, sample), copy)
+                if document is not None:
+                    batch.append(document)
+                if len(batch) < args.batch_size:
+                    continue
+                if pending is not None:
+                    inserted += await pending
+                # The batch is written while the next one is built, and the
+                # other collections of the level run in the meantime
+                pending = asyncio.ensure_future(insert_batch(collection, batch))
+                batch = []
+                await asyncio.sleep(0)
+        if pending is not None:
+            inserted += await pending
+        if batch:
+            inserted += await insert_batch(collection, batch)
+        if collection == 'bed_schedules':
+            await update_beds()
+        return inserted
+
+    async def seed(collection):
+        start = time.perf_counter()
+        if collection in catalogues:
+            count = await seed_store(collection)
+        else:
+            count = await seed_bulk(collection)
+        elapsed = time.perf_counter() - start
+        print(f"INFO: {collection} | {count} entities in {elapsed:.2f}s")
+
+    start = time.perf_counter()
+    for i, level in enumerate(levels):
+        mocks_text = ''.join(Path('mocks', stores[collection][0]).read_text(
+            encoding='utf-8') for collection in level)
+        for collection in sorted(set(re.findall(r'#\(sample\):(\w+)', mocks_text))):
+            await load_samples(collection)
+        print(f"INFO: {i + 1}/{len(levels)} | Seeding {', '.join(level)}")
+        await asyncio.gather(*[seed(collection) for collection in level])
+    # Written without the services, which change the ETags of the grounds
+    await collection_changed(db, *[it for level in levels for it in level])
+    print(f"INFO: Seed completed in {time.perf_counter() - start:.2f}s")
+
+
+async def command_benchmark_bed_schedules(args):
+    import uuid
+    from datetime import date, timedelta
+
+    import api.services.bed_schedules_service as bed_schedules_service
+    import api.services.grounds_service as grounds_service
+    import api.services.seeds_service as seeds_service
+    from api.database import get_db
+    from api.env import settings
+    from api.exceptions import ConflictError, DomainError
+    from api.services.bed_schedules_service import (BedScheduleAdjust,
+                                                    BedScheduleClose,
+                                                    BedScheduleStore)
+    from api.services.grounds_service import GroundStore
+    from api.services.seeds_service import SeedStore
+
+    if settings.production and not args.force:
+        print("ERROR: You are in production mode, use --force to run benchmarks")
+        exit(1)
+
+    async for db in get_db():
+        seed = await seeds_service.seed_store(SeedStore(
+            name=f"benchmark {uuid.uuid4().hex[:8]}", amount=1,
+            description="benchmark", seed_type="other"), db)
+        seed_id = seed.id
+        ground = await grounds_service.ground_store(GroundStore(
+            width=1, length=1, address="benchmark", description="benchmark",
+            beds_count=1, owner_id=None), db)
+        today = date.today()
+        latencies = []
+        errors = 0
+        conflicts = 0
+        failures = []
+        inconsistent = 0
+
+        async def attempt(operation):
+            nonlocal errors, conflicts
+            try:
+                await timed(operation, latencies)
+            except ConflictError:
+                conflicts += 1
+            except DomainError:
+                errors += 1
+
+        try:
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                schedules = [
+                    dict(seed_id=seed_id,
+                         start_at=today + timedelta(days=2 * i),
+                         end_at=today + timedelta(days=2 * i + 1))
+                    for i in range(args.concurrency // 2 + 1)]
+                bed_schedules = await bed_schedules_service.bed_schedules_store(
+                    BedScheduleStore(ground_id=ground.id, bed_label="1",
+                                     schedules=schedules), db)
+                operations = []
+                for i in range(args.concurrency):
+                    if i % 2 == 0:
+                        operations.append(bed_schedules_service.bed_schedules_close(
+                            bed_schedules.id,
+                            BedScheduleClose(amount=1, unit="kg", date=today), db))
+                    else:
+                        operations.append(bed_schedules_service.bed_schedules_adjust(
+                            bed_schedules.id,
+                            BedScheduleAdjust(end_at=today + timedelta(days=90)), db))
+                results = await asyncio.gather(
+                    *[attempt(it) for it in operations], return_exceptions=True)
+                failures += [it for it in results if isinstance(it, Exception)]
+                # The bed must mirror the final state of its bed schedules
+                entity = await bed_schedules_service.bed_schedules_show(
+                    bed_schedules.id, db)
+                bed = await grounds_service.ground_get_bed(ground.id, "1", db)
+                expected = bed_schedules_service.bed_update_from(entity)
+                if bed.free != expected.free or bed.end_at != expected.end_at:
+                    inconsistent += 1
+                await bed_schedules_service.bed_schedules_delete(
+                    bed_schedules.id, db)
+            elapsed = time.perf_counter() - started
+        finally:
+            await grounds_service.ground_delete(ground.id, db)
+            await seeds_service.seed_delete(seed.id, db)
+
+        print(f"INFO: transactions: {settings.mongo_transactions}")
+        print(f"INFO: operations: {len(latencies)} in {elapsed:.2f}s "
+              f"({len(latencies) / elapsed:.1f} ops/s)")
+        for name, value in summarize(latencies).items():
+            print(f"INFO: {name}: {value:.1f}ms")
+        print(f"INFO: rejected (no current schedule): {errors}")
+        print(f"INFO: conflicts (lost a concurrent change): {conflicts}")
+        print(f"INFO: failures: {len(failures)}")
+        for failure in failures[:5]:
+            print(f"ERROR: {type(failure).__name__}: {failure}")
+        print(f"INFO: inconsistent rounds: {inconsistent}/{args.rounds}")
+
+
+async def command_benchmark_serialization(args):
+    from bson import ObjectId
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from api.concerns import Pagination, TrustedResponse
+    from api.models import Ground, Voluntary
+    from api.responses import OrjsonResponse
+    from api.utilities.mapper import many_model_from_mongo
+
+    def voluntary_row(i):
+        return {
+            "_id": ObjectId(), "people_name": f"People {i}",
+            "people_id": str(ObjectId()), "ground_id": str(ObjectId()),
+            "bed_label": str(i % 20), "is_responsible": i % 2 == 0,
+            "start_at": "2023-01-01", "end_at": None,
+        }
+
+    def ground_row(i):
+        return {
+            "_id": ObjectId(), "address": f"Address {i}", "width": 10,
+            "length": 20, "description": "Description", "owner_id": None,
+            "manager_id": None, "active": True, "beds_count": args.beds,
+            "beds_status_count": {"free": args.beds, "occupied": 0, "complete": 0},
+            "beds": [{"label": str(j + 1), "free": j % 2 == 0, "status": "free",
+                      "end_at": "2023-01-01", "bed_schedules_id": ObjectId()}
+                     for j in range(args.beds)],
+        }
+
+    async def validated(Model, rows):
+        # What FastAPI does with a validated model and a response_model
+        field = create_response_field("response", Pagination[Model])
+        page = Pagination(entities=many_model_from_mongo(Model, rows),
+                          row_count=len(rows))
+        content = await serialize_response(field=field, response_content=page)
+        return JSONResponse(content).body
+
+    async def validated_orjson(Model, rows):
+        # A validated model returned as an OrjsonResponse, no jsonable_encoder
+        page = Pagination(entities=many_model_from_mongo(Model, rows),
+                          row_count=len(rows))
+        return OrjsonResponse(page).body
+
+    async def trusted(Model, rows):
+        page = Pagination.construct(
+            entities=many_model_from_mongo(Model, rows, trusted=True),
+            row_count=len(rows))
+        return TrustedResponse(page).body
+
+    for Model, make_row in ((Voluntary, voluntary_row), (Ground, ground_row)):
+        rows = [make_row(i) for i in range(args.rows)]
+        for name, serialize in (("validated", validated),
+                                ("validated+orjson", validated_orjson),
+                                ("trusted", trusted)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                await serialize(Model, rows)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            print(f"INFO: {Model.__name__} | {name} | {args.rows} rows | "
+                  f"best {best * 1000:.1f}ms | {args.rows / best:.0f} rows/s")
+
+
+async def command_benchmark_search(args):
+    import json
+    import random
+
+    import pymongo
+
+    from api.concerns import paginate
+    from api.database import get_db
+    from api.env import settings
+    from api.models import Seed
+    from api.utilities.search import (search_fields, search_projection,
+                                      search_query)
+
+    if settings.production and not args.force:
+        print("ERROR: You are in production mode, use --force to run benchmarks")
+        exit(1)
+
+    async def regex_fallback(collection, search):
+        # The search seed_index and tool_index ran before the grams
+        query = {"$text": {"$search": search}}
+        pagination = await paginate(collection, Seed, query, page=1, page_size=10)
+        if len(pagination.entities) == 0:
+            query = {"name": {"$regex": search, "$options": "i"}}
+            pagination = await paginate(collection, Seed, query, page=1, page_size=10)
+        return pagination
+
+    async def grams(collection, search):
+        query, score = search_query('name', search)
+        return await paginate(
+            collection, Seed, query, page=1, page_size=10,
+            sort=[('score', -1)] if score is not None else None,
+            fields={"score": score} if score is not None else None,
+            stages=[{"$project": search_projection('name')}])
+
+    rng = random.Random(42)
+    with open("mocks/seeds.json", "r", encoding="utf-8") as f:
+        names = [it["name"] for it in json.load(f)]
+    varieties = ["Roxo", "Orgânico", "Crioulo", "Híbrido", "Anão", "Gigante",
+                 "Precoce", "Japonês", "Italiano", "Silvestre"]
+    searches = ["abobora", "abob", "brocolis", "pimetao", "crioul",
+                "japones", "feijao preco", "zzz"]
+
+    async for db in get_db():
+        collection = db.benchmark_search
+        await collection.drop()
+        try:
+            print(f"INFO: Inserting {args.rows} rows")
+            rows = []
+            for i in range(args.rows):
+                name = f"{rng.choice(names)} {rng.choice(varieties)} {i}"
+                rows.append({"name": name, "amount": 1, "description": name,
+                             "seed_type": "other", **search_fields('name', name)})
+                if len(rows) == 10_000:
+                    await collection.insert_many(rows, ordered=False)
+                    rows = []
+            if rows:
+                await collection.insert_many(rows, ordered=False)
+            await collection.create_index(
+                [("name", pymongo.TEXT), ("description", pymongo.TEXT)],
+                default_language="portuguese")
+            await collection.create_index([("name_grams", pymongo.ASCENDING)])
+            await collection.create_index([("name_search", pymongo.ASCENDING)])
+
+            for search in searches:
+                for name, run in (("regex", regex_fallback), ("grams", grams)):
+                    latencies = []
+                    for _ in range(args.repeat):
+                        pagination = await timed(run(collection, search), latencies)
+                    summary = summarize(latencies)
+                    top = pagination.entities[0].name if pagination.entities else '-'
+                    print(f"INFO: {search!r} | {name} | "
+                          f"p50 {summary['p50']:.1f}ms | "
+                          f"p99 {summary['p99']:.1f}ms | "
+                          f"{pagination.row_count} rows | top: {top}")
+        finally:
+            await collection.drop()
+
+
+async def command_benchmark_autocomplete(args):
+    import random
+
+    import pymongo
+
+    import api.services.peoples_service as peoples_service
+    from api.database import get_db
+    from api.env import settings
+
+    if settings.production and not args.force:
+        print("ERROR: You are in production mode, use --force to run benchmarks")
+        exit(1)
+
+    rng = random.Random(42)
+    first_names = ["Ana", "João", "Maria", "José", "Antônio", "Francisca",
+                   "Carlos", "Paulo", "Lúcia", "Luiz", "Márcia", "Pedro",
+                   "Sebastião", "Raimunda", "Júlia", "Gabriel", "Letícia"]
+    last_names = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues",
+                  "Ferreira", "Alves", "Pereira", "Lima", "Gomes", "Conceição",
+                  "Ribeiro", "Araújo", "Carvalho", "Mendonça", "Barbosa"]
+
+    async for db in get_db():
+        # A database of its own, dropped at the end
+        bench_db = db.client["benchmark_autocomplete"]
+        await bench_db.peoples.drop()
+        try:
+            print(f"INFO: Inserting {args.rows} peoples")
+            rows = []
+            samples = []
+            for i in range(args.rows):
+                name = " ".join([rng.choice(first_names),
+                                 *rng.sample(last_names, 2)])
+                people = {
+                    "name": name,
+                    "email": f"{name.split()[0].lower()}.{i}@example.com",
+                    "cellphone": f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                    "birth_date": "1990-01-01",
+                    "address": "Rua",
+                }
+                rows.append({**people, **peoples_service.people_search_fields(people)})
+                if len(samples) < args.repeat:
+                    samples.append(people)
+                if len(rows) == 10_000:
+                    await bench_db.peoples.insert_many(rows, ordered=False)
+                    rows = []
+            if rows:
+                await bench_db.peoples.insert_many(rows, ordered=False)
+            await bench_db.peoples.create_index(
+                [("search_keys", pymongo.ASCENDING)])
+
+            searches = []
+            for people in samples:
+                word = rng.choice([*people["name"].split(), people["email"],
+                                   people["cellphone"][5:]])
+                searches.append(word[:rng.randint(1, len(word))])
+
+            latencies = []
+            for search in searches:
+                await timed(peoples_service.people_autocomplete(
+                    search, 10, bench_db), latencies)
+            print(f"INFO: {len(searches)} searches on {args.rows} peoples")
+            for name, value in summarize(latencies).items():
+                print(f"INFO: {name}: {value:.2f}ms")
+        finally:
+            await db.client.drop_database("benchmark_autocomplete")
+
+
+async def command_benchmark(args):
+    '''
+    Drives the GET routes of every router of api.app in process, through an
+    ASGI transport, against the local database. Writes are left out so the
+    seeded database stays the same between runs. Use seed-database first.
+    '''
+    import json
+    import re
+    from datetime import date, datetime, timedelta
+    from pathlib import Path
+
+    import httpx
+    from fastapi.routing import APIRoute
+    from pymongo import monitoring
+
+    import api.services.jwt_service as jwt_service
+    from api.database import get_db
+    from api.env import settings
+
+    if settings.production and not args.force:
+        print("ERROR: You are in production mode, use --force to run benchmarks")
+        exit(1)
+
+    class CommandCounter(monitoring.CommandListener):
+        count = 0
+
+        def started(self, event):
+            self.count += 1
+
+        def succeeded(self, event):
+            pass
+
+        def failed(self, event):
+            pass
+
+    # Registered before the app creates its client, see get_mongo_client
+    counter = CommandCounter()
+    monitoring.register(counter)
+
+    from api.app import app
+
+    # fmt: off
+    path_collections = {
+        'bed_schedule_id': 'bed_schedules',
+        'ground_id': 'grounds',
+        'grounds_donate_id': 'grounds_donate',
+        'people_id': 'peoples',
+        'seed_id': 'seeds',
+        'tool_id': 'tools',
+        'user_id': 'users',
+        'voluntary_id': 'voluntaries',
+        'voluntary_request_id': 'voluntaries_request',
+        'voluntary_using_seed_id': 'voluntaries_using_seeds',
+        'voluntary_using_tool_id': 'voluntaries_using_tools',
+    }
+    # fmt: on
+
+    async def load_samples(db):
+        # The first document of each collection, the same between commits
+        samples = {}
+        for collection in set(path_collections.values()):
+            entity = await db[collection].find_one({}, sort=[("_id", 1)])
+            if entity is not None:
+                samples[collection] = entity
+        return samples
+
+    def route_params(samples):
+        # Query parameters of the routes that require them, and the variants
+        # worth measuring on their own. None when the samples are missing.
+        today = date.today()
+        seed = samples.get('seeds', {}).get('name', '')
+        tool = samples.get('tools', {}).get('name', '')
+        people = samples.get('peoples', {}).get('name', '')
+        ground_id = str(samples['grounds']['_id']) \
+            if 'grounds' in samples else None
+        bed_schedules = samples.get('bed_schedules')
+        return {
+            'bed_availability': [('', {
+                'start_at': today.isoformat(),
+                'end_at': (today + timedelta(days=30)).isoformat(),
+            })],
+            'bed_schedules_index': [('', bed_schedules and {
+                'ground_id': bed_schedules['ground_id'],
+                'bed_label': bed_schedules['bed_label'],
+            })],
+            'bed_schedules_export': [('', ground_id and {'ground_id': ground_id})],
+            'voluntary_export': [('', ground_id and {'ground_id': ground_id})],
+            'people_export': [('', people and {'search': people.split()[0]})],
+            'people_autocomplete': [('', people and {'q': people[:2]})],
+            'people_index': [('', {}),
+                             ('?search', people and {'search': people.split()[0]})],
+            'seed_index': [('', {}), ('?search', seed and {'search': seed[:5]})],
+            'tool_index': [('', {}), ('?search', tool and {'search': tool[:5]})],
+            'ground_index': [('', {}), ('?include', {'include': 'beds'})],
+            'voluntary_index': [('', {}),
+                                ('?ground_id', ground_id and {'ground_id': ground_id})],
+        }
+
+    def endpoints(samples):
+        params = route_params(samples)
+        for route in app.routes:
+            if not isinstance(route, APIRoute) or 'GET' not in route.methods:
+                continue
+            path = route.path
+            missing = None
+            for name in re.findall(r'{(\w+)}', route.path):
+                collection = path_collections.get(name)
+                if collection not in samples:
+                    missing = collection or name
+                    break
+                path = path.replace(f'{{{name}}}', str(samples[collection]['_id']))
+            if missing is not None:
+                print(f"WARN: {route.name} skipped, no sample of {missing}")
+                continue
+            for variant, query in params.get(route.name, [('', {})]):
+                if query is None or query == '':
+                    print(f"WARN: {route.name}{variant} skipped, no sample")
+                    continue
+                yield f"{route.name}{variant}", path, query
+
+    async def measure(client, path, query):
+        for _ in range(args.warmup):
+            await client.get(path, params=query)
+        latencies = []
+        errors = 0
+        pending = iter(range(args.requests))
+
+        async def worker():
+            nonlocal errors
+            for _ in pending:
+                response = await timed(client.get(path, params=query), latencies)
+                if response.status_code >= 400:
+                    errors += 1
+
+        commands = counter.count
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - start
+        return {
+            "requests": args.requests,
+            "errors": errors,
+            "throughput": args.requests / elapsed,
+            **summarize(latencies),
+            "round_trips": (counter.count - commands) / args.requests,
+        }
+
+    def change(current, baseline):
+        if not baseline:
+            return '    n/a'
+        return f"{(current - baseline) / baseline * 100:+6.1f}%"
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['endpoints']
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                            capture_output=True, text=True).stdout.strip()
+    results = {}
+    async for db in get_db():
+        user = await db.users.find_one({}, sort=[("_id", 1)])
+        if user is None:
+            print("ERROR: No users found, run seed-database first")
+            exit(1)
+        token = jwt_service.create_access_token(
+            {'sub': str(user['_id']), 'version': user.get('version')})
+        samples = await load_samples(db)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark",
+                headers={"Authorization": f"Bearer {token}"}) as client:
+            for name, path, query in endpoints(samples):
+                if args.only and not re.search(args.only, name):
+                    continue
+                result = await measure(client, path, query)
+                results[name] = result
+                line = f"INFO: {name:<36} {result['throughput']:8.1f} req/s" \
+                    f" | p50 {result['p50']:7.2f}ms" \
+                    f" | p95 {result['p95']:7.2f}ms" \
+                    f" | p99 {result['p99']:7.2f}ms" \
+                    f" | {result['round_trips']:4.1f} round trips"
+                if result['errors']:
+                    line += f" | {result['errors']} errors"
+                if baseline and name in baseline:
+                    previous = baseline[name]
+                    line += f" | p50 {change(result['p50'], previous['p50'])}" \
+                        f" p99 {change(result['p99'], previous['p99'])}" \
+                        f" round trips {result['round_trips'] - previous['round_trips']:+.1f}"
+                print(line)
+
+    output = Path(args.output or Path('.benchmarks') / f"{commit or 'local'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open('w', encoding='utf-8') as f:
+        json.dump({
+            "commit": commit,
+            "date": datetime.now().isoformat(timespec='seconds'),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "endpoints": results,
+        }, f, indent=2)
+    print(f"INFO: Baseline saved to {output}")
+
+
+async def command_loadtest(args):
+    '''
+    Starts the app with uvicorn, as the run command does, and replays
+    weighted scenarios from concurrent virtual users at each level of
+    --concurrency. The scenarios work on a ground, a user and peoples of
+    their own, removed at the end.
+    '''
+    import random
+    import uuid
+    from collections import defaultdict
+    from datetime import date, timedelta
+
+    import httpx
+
+    import api.services.bed_schedules_service as bed_schedules_service
+    import api.services.grounds_service as grounds_service
+    import api.services.users_service as users_service
+    from api.concerns import collection_changed
+    from api.database import get_db
+    from api.env import settings
+    from api.services.grounds_service import GroundStore
+    from api.services.users_service import UserStore
+
+    if settings.production and not args.force:
+        print("ERROR: You are in production mode, use --force to run load tests")
+        exit(1)
+
+    weights = {}
+    for item in args.weights.split(','):
+        name, weight = item.split('=')
+        weights[name.strip()] = float(weight)
+    levels = [int(it) for it in args.concurrency.split(',')]
+    email = f"loadtest.{uuid.uuid4().hex[:8]}@example.com"
+    password = uuid.uuid4().hex
+    today = date.today()
+
+    def people_body():
+        key = uuid.uuid4().hex[:12]
+        return {
+            "name": f"Load Test {key}",
+            "email": f"loadtest.{key}@example.com",
+            "cellphone": "11 912345678",
+            "birth_date": "1990-01-01",
+            "address": "Rua do Teste",
+        }
+
+    async def login_storm(client, ctx, user):
+        # Logins of the same user in a burst, as after a token expiry
+        for _ in range(3):
+            response = await client.post("/api/auth/login", data={
+                "username": email, "password": password})
+            response.raise_for_status()
+
+    async def grounds_browsing(client, ctx, user):
+        headers = ctx['headers']
+        for path, params in [
+            ("/api/grounds/", {"include": "beds"}),
+            (f"/api/grounds/{ctx['ground_id']}", {}),
+            ("/api/grounds/beds", {"status": "free"}),
+            ("/api/bed-schedules/availability", {
+                "start_at": today.isoformat(),
+                "end_at": (today + timedelta(days=30)).isoformat()}),
+        ]:
+            response = await client.get(path, params=params, headers=headers)
+            response.raise_for_status()
+
+    async def bed_schedules_close_cycle(client, ctx, user):
+        # Each virtual user has a bed of its own, so the cycles never conflict
+        headers = ctx['headers']
+        response = await client.post("/api/bed-schedules/", headers=headers, json={
+            "ground_id": ctx['ground_id'],
+            "bed_label": str(user + 1),
+            "schedules": [
+                {"seed_id": ctx['seed_id'],
+                 "start_at": today.isoformat(),
+                 "end_at": (today + timedelta(days=30)).isoformat()},
+                {"seed_id": ctx['seed_id'],
+                 "start_at": (today + timedelta(days=30)).isoformat(),
+                 "end_at": (today + timedelta(days=60)).isoformat()},
+            ],
+        })
+        response.raise_for_status()
+        bed_schedules_id = response.json()['id']
+        try:
+            for _ in range(2):
+                response = await client.patch(
+                    f"/api/bed-schedules/{bed_schedules_id}/close",
+                    headers=headers,
+                    json={"amount": 1, "unit": "kg", "date": today.isoformat()})
+                response.raise_for_status()
+        finally:
+            # Also after a failed close, or the next cycles of the virtual
+            # user would conflict with the bed schedules left behind
+            response = await client.delete(
+                f"/api/bed-schedules/{bed_schedules_id}", headers=headers)
+        response.raise_for_status()
+
+    async def voluntaries_onboarding(client, ctx, user):
+        headers = ctx['headers']
+        voluntaries = []
+        for _ in range(args.onboarding_size):
+            response = await client.post("/api/peoples/", headers=headers,
+                                         json=people_body())
+            response.raise_for_status()
+            voluntaries.append({
+                "people_id": response.json()['id'],
+                "ground_id": ctx['ground_id'],
+                "bed_label": str(random.randint(1, ctx['beds_count'])),
+                "start_at": today.isoformat(),
+                "is_responsible": False,
+            })
+        response = await client.post("/api/voluntaries/many", headers=headers,
+                                     json=voluntaries)
+        response.raise_for_status()
+
+    scenarios = {
+        'login': login_storm,
+        'browse': grounds_browsing,
+        'close': bed_schedules_close_cycle,
+        'onboard': voluntaries_onboarding,
+    }
+    for name in weights:
+        if name not in scenarios:
+            print(f"ERROR: Unknown scenario {name}, use {', '.join(scenarios)}")
+            exit(1)
+
+    async def run_level(client, ctx, concurrency):
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        names = list(weights)
+        deadline = time.perf_counter() + args.duration
+
+        async def virtual_user(user):
+            rng = random.Random(user)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, [weights[it] for it in names])[0]
+                try:
+                    await timed(scenarios[name](client, ctx, user),
+                                latencies[name])
+                except httpx.HTTPError:
+                    errors[name] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[virtual_user(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+        print(f"INFO: {concurrency} virtual users for {elapsed:.1f}s")
+        for name in names:
+            values = latencies[name]
+            if not values:
+                continue
+            summary = summarize(values)
+            print(f"INFO: {name:<8} {len(values) / elapsed:8.1f} scenarios/s"
+                  f" | errors {errors[name] / len(values) * 100:5.1f}%"
+                  f" | p50 {summary['p50']:8.2f}ms"
+                  f" | p95 {summary['p95']:8.2f}ms"
+                  f" | p99 {summary['p99']:8.2f}ms")
+
+    async def wait_healthy(client):
+        for _ in range(100):
+            try:
+                response = await client.get("/api/")
+                if response.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+        raise Exception('The app did not start')
+
+    server = None
+    if args.url is None:
+        server = subprocess.Popen(uvicorn_command(
+            "--port", str(args.port), "--log-level", "warning"))
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+
+    async for db in get_db():
+        beds_count = max(levels)
+        user = await users_service.user_store(UserStore(
+            name="Load Test", email=email, password=password,
+            cellphone="11 912345678"), db)
+        ground = await grounds_service.ground_store(GroundStore(
+            width=100, length=100, address="Rua do Teste",
+            description="Load test", beds_count=beds_count, owner_id=None), db)
+        seed = await db.seeds.find_one({})
+        try:
+            if seed is None:
+                print("ERROR: No seeds found, run seed-database first")
+                exit(1)
+            limits = httpx.Limits(max_connections=max(levels))
+            async with httpx.AsyncClient(base_url=base_url, limits=limits,
+                                         timeout=args.timeout) as client:
+                await wait_healthy(client)
+                response = await client.post("/api/auth/login", data={
+                    "username": email, "password": password})
+                response.raise_for_status()
+                token = response.json()['access_token']
+                ctx = {
+                    'headers': {"Authorization": f"Bearer {token}"},
+                    'ground_id': ground.id,
+                    'beds_count': beds_count,
+                    'seed_id': str(seed['_id']),
+                }
+                for concurrency in levels:
+                    await run_level(client, ctx, concurrency)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            # Through the services, so running servers see the new versions
+            await users_service.user_delete(user.id, db)
+            for it in await db.bed_schedules.find(
+                    {"ground_id": ground.id}, {"_id": 1}).to_list(None):
+                await bed_schedules_service.bed_schedules_delete(
+                    str(it["_id"]), db)
+            await grounds_service.ground_delete(ground.id, db)
+            await db.voluntaries.delete_many({"ground_id": ground.id})
+            await db.peoples.delete_many(
+                {"email": {"$regex": r"^loadtest\.[0-9a-f]+@example\.com$"}})
+            await collection_changed(db, 'voluntaries', 'peoples')
+
+
 async def command_test(args):
     from api.env import settings
 
@@ -372,12 +1635,66 @@ def parse_args():
     sb = command(command_setup_database_indexes)
     sb.add_argument("--force", default=False, action="store_true")
 
+    sb = command(command_index_advisor)
+    sb.add_argument("--apply", default=False, action="store_true")
+    sb.add_argument("--force", default=False, action="store_true")
+
+    sb = command(command_beds_rollover)
+
+    sb = command(command_rebuild_bed_intervals)
+
+    sb = command(command_rebuild_search_fields)
+
     sb = command(command_drop_database)
     sb.add_argument("--force", default=False, action="store_true")
 
     sb = command(command_seed_database)
     sb.add_argument("--debug", default=False, action="store_true")
     sb.add_argument("--force", default=False, action="store_true")
+    sb.add_argument("--bulk", default=False, action="store_true")
+    sb.add_argument("--scale", default=1, type=int)
+    sb.add_argument("--reference-scale", default=1, type=int)
+    sb.add_argument("--sample-size", default=100_000, type=int)
+    sb.add_argument("--batch-size", default=1000, type=int)
+
+    sb = command(command_benchmark_bed_schedules)
+    sb.add_argument("--rounds", default=20, type=int)
+    sb.add_argument("--concurrency", default=20, type=int)
+    sb.add_argument("--force", default=False, action="store_true")
+
+    sb = command(command_benchmark_serialization)
+    sb.add_argument("--rows", default=10_000, type=int)
+    sb.add_argument("--beds", default=20, type=int)
+    sb.add_argument("--repeat", default=5, type=int)
+
+    sb = command(command_benchmark_search)
+    sb.add_argument("--rows", default=100_000, type=int)
+    sb.add_argument("--repeat", default=20, type=int)
+    sb.add_argument("--force", default=False, action="store_true")
+
+    sb = command(command_benchmark_autocomplete)
+    sb.add_argument("--rows", default=200_000, type=int)
+    sb.add_argument("--repeat", default=1000, type=int)
+    sb.add_argument("--force", default=False, action="store_true")
+
+    sb = command(command_benchmark)
+    sb.add_argument("--requests", default=200, type=int)
+    sb.add_argument("--concurrency", default=1, type=int)
+    sb.add_argument("--warmup", default=5, type=int)
+    sb.add_argument("--only", default=None, type=str)
+    sb.add_argument("--output", default=None, type=str)
+    sb.add_argument("--compare", default=None, type=str)
+    sb.add_argument("--force", default=False, action="store_true")
+
+    sb = command(command_loadtest)
+    sb.add_argument("--concurrency", default="10,50,100", type=str)
+    sb.add_argument("--duration", default=30, type=float)
+    sb.add_argument("--weights", default="login=1,browse=6,close=2,onboard=1", type=str)
+    sb.add_argument("--onboarding-size", default=5, type=int)
+    sb.add_argument("--timeout", default=30, type=float)
+    sb.add_argument("--port", default=8765, type=int)
+    sb.add_argument("--url", default=None, type=str)
+    sb.add_argument("--force", default=False, action="store_true")
 
     sb = command(command_test)
     sb.add_argument("--coverage", default=False, action="store_true")
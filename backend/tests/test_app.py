@@ -0,0 +1,11 @@
+from fastapi.testclient import TestClient
+
+import api.app
+
+
+def test_beds_rollover_cancelled_on_shutdown():
+    with TestClient(api.app.app):
+        task = api.app.beds_rollover
+        assert task is not None
+    assert task.cancelled()
+    assert api.app.beds_rollover is None
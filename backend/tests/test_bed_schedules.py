@@ -0,0 +1,65 @@
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+
+from api.models import BedSchedules
+from api.services.bed_intervals_service import bed_intervals_from
+from api.services.bed_schedules_service import (BedScheduleStore,
+                                                bed_update_from)
+
+SEED_ID = '64a000000000000000000001'
+
+
+def schedule(start_at: str, end_at: str) -> dict:
+    return dict(seed_id=SEED_ID, start_at=start_at, end_at=end_at)
+
+
+def test_bed_schedule_store_sequencial():
+    body = BedScheduleStore(ground_id='g', bed_label='1', schedules=[
+        schedule('2023-01-01', '2023-02-01'),
+        schedule('2023-02-01', '2023-03-01'),
+    ])
+    assert len(body.schedules) == 2
+
+
+def test_bed_schedule_store_not_sequencial():
+    with pytest.raises(ValidationError):
+        BedScheduleStore(ground_id='g', bed_label='1', schedules=[
+            schedule('2023-01-01', '2023-03-01'),
+            schedule('2023-02-01', '2023-04-01'),
+        ])
+
+
+def test_bed_update_from_current_schedule():
+    entity = BedSchedules(id='b', ground_id='g', bed_label='1', schedules=[
+        schedule('2023-01-01', '2023-02-01'),
+        schedule('2023-02-01', '2023-03-01'),
+    ], current_schedule=1, version=3)
+    update = bed_update_from(entity)
+    assert update.free is False
+    assert update.bed_schedules_id == 'b'
+    assert update.bed_schedules_version == 3
+    assert update.end_at == date(2023, 3, 1)
+
+
+def test_bed_update_from_closed():
+    entity = BedSchedules(id='b', ground_id='g', bed_label='1', schedules=[
+        schedule('2023-01-01', '2023-02-01'),
+    ], current_schedule=None)
+    update = bed_update_from(entity)
+    assert update.free is True
+    assert update.bed_schedules_id__none is True
+    assert update.bed_schedules_version__none is True
+
+
+def test_bed_intervals_from():
+    entity = BedSchedules(id='b', ground_id='g', bed_label='1', schedules=[
+        schedule('2023-01-01', '2023-02-01'),
+        schedule('2023-02-01', '2023-03-01'),
+    ], current_schedule=0)
+    intervals = bed_intervals_from(entity)
+    assert [it['index'] for it in intervals] == [0, 1]
+    assert intervals[1]['start_at'] == '2023-02-01'
+    assert intervals[1]['end_at'] == '2023-03-01'
+    assert all(it['bed_schedules_id'] == 'b' for it in intervals)
@@ -0,0 +1,30 @@
+from api.utilities.cache import TTLCache
+
+
+def test_ttl_cache_lru_eviction():
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60_000)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_ttl_cache_expiration():
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_delete_where():
+    cache: TTLCache[tuple, int] = TTLCache(max_size=10, ttl=60_000)
+    cache.set(('user', 1), 1)
+    cache.set(('user', 2), 2)
+    cache.set(('other', 1), 3)
+    cache.delete_where(lambda key: key[0] == 'user')
+    assert cache.get(('user', 1)) is None
+    assert cache.get(('user', 2)) is None
+    assert cache.get(('other', 1)) == 3
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+import api.exceptions
+import api.utilities.cache
+from api.concerns import Conditional, collection_changed, collection_versions
+from api.database import get_db
+from api.env import settings
+from api.responses import OrjsonResponse, StateHeadersMiddleware
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.monotonic()
+
+    def monotonic(self):
+        return self.now
+
+
+class VersionsCollection:
+    # The find_one and update_one used on db.collection_versions
+    def __init__(self):
+        self.items = {}
+
+    async def find_one(self, query):
+        return self.items.get(query['_id'])
+
+    async def update_one(self, query, update, upsert=False):
+        item = self.items.setdefault(
+            query['_id'], {'_id': query['_id'], 'version': 0,
+                           **update['$setOnInsert']})
+        item['version'] += update['$inc']['version']
+
+
+class VersionsDatabase:
+    def __init__(self):
+        self.collection_versions = VersionsCollection()
+
+
+def make_client(calls: list, db: VersionsDatabase) -> TestClient:
+    app = FastAPI(default_response_class=OrjsonResponse)
+    app.add_middleware(StateHeadersMiddleware)
+    api.exceptions.configure(app)
+    app.dependency_overrides[get_db] = lambda: db
+    collection_versions.clear()
+    router = APIRouter(
+        dependencies=[Conditional('test_items', 'private, no-cache')])
+
+    @router.get('/items')
+    def items_index() -> OrjsonResponse:
+        calls.append('index')
+        return OrjsonResponse(['a'])
+
+    @router.get('/items/{item_id}')
+    def items_show(item_id: str) -> dict:
+        calls.append('show')
+        return {'id': item_id}
+
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_conditional_not_modified():
+    calls = []
+    client = make_client(calls, VersionsDatabase())
+    response = client.get('/items')
+    etag = response.headers['etag']
+    assert response.status_code == 200
+    assert response.headers['cache-control'] == 'private, no-cache'
+
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['etag'] == etag
+    assert calls == ['index']
+
+
+def test_conditional_changed():
+    calls = []
+    db = VersionsDatabase()
+    client = make_client(calls, db)
+    etag = client.get('/items/1').headers['etag']
+    assert client.get('/items/2').headers['etag'] != etag
+
+    asyncio.run(collection_changed(db, 'test_items'))
+    response = client.get('/items/1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+    assert calls == ['show', 'show', 'show']
+
+
+def test_conditional_changed_by_another_process(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(api.utilities.cache, 'time', clock)
+    calls = []
+    db = VersionsDatabase()
+    client = make_client(calls, db)
+    etag = client.get('/items').headers['etag']
+
+    # Bumped in mongo only, as by another worker, seen once the cached
+    # version expires
+    asyncio.run(db.collection_versions.update_one(
+        {'_id': 'test_items'},
+        {'$inc': {'version': 1}, '$setOnInsert': {'epoch': 'other'}},
+        upsert=True))
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    clock.now += settings.etag_version_ttl / 1000
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 200
@@ -0,0 +1,20 @@
+import pytest
+
+import api.services.crypt_service as crypt_service
+from api.env import settings
+from api.exceptions import ServiceUnavailableError
+
+
+@pytest.mark.asyncio
+async def test_hash_and_check_password():
+    hashed = await crypt_service.hash_password('secret')
+    assert await crypt_service.check_password('secret', hashed)
+    assert not await crypt_service.check_password('other', hashed)
+
+
+@pytest.mark.asyncio
+async def test_check_password_fails_fast_when_saturated(monkeypatch):
+    limit = settings.crypt_workers + settings.crypt_queue_size
+    monkeypatch.setattr(crypt_service, 'crypt_pending', limit)
+    with pytest.raises(ServiceUnavailableError):
+        await crypt_service.check_password('secret', 'hashed')
@@ -0,0 +1,22 @@
+import orjson
+
+from api.concerns import FileFormat, encode_rows
+
+FIELDS = ['id', 'name', 'schedules', 'end_at']
+ROWS = [
+    {'id': '1', 'name': 'Ana, Maria', 'schedules': [{'index': 0}],
+     'end_at': None},
+    {'id': '2', 'name': 'José', 'schedules': [], 'end_at': '2023-01-01'},
+]
+
+
+def test_encode_rows_ndjson():
+    lines = encode_rows(ROWS, FIELDS, FileFormat.NDJSON).splitlines()
+    assert [orjson.loads(line) for line in lines] == ROWS
+
+
+def test_encode_rows_csv():
+    assert encode_rows(ROWS, FIELDS, FileFormat.CSV).decode('utf-8') == (
+        '1,"Ana, Maria","[{""index"":0}]",\r\n'
+        '2,José,[],2023-01-01\r\n'
+    )
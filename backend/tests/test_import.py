@@ -0,0 +1,33 @@
+from typing import List
+
+import pytest
+
+from api.concerns import FileFormat, read_rows
+
+
+async def chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def collect(data: bytes, format: FileFormat, size: int = 7) -> List[tuple]:
+    return [it async for it in read_rows(chunks(data, size), format)]
+
+
+@pytest.mark.asyncio
+async def test_read_rows_csv():
+    data = '﻿name,description\r\nAlho,"Bulbo,\nroxo"\r\n\r\nCebola\n'
+    assert await collect(data.encode('utf-8'), FileFormat.CSV) == [
+        (1, {'name': 'Alho', 'description': 'Bulbo,\nroxo'}, None),
+        (2, None, 'Expected 2 columns, got 1'),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_read_rows_ndjson():
+    data = '{"name": "Pá"}\n\n[1]\n{"name": \n{"name": "Enxada"}'
+    rows = await collect(data.encode('utf-8'), FileFormat.NDJSON)
+    assert rows[0] == (1, {'name': 'Pá'}, None)
+    assert rows[1] == (2, None, 'Expected an object')
+    assert rows[2][0] == 3 and rows[2][2].startswith('Invalid JSON')
+    assert rows[3] == (4, {'name': 'Enxada'}, None)
@@ -1,5 +1,7 @@
+import uuid
 from typing import List
 
+import orjson
 import pytest
 from client import client
 from pydantic import BaseSettings
@@ -10,12 +12,14 @@ class Transient:
     ground_ids_to_delete = List[str]
     seed_ids_to_delete = List[str]
     bed_schedule_ids_to_delete = List[str]
+    voluntary_ids_to_delete = List[str]
 
     def __init__(self) -> None:
         self.people_ids_to_delete = []  # type: ignore
         self.ground_ids_to_delete = []  # type: ignore
         self.seed_ids_to_delete = []  # type: ignore
         self.bed_schedule_ids_to_delete = []  # type: ignore
+        self.voluntary_ids_to_delete = []  # type: ignore
 
     def add_people_id(self, id):
         self.people_ids_to_delete.append(id)
@@ -29,6 +33,9 @@ class Transient:
     def add_bed_schedule_id(self, id):
         self.bed_schedule_ids_to_delete.append(id)
 
+    def add_voluntary_id(self, id):
+        self.voluntary_ids_to_delete.append(id)
+
 
 class Settings(BaseSettings):
     test_username = "test@test.com"
@@ -285,7 +292,7 @@ def test_bed_schedules_store(do_login):
     seed_id = transient.seed_ids_to_delete[0]
     body = dict(
         ground_id=ground_id,
-        bed_label="F0",
+        bed_label="1",
         schedules=[
             dict(
                 title="Teste",
@@ -315,7 +322,8 @@ def test_bed_schedules_update(do_login):
                 seed_id=seed_id,
                 start_at="2021-01-01",
                 end_at="2021-01-02")
-        ]
+        ],
+        current_schedule=0,
     )
     response = client.put(
         f"/api/bed-schedules/{bed_schedule_id}",
@@ -338,14 +346,214 @@ def test_bed_schedules_show(do_login):
     assert response.status_code == 200
     data = response.json()
     assert data["id"] == bed_schedule_id
-    assert data["bed_label"] == "F0"
+    assert data["bed_label"] == "1"
     assert len(data["schedules"]) == 1
 
 
+def find_bed(ground_id, bed_label, headers):
+    response = client.get(f"/api/grounds/{ground_id}", headers=headers)
+    assert response.status_code == 200
+    return next(it for it in response.json()["beds"]
+                if it["label"] == bed_label)
+
+
+def test_bed_schedules_pending_until_close(do_login):
+    global transient
+    headers = create_header(do_login)
+    ground_id = transient.ground_ids_to_delete[0]
+    seed_id = transient.seed_ids_to_delete[0]
+    ids = []
+    for start_at, end_at in (("2031-01-01", "2031-02-01"),
+                             ("2031-03-01", "2031-04-01")):
+        body = dict(ground_id=ground_id, bed_label="2", schedules=[
+            dict(seed_id=seed_id, start_at=start_at, end_at=end_at)])
+        response = client.post("/api/bed-schedules", json=body, headers=headers)
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+        transient.add_bed_schedule_id(ids[-1])
+    running, later = ids
+    assert find_bed(ground_id, "2", headers)["bed_schedules_id"] == running
+
+    # The running bed schedules keeps the bed while the later one is pending
+    response = client.patch(f"/api/bed-schedules/{running}/adjust",
+                            json=dict(end_at="2031-02-10"), headers=headers)
+    assert response.status_code == 200
+    bed = find_bed(ground_id, "2", headers)
+    assert bed["bed_schedules_id"] == running
+    assert bed["end_at"] == "2031-02-10"
+
+    # Closing it hands the bed over to the pending one
+    response = client.patch(
+        f"/api/bed-schedules/{running}/close",
+        json=dict(amount=1, unit="kg", date="2031-02-10"), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["current_schedule"] is None
+    bed = find_bed(ground_id, "2", headers)
+    assert bed["bed_schedules_id"] == later
+    assert bed["end_at"] == "2031-04-01"
+
+    # A finished bed schedules can be updated without the bed
+    response = client.put(f"/api/bed-schedules/{running}", json=dict(
+        schedules=[dict(seed_id=seed_id, start_at="2031-01-01",
+                        end_at="2031-02-05")],
+        current_schedule=0), headers=headers)
+    assert response.status_code == 200
+    assert find_bed(ground_id, "2", headers)["bed_schedules_id"] == later
+
+
+def test_bed_schedules_store_overlapping(do_login):
+    global transient
+    headers = create_header(do_login)
+    ground_id = transient.ground_ids_to_delete[0]
+    seed_id = transient.seed_ids_to_delete[0]
+    later = transient.bed_schedule_ids_to_delete[-1]
+    body = dict(ground_id=ground_id, bed_label="2", schedules=[
+        dict(seed_id=seed_id, start_at="2031-03-15", end_at="2031-04-15")])
+    response = client.post("/api/bed-schedules", json=body, headers=headers)
+    assert response.status_code == 409
+    message = response.json()["message"]
+    assert "2031-03-15/2031-04-15 overlaps 2031-03-01/2031-04-01" in message
+    assert later in message
+    response = client.get("/api/bed-schedules", headers=headers, params=dict(
+        ground_id=ground_id, bed_label="2"))
+    assert response.status_code == 200
+    assert len(response.json()["entities"]) == 2
+
+
+def test_people_import_and_autocomplete(do_login):
+    global transient
+    headers = create_header(do_login)
+    key = uuid.uuid4().hex[:8]
+    rows = [dict(name=f"{name} {key}", email=f"{name.lower()}.{key}@test.com",
+                 address="Rua teste", birth_date="1990-01-01",
+                 cellphone="999999999")
+            for name in ("Zuleica", "Zuleide")]
+    body = b''.join(orjson.dumps(it) + b'\n'
+                    for it in [*rows, dict(name="Without email")])
+    response = client.post("/api/peoples/import", content=body,
+                           params=dict(format="ndjson"), headers=headers)
+    assert response.status_code == 201
+    data = response.json()
+    assert data["inserted"] == 2
+    assert [it["row"] for it in data["errors"]] == [3]
+
+    response = client.get("/api/peoples/autocomplete", headers=headers,
+                          params=dict(q=f"zul {key}"))
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(it["name"] for it in data) == [it["name"] for it in rows]
+    for it in data:
+        transient.add_people_id(it["id"])
+
+
+def test_voluntaries_store_many_and_export(do_login):
+    global transient
+    headers = create_header(do_login)
+    ground_id = transient.ground_ids_to_delete[0]
+    people_ids = transient.people_ids_to_delete[-2:]
+    body = [dict(people_id=people_id, ground_id=ground_id, bed_label="3",
+                 start_at="2031-01-01", is_responsible=False)
+            for people_id in [*people_ids, people_ids[0]]]
+    response = client.post("/api/voluntaries/many", json=body, headers=headers)
+    assert response.status_code == 201
+    results = response.json()["results"]
+    assert [it["error"] for it in results] == \
+        [None, None, "Voluntary already exists"]
+    for it in results[:2]:
+        transient.add_voluntary_id(it["voluntary"]["id"])
+
+    response = client.get("/api/voluntaries/export", headers=headers, params=dict(
+        ground_id=ground_id, bed_label="3", format="csv"))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert lines[0].startswith("id,")
+    assert len(lines) == 3
+
+
+def test_people_index_cursor_and_count(do_login):
+    headers = create_header(do_login)
+    response = client.get("/api/peoples", headers=headers, params=dict(
+        page_size=1, with_count=False))
+    assert response.status_code == 200
+    first = response.json()
+    assert first["row_count"] is None
+    assert first["next_cursor"]
+
+    response = client.get("/api/peoples", headers=headers, params=dict(
+        page_size=1, cursor=first["next_cursor"], with_count=False))
+    assert response.status_code == 200
+    second = response.json()
+    assert second["entities"][0]["id"] != first["entities"][0]["id"]
+
+    counts = set()
+    for mode in ("exact", "facet", "estimated", "cached"):
+        response = client.get("/api/peoples", headers=headers, params=dict(
+            page_size=1, count_mode=mode))
+        assert response.status_code == 200
+        counts.add(response.json()["row_count"])
+    assert len(counts) == 1 and counts.pop() >= 2
+
+    response = client.get("/api/peoples", headers=headers,
+                          params=dict(cursor="not a cursor"))
+    assert response.status_code == 400
+
+
+def test_bed_availability(do_login):
+    headers = create_header(do_login)
+    ground_id = transient.ground_ids_to_delete[0]
+    params = dict(ground_id=ground_id, start_at="2031-01-10",
+                  end_at="2031-01-20", page_size=5)
+    response = client.get("/api/bed-schedules/availability", headers=headers,
+                          params=params)
+    assert response.status_code == 200
+    first = response.json()
+    # Bed 2 is busy with the bed schedules stored above
+    assert first["row_count"] == 9
+    assert first["next_cursor"]
+    response = client.get("/api/bed-schedules/availability", headers=headers,
+                          params=dict(params, cursor=first["next_cursor"]))
+    assert response.status_code == 200
+    second = response.json()
+    labels = [it["label"] for it in first["entities"] + second["entities"]]
+    assert sorted(labels) == sorted(str(i) for i in range(1, 11) if i != 2)
+    assert all(it["ground_id"] == ground_id
+               for it in first["entities"] + second["entities"])
+
+
+def test_seeds_not_modified(do_login):
+    headers = create_header(do_login)
+    response = client.get("/api/seeds", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get("/api/seeds", headers={
+        **headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    seed_id = transient.seed_ids_to_delete[0]
+    response = client.put(f"/api/seeds/{seed_id}", json=dict(amount=12),
+                          headers=headers)
+    assert response.status_code == 200
+    response = client.get("/api/seeds", headers={
+        **headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
 def test_delete_all(do_login):
     global transient
     headers = create_header(do_login)
     errors = []
+    for voluntary_id in set(transient.voluntary_ids_to_delete):
+        try:
+            print(f"Deleting voluntary {voluntary_id}")
+            response = client.delete(
+                f"/api/voluntaries/{voluntary_id}", headers=headers)
+            assert response.status_code == 204
+        except AssertionError as e:
+            errors.append(e)
+
     for bed_schedule_id in set(transient.bed_schedule_ids_to_delete):
         try:
             print(f"Deleting bed schedule {bed_schedule_id}")
@@ -383,6 +591,7 @@ def test_delete_all(do_login):
             errors.append(e)
 
     transient.bed_schedule_ids_to_delete = []
+    transient.voluntary_ids_to_delete = []
     transient.ground_ids_to_delete = []
     transient.seed_ids_to_delete = []
     transient.people_ids_to_delete = []
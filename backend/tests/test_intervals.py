@@ -0,0 +1,31 @@
+import random
+
+from api.utilities.intervals import IntervalIndex
+
+
+def test_interval_index_overlapping():
+    index = IntervalIndex([(1, 3), (3, 5), (6, 9)], key=lambda it: it)
+    assert index.overlapping(0, 1) == []
+    assert index.overlapping(2, 4) == [(1, 3), (3, 5)]
+    assert index.overlapping(5, 6) == []
+    assert index.overlapping(0, 10) == [(1, 3), (3, 5), (6, 9)]
+
+
+def test_interval_index_nested():
+    index = IntervalIndex([(0, 10), (2, 3), (4, 5)], key=lambda it: it)
+    assert index.overlapping(6, 7) == [(0, 10)]
+    assert index.overlapping(4, 6) == [(0, 10), (4, 5)]
+
+
+def test_interval_index_matches_scan():
+    rng = random.Random(42)
+    items = []
+    for _ in range(200):
+        start = rng.randint(0, 1000)
+        items.append((start, start + rng.randint(1, 50)))
+    index = IntervalIndex(items, key=lambda it: it)
+    for _ in range(200):
+        start = rng.randint(0, 1000)
+        end = start + rng.randint(1, 50)
+        expected = [it for it in items if it[0] < end and it[1] > start]
+        assert sorted(index.overlapping(start, end)) == sorted(expected)
@@ -1,8 +1,14 @@
 from datetime import date, datetime
 
 import pytest
+from bson import ObjectId
 
-from api.utilities.mapper import dict_date_fields
+from api.models import Ground, Voluntary
+from api.responses import OrjsonResponse
+from api.utilities.mapper import (decode_cursor, dict_date_fields,
+                                  encode_cursor, keyset_query, keyset_sort,
+                                  keyset_values, model_from_mongo,
+                                  normalize_query, to_mongo)
 
 
 @pytest.mark.parametrize("item", [
@@ -16,3 +22,120 @@ def test_dict_date_fields(item):
     dict_date_fields(item, *fields)
     for field in fields:
         assert item.get(field) is None or isinstance(item[field], str)
+
+
+def test_to_mongo():
+    now = datetime.now()
+    item = {"start_at": date(2023, 1, 2), "created_at": now,
+            "schedules": [{"end_at": date(2023, 2, 1)}]}
+    assert to_mongo(item) == {"start_at": "2023-01-02", "created_at": now,
+                              "schedules": [{"end_at": "2023-02-01"}]}
+
+
+def test_keyset_sort_adds_id_tiebreaker():
+    assert keyset_sort([]) == [('_id', 1)]
+    assert keyset_sort([('name', -1)]) == [('name', -1), ('_id', 1)]
+    assert keyset_sort([('_id', -1)]) == [('_id', -1)]
+
+
+def test_keyset_query():
+    sort = [('name', -1), ('_id', 1)]
+    id = ObjectId()
+    assert keyset_query(sort, {'name': 'b', '_id': id}) == {"$or": [
+        {"$or": [{'name': {'$lt': 'b'}}, {'name': None}]},
+        {'name': 'b', '_id': {'$gt': id}},
+    ]}
+
+
+def test_keyset_query_null_values():
+    sort = [('name', 1), ('_id', 1)]
+    id = ObjectId()
+    assert keyset_query(sort, {'name': None, '_id': id}) == {"$or": [
+        {'name': {'$ne': None}},
+        {'name': None, '_id': {'$gt': id}},
+    ]}
+
+
+def matches(query, row):
+    # The operators of keyset_query, null also matches a missing field
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(it, row) for it in condition):
+                return False
+            continue
+        value = row.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+        elif "$ne" in condition:
+            if value == condition["$ne"]:
+                return False
+        elif value is None:
+            return False
+        elif "$gt" in condition and not value > condition["$gt"]:
+            return False
+        elif "$lt" in condition and not value < condition["$lt"]:
+            return False
+    return True
+
+
+# Nulls sort first ascending and last descending, as in mongo
+@pytest.mark.parametrize("direction, order", [
+    (1, [1, 4, 2, 0, 3, 5]),
+    (-1, [5, 0, 3, 2, 1, 4]),
+])
+def test_keyset_query_pages_null_sort_keys(direction, order):
+    names = ['b', None, 'a', 'b', None, 'c']
+    rows = [{'name': names[id], '_id': id} for id in range(len(names))]
+    sort = [('name', direction), ('_id', 1)]
+    ordered = [rows[id] for id in order]
+    paged = [ordered[0]]
+    while len(paged) < len(rows):
+        query = keyset_query(sort, keyset_values(sort, paged[-1]))
+        paged.append(next(it for it in ordered if matches(query, it)))
+    assert paged == ordered
+    assert not any(matches(keyset_query(sort, keyset_values(sort, ordered[-1])), it)
+                   for it in ordered)
+
+
+def test_cursor_round_trip():
+    sort = [('birth_date', 1), ('_id', 1)]
+    values = {'birth_date': '1990-01-01', '_id': ObjectId()}
+    assert decode_cursor(encode_cursor(values), sort) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    encode_cursor({'name': 'a', '_id': 1}),
+])
+def test_decode_cursor_invalid(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, [('birth_date', 1), ('_id', 1)])
+
+
+def test_normalize_query_ignores_key_order():
+    seed_id = ObjectId()
+    a = {'ground_id': 'g', 'seed_id': seed_id}
+    b = {'seed_id': seed_id, 'ground_id': 'g'}
+    assert normalize_query(a) == normalize_query(b)
+    assert normalize_query(a) != normalize_query({'ground_id': 'g'})
+
+
+@pytest.mark.parametrize("Model, item", [
+    (Voluntary, {
+        "_id": ObjectId(), "people_name": "Ana", "people_id": "p",
+        "ground_id": ObjectId(), "bed_label": "1", "is_responsible": True,
+        "start_at": "2023-01-01", "not_a_field": 1,
+    }),
+    (Ground, {
+        "_id": ObjectId(), "address": "a", "width": 1, "length": 2,
+        "description": "d", "owner_id": None, "manager_id": None,
+        "beds": [{"label": "1", "free": False, "end_at": "2023-01-01",
+                  "status": "occupied", "bed_schedules_id": ObjectId()}],
+    }),
+])
+def test_model_from_mongo_trusted_same_json(Model, item):
+    assert model_from_mongo(Model, item, trusted=True).json() == \
+        model_from_mongo(Model, item).json()
+    assert OrjsonResponse(model_from_mongo(Model, item, trusted=True)).body == \
+        OrjsonResponse(model_from_mongo(Model, item)).body
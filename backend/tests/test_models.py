@@ -0,0 +1,29 @@
+from datetime import date, datetime
+
+from api.models import Bed, BedStatus, bed_status
+from api.services.grounds_service import seconds_until_next_day
+
+TODAY = date(2023, 6, 1)
+
+
+def test_bed_status():
+    assert bed_status(True, None, TODAY) == BedStatus.FREE
+    assert bed_status(False, date(2023, 7, 1), TODAY) == BedStatus.OCCUPIED
+    assert bed_status(False, date(2023, 5, 1), TODAY) == BedStatus.COMPLETE
+    assert bed_status(False, None, TODAY) == BedStatus.OCCUPIED
+
+
+def test_bed_status_persisted():
+    bed = Bed(label='1', free=False, end_at='2000-01-01', status='occupied')
+    assert bed.status == BedStatus.OCCUPIED
+
+
+def test_bed_status_computed_when_missing():
+    bed = Bed(label='1', free=False, end_at='2000-01-01')
+    assert bed.status == BedStatus.COMPLETE
+    assert Bed(label='1').status == BedStatus.FREE
+
+
+def test_seconds_until_next_day():
+    assert seconds_until_next_day(datetime(2023, 6, 1, 23, 59, 30)) == 30
+    assert seconds_until_next_day(datetime(2023, 6, 1)) == 24 * 60 * 60
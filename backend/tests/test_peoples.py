@@ -0,0 +1,18 @@
+from api.services.peoples_service import (autocomplete_rank,
+                                          people_search_fields)
+
+
+def test_people_search_fields():
+    keys = people_search_fields({
+        "name": "Sebastião Araújo", "email": "seba.araujo@mail.com",
+        "cellphone": "(11) 98765-4321"})["search_keys"]
+    assert keys == ['11', '11987654321', '4321', '98765', 'araujo', 'com',
+                    'mail', 'seba', 'sebastiao']
+
+
+def test_autocomplete_rank():
+    peoples = [{"name": "Mariana Souza"}, {"name": "Ana Maria"},
+               {"name": "Maria Lima"}, {"name": "Ana Silva"}]
+    ranked = sorted(peoples, key=lambda it: autocomplete_rank("mari", it))
+    assert [it["name"] for it in ranked] == \
+        ["Maria Lima", "Mariana Souza", "Ana Maria", "Ana Silva"]
@@ -0,0 +1,43 @@
+from api.utilities.search import (normalize_text, prefix_query, search_fields,
+                                  search_query, text_grams)
+
+
+def shared_grams(name: str, search: str) -> int:
+    return len(set(text_grams(name)) & set(text_grams(search)))
+
+
+def test_normalize_text():
+    assert normalize_text('Abóbora  Japonesa!') == 'abobora japonesa'
+    assert normalize_text('Fruta-pão') == 'fruta pao'
+    assert normalize_text('') == ''
+
+
+def test_text_grams():
+    assert text_grams('Pé de Jiló') == [' de', ' ji', ' pe', 'ilo', 'jil']
+
+
+def test_search_fields():
+    assert search_fields('name', 'Agrião') == {
+        'name_search': 'agriao',
+        'name_grams': [' ag', 'agr', 'gri', 'iao', 'ria'],
+    }
+
+
+def test_search_query_tolerates_typos():
+    query, score = search_query('name', 'pimetao')
+    minimum = query['$expr']['$gte'][1]
+    assert score is not None
+    assert shared_grams('Pimentão', 'pimetao') >= minimum
+    assert shared_grams('Pepino', 'pimetao') < minimum
+
+
+def test_search_query_single_character():
+    query, score = search_query('name', 'Á')
+    assert query == {'name_search': {'$regex': '^a'}}
+    assert score is None
+
+
+def test_prefix_query():
+    query = prefix_query('search_keys', 'João Si')
+    assert [it.pattern for it in query['search_keys']['$all']] == ['^joao', '^si']
+    assert prefix_query('search_keys', ' - ') is None
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from test_conditional import Clock, VersionsCollection
+
+import api.utilities.cache
+from api.concerns import collection_versions
+from api.env import settings
+from api.exceptions import NotFoundError
+from api.services.users_service import user_auth_cache, user_auth_version
+
+USER_ID = '64a000000000000000000001'
+
+
+class UsersCollection:
+    # The find_one used by users_service.user_auth
+    def __init__(self):
+        self.items = {ObjectId(USER_ID): {
+            '_id': ObjectId(USER_ID), 'name': 'Test', 'email': 'test@test.com',
+            'password': 'x', 'cellphone': '999999999', 'version': 1}}
+        self.reads = 0
+
+    async def find_one(self, query):
+        self.reads += 1
+        return self.items.get(query['_id'])
+
+
+class UsersDatabase:
+    def __init__(self):
+        self.users = UsersCollection()
+        self.collection_versions = VersionsCollection()
+
+
+def test_user_auth_version_deleted_by_another_process(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(api.utilities.cache, 'time', clock)
+    collection_versions.clear()
+    user_auth_cache.clear()
+    db = UsersDatabase()
+    assert asyncio.run(user_auth_version(db, USER_ID, 1)).email == 'test@test.com'
+    asyncio.run(user_auth_version(db, USER_ID, 1))
+    assert db.users.reads == 1
+
+    # Deleted by another worker, seen once the cached users version expires
+    del db.users.items[ObjectId(USER_ID)]
+    asyncio.run(db.collection_versions.update_one(
+        {'_id': 'users'},
+        {'$inc': {'version': 1}, '$setOnInsert': {'epoch': 'other'}},
+        upsert=True))
+    asyncio.run(user_auth_version(db, USER_ID, 1))
+    clock.now += settings.etag_version_ttl / 1000
+    with pytest.raises(NotFoundError):
+        asyncio.run(user_auth_version(db, USER_ID, 1))